@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+from os import environ
+
+from benchmarks.stats import measure
+from benchmarks.stats import summarize
+from ozza import Ozza
+
+RESOURCE_COUNT = 10
+LOAD_CHUNK_SIZE = 10000
+BENCHMARK_FILENAME = "benchmark_store.oz"
+
+
+def member(index):
+    return dict(id="member-{}".format(index), name="name-{}".format(index), group="group-{}".format(index % 100),
+                score=index % 1000)
+
+
+def resource_key(index):
+    return "bench_{}".format(index % RESOURCE_COUNT)
+
+
+def load(engine, size):
+    """
+    Loads `size` members spread over `RESOURCE_COUNT` resources with bulk upserts.
+    """
+    latencies = []
+    started = time.perf_counter()
+    for chunk_start in range(0, size, LOAD_CHUNK_SIZE):
+        chunks = {}
+        for index in range(chunk_start, min(size, chunk_start + LOAD_CHUNK_SIZE)):
+            chunks.setdefault(resource_key(index), []).append(member(index))
+        call_started = time.perf_counter()
+        with engine.batch():
+            for key, members in chunks.items():
+                engine.put_members(key, members)
+        latencies.append(time.perf_counter() - call_started)
+    return summarize("bulk_load", latencies, time.perf_counter() - started, items=size)
+
+
+def run(size, ops, max_seconds, seed=7):
+    """
+    Runs every core operation against a store of `size` members and returns their result records.
+    Each operation is called up to `ops` times on random members, the same ones for a given seed.
+    """
+    data_directory = tempfile.mkdtemp(prefix="ozza-benchmark-")
+    environ["DATA_DIRECTORY"] = data_directory + "/"
+    randomizer = random.Random(seed)
+    indexes = [randomizer.randrange(size) for _ in range(ops)]
+    engine = Ozza(data_filename=BENCHMARK_FILENAME)
+    try:
+        results = [load(engine, size)]
+        results.append(measure("put_member", lambda index: engine.put_member(
+            resource_key(index), dict(member(index), score=-1)), indexes, max_seconds))
+        results.append(measure("get_member", lambda index: engine.get_member(
+            resource_key(index), "member-{}".format(index)), indexes, max_seconds))
+        results.append(measure("get_resource", lambda index: engine.get_resource(
+            resource_key(index)), indexes, max_seconds))
+        results.append(measure("get_resource_wildcard", lambda index: engine.get_resource(
+            "bench_*"), indexes, max_seconds))
+        results.append(measure("get_member_by_value", lambda index: engine.get_member_by_value(
+            resource_key(index), "name-{}".format(index)), indexes, max_seconds))
+        results.append(measure("multiple_filter_member", lambda index: engine.multiple_filter_member(
+            resource_key(index), [dict(field="group", value="group-{}".format(index % 100)),
+                                  dict(field="score", value=index % 1000)]), indexes, max_seconds))
+        results.append(measure("delete_member", lambda index: engine.delete_member(
+            resource_key(index), "member-{}".format(index)), indexes, max_seconds))
+        engine.save_snapshot()
+        engine.close()
+        started = time.perf_counter()
+        engine = Ozza(data_filename=BENCHMARK_FILENAME)
+        results.append(summarize("startup_load", [time.perf_counter() - started], time.perf_counter() - started))
+        started = time.perf_counter()
+        engine.get_resource("bench_*")
+        results.append(summarize("first_full_read", [time.perf_counter() - started], time.perf_counter() - started))
+    finally:
+        engine._teardown_data()
+        shutil.rmtree(data_directory, ignore_errors=True)
+    return [dict(record, suite="engine", size=size) for record in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the core Ozza engine operations")
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--ops", type=int, default=1000)
+    parser.add_argument("--max-seconds", type=float, default=10)
+    arguments = parser.parse_args()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        results = run(arguments.size, arguments.ops, arguments.max_seconds)
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import redirect_stdout
+from os import environ
+
+import httpx
+
+from benchmarks.stats import summarize
+from rest_api import create_api
+
+RESOURCE_COUNT = 10
+LOAD_CHUNK_SIZE = 1000
+
+
+def resource_path(index):
+    return "/bench_{}".format(index % RESOURCE_COUNT)
+
+
+def scenarios(size, ops):
+    """
+    Returns the requests of every scenario as (method, url, body) tuples.
+    """
+    indexes = [(index * 7919) % size for index in range(ops)]
+    return {
+        "http_put_member": [("PUT", resource_path(index) + "?member=true",
+                             dict(id="member-{}".format(index), name="updated-{}".format(index))) for index in indexes],
+        "http_get_member": [("GET", "{}/member-{}".format(resource_path(index), index), None) for index in indexes],
+        "http_get_resource": [("GET", resource_path(index), None) for index in indexes],
+        "http_get_filter": [("GET", "{}?filter=name-{}".format(resource_path(index), index), None)
+                            for index in indexes],
+    }
+
+
+async def run_requests(client, requests, concurrency, max_seconds):
+    """
+    Sends the requests from `concurrency` concurrent clients and times every request.
+    """
+    latencies = []
+    errors = 0
+    pending = iter(requests)
+    started = time.perf_counter()
+
+    async def worker():
+        nonlocal errors
+        for method, url, body in pending:
+            if time.perf_counter() - started > max_seconds:
+                return
+            call_started = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - call_started)
+            if response.status_code >= 500:
+                errors += 1
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return latencies, time.perf_counter() - started, errors
+
+
+async def load_test(size, ops, concurrencies, max_seconds):
+    """
+    Serves the app of `create_api` in process through its ASGI interface, so the numbers cover
+    routing, the views, the service layer and the engine without the network stack.
+    """
+    app = create_api()
+    results = []
+    async with httpx.AsyncClient(app=app, base_url="http://benchmark") as client:
+        for chunk_start in range(0, size, LOAD_CHUNK_SIZE):
+            chunks = {}
+            for index in range(chunk_start, min(size, chunk_start + LOAD_CHUNK_SIZE)):
+                chunks.setdefault(resource_path(index), []).append(
+                    dict(id="member-{}".format(index), name="name-{}".format(index)))
+            for path, members in chunks.items():
+                await client.put(path + "?bulk=true", json=members)
+        for concurrency in concurrencies:
+            for operation, requests in scenarios(size, ops).items():
+                latencies, elapsed, errors = await run_requests(client, requests, concurrency, max_seconds)
+                results.append(dict(summarize(operation, latencies, elapsed, errors=errors),
+                                    suite="http", size=size, concurrency=concurrency))
+    return results
+
+
+def run(size, ops, concurrencies, max_seconds):
+    data_directory = tempfile.mkdtemp(prefix="ozza-benchmark-")
+    environ["DATA_DIRECTORY"] = data_directory + "/"
+    environ.pop("STORE_SOCKET", None)
+    try:
+        return asyncio.run(load_test(size, ops, concurrencies, max_seconds))
+    finally:
+        shutil.rmtree(data_directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Ozza HTTP app in process")
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--concurrency", default="1,16,64")
+    parser.add_argument("--max-seconds", type=float, default=10)
+    arguments = parser.parse_args()
+    concurrencies = [int(concurrency) for concurrency in arguments.concurrency.split(",")]
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        results = run(arguments.size, arguments.ops, concurrencies, arguments.max_seconds)
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+DEFAULT_SIZES = "1000,100000,1000000"
+DEFAULT_TOLERANCE = 0.2
+
+
+def run_suite(suite, size, arguments):
+    """
+    Runs one suite at one size in its own process, so the peak RSS of every run is its own.
+    """
+    command = [sys.executable, "-m", "benchmarks.{}".format(suite), "--size", str(size),
+               "--max-seconds", str(arguments.max_seconds)]
+    if suite == "http":
+        command += ["--concurrency", arguments.concurrency]
+    output = subprocess.run(command, check=True, stdout=subprocess.PIPE).stdout
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def record_key(record):
+    return record.get("suite"), record.get("size"), record.get("operation"), record.get("concurrency")
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns the operations whose throughput dropped or whose p99 latency grew by more than the tolerance.
+    """
+    baseline_records = {record_key(record): record for record in baseline.get("results", [])}
+    regressions = []
+    for record in results.get("results"):
+        previous = baseline_records.get(record_key(record))
+        if previous is None:
+            continue
+        if record.get("ops_per_sec") < previous.get("ops_per_sec") * (1 - tolerance):
+            regressions.append(dict(record=record_key(record), metric="ops_per_sec",
+                                    baseline=previous.get("ops_per_sec"), current=record.get("ops_per_sec")))
+        if record.get("p99_ms") > previous.get("p99_ms") * (1 + tolerance):
+            regressions.append(dict(record=record_key(record), metric="p99_ms",
+                                    baseline=previous.get("p99_ms"), current=record.get("p99_ms")))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Ozza benchmark suites")
+    parser.add_argument("--suites", default="engine,http")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES)
+    parser.add_argument("--concurrency", default="1,16,64")
+    parser.add_argument("--max-seconds", type=float, default=10)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    arguments = parser.parse_args()
+    records = []
+    for suite in arguments.suites.split(","):
+        for size in [int(size) for size in arguments.sizes.split(",")]:
+            records += run_suite(suite, size, arguments)
+    results = dict(meta=dict(python=platform.python_version(), platform=platform.platform(),
+                             timestamp=int(time.time())), results=records)
+    with open(arguments.output, "w") as output:
+        json.dump(results, output, indent=2)
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), arguments.tolerance)
+        for regression in regressions:
+            suite, size, operation, concurrency = regression.get("record")
+            print("Regression in {} {} at {} members{}: {} {} -> {}".format(
+                suite, operation, size, " x{}".format(concurrency) if concurrency else "",
+                regression.get("metric"), regression.get("baseline"), regression.get("current")))
+        if regressions:
+            sys.exit(1)
+    print("Wrote {} results to {}".format(len(records), arguments.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import resource
+import sys
+import time
+
+
+def peak_rss_kb():
+    """
+    Returns the peak resident set size of the current process in kilobytes. macOS reports it in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def summarize(operation, latencies, elapsed, items=None, **extra):
+    """
+    Builds the result record of an operation from the latency of every call in seconds.
+    `items` counts the processed items when a call handles more than one, like a bulk load.
+    """
+    latencies = sorted(latencies)
+    record = dict(operation=operation, ops=len(latencies),
+                  ops_per_sec=round((items or len(latencies)) / elapsed, 2) if elapsed else 0,
+                  p50_ms=round(percentile(latencies, 0.50) * 1000, 4),
+                  p99_ms=round(percentile(latencies, 0.99) * 1000, 4),
+                  peak_rss_kb=peak_rss_kb())
+    record.update(extra)
+    return record
+
+
+def measure(operation, call, arguments, max_seconds):
+    """
+    Runs the call once per argument until the arguments run out or `max_seconds` passed, timing every call.
+    """
+    latencies = []
+    started = time.perf_counter()
+    for argument in arguments:
+        call_started = time.perf_counter()
+        call(argument)
+        latencies.append(time.perf_counter() - call_started)
+        if call_started - started > max_seconds:
+            break
+    return summarize(operation, latencies, time.perf_counter() - started)
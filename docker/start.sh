@@ -3,6 +3,16 @@
 case $1 in
   "run")
     shift
+    export STORE_SOCKET=${STORE_SOCKET:-/tmp/ozza.sock}
+    if [ -n "${STORE_SHARDS}" ]; then
+      echo "Starting Ozza store with ${STORE_SHARDS} shards at ${STORE_SOCKET}.*"
+      python -m ozza.sharding --socket=${STORE_SOCKET} --shards=${STORE_SHARDS} &
+      while [ ! -S "${STORE_SOCKET}.$((STORE_SHARDS - 1))" ]; do sleep 0.1; done
+    else
+      echo "Starting Ozza store at ${STORE_SOCKET}"
+      python -m ozza.server --socket=${STORE_SOCKET} &
+      while [ ! -S "${STORE_SOCKET}" ]; do sleep 0.1; done
+    fi
     echo "Starting Ozza Server at port 5000"
     echo "---------------------------------"
     echo "Activating 4 workers...."
@@ -10,11 +20,15 @@ case $1 in
     echo "Ozza server is now serving"
     python -m sanic app.app --host=${HOST:0.0.0.0} --port=5000 --workers=4    
     ;;
+  "benchmark")
+    shift
+    python -m benchmarks.run "$@"
+    ;;
   "test")
     ./test.sh "$@"
     ;;
   *)
-    echo "usage: $0 [run]"
+    echo "usage: $0 [run|test|benchmark]"
     exit 1
     ;;
 esac
@@ -1,34 +1,187 @@
-import errno
 import fnmatch
 import json
+import logging
+import struct
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
 from json.decoder import JSONDecodeError
 from os import environ
 from os import makedirs
 from os import path
 from os import remove
 
+from ozza.aggregation import aggregate
+from ozza.binary import BinarySnapshot
+from ozza.binary import LazyEntry
+from ozza.binary import is_binary_snapshot
+from ozza.binary import write_binary_snapshot
+from ozza.changefeed import DEFAULT_FEED_BACKLOG
+from ozza.changefeed import ChangeLog
+from ozza.changefeed import change_event
+from ozza.columns import ColumnMembers
+from ozza.compact import FrozenMembers
+from ozza.encoding import encode_value
+from ozza.encoding import join_encoded
+from ozza.exceptions import CorruptedStorageException
 from ozza.exceptions import EmptyParameterException
 from ozza.exceptions import FieldNotFoundException
 from ozza.exceptions import IdNotFoundException
 from ozza.exceptions import InvalidFilterFormatException
+from ozza.exceptions import InvalidParameterException
+from ozza.exceptions import OutOfMemoryException
+from ozza.exceptions import OzzaException
+from ozza.exceptions import PreconditionFailedException
+from ozza.exceptions import ReadOnlyReplicaException
 from ozza.exceptions import ResourceNotFoundException
+from ozza.eviction import ALLKEYS_LFU
+from ozza.eviction import ALLKEYS_LRU
+from ozza.eviction import EVICTION_POLICIES
+from ozza.eviction import NO_EVICTION
+from ozza.eviction import VOLATILE_TTL
+from ozza.eviction import AccessTracker
+from ozza.eviction import parse_size
+from ozza.expiry import ExpiryHeap
+from ozza.expiry import ExpiryReaper
+from ozza.keyindex import KeyIndex
+from ozza.keyindex import compile_pattern
+from ozza.keyindex import is_pattern
+from ozza.keyindex import literal_prefix
+from ozza.keyindex import match_pattern
+from ozza.memory import KEY_OVERHEAD
+from ozza.memory import value_size
+from ozza.metrics import MetricsRegistry
+from ozza.metrics import counter
+from ozza.metrics import gauge
+from ozza.oplog import OperationLog
+from ozza.patch import apply_patch
+from ozza.patch import check_expected
+from ozza.patch import validate_patch
+from ozza.query import compile_query
+from ozza.resource import MemberList
+from ozza.resource import Resource
+from ozza.resource import flatten_groups
+from ozza.resource import id_sort_key
+from ozza.resource import page_from_entries
+from ozza.segments import SegmentStore
+from ozza.snapshot import DEFAULT_SAVE_RULES
+from ozza.snapshot import SnapshotWorker
+from ozza.snapshot import parse_save_rules
+from ozza.snapshot import write_snapshot
 from utils import current_utctime
 from utils import get_expiry_time
 from utils import get_timestamp_from_millis
 from utils import get_unix_millis
 
+logger = logging.getLogger(__name__)
+
+RELEASING_MUTATIONS = {"delete_resource", "delete_member", "delete_members", "reap_expired"}
+
+
+def parse_expiry(expiry):
+    """
+    Returns the expiry of a member as an integer, a missing or empty expiry is 0.
+    """
+    try:
+        expiry = int(expiry or 0)
+    except (TypeError, ValueError):
+        raise InvalidParameterException("expire_in must be a number")
+    if expiry < 0:
+        raise InvalidParameterException("expire_in must not be negative")
+    return expiry
+
+
+def open_storage(location, read):
+    """
+    Runs `read` on a binary snapshot or on the segments. Files that can't be read stop the startup,
+    they are never replaced by an empty store. Only the legacy JSON storage file falls back to an empty store.
+    """
+    try:
+        return read()
+    except (OSError, ValueError, KeyError, TypeError, AttributeError, struct.error) as error:
+        raise CorruptedStorageException("Storage at {} can't be read ({}), restore it from a backup "
+                                        "or move it away to start with an empty store".format(location, error))
+
+
+def mutation(method):
+    """
+    Runs an engine mutation under the engine lock, then waits for its log records to be committed.
+    The commit happens outside the lock so concurrent writers can share one flush.
+    With a memory limit, mutations that may grow the store first make room for themselves.
+    Replicas reject mutations, their data only changes through `apply_replicated`.
+    Operations logged before a mutation raises are committed as well, they are already applied in memory.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.read_only:
+            raise ReadOnlyReplicaException()
+        try:
+            with self._lock:
+                if self._max_memory and method.__name__ not in RELEASING_MUTATIONS:
+                    self._make_room()
+                result = method(self, *args, **kwargs)
+        finally:
+            self._commit_operations()
+        return result
+    return wrapper
+
 
 class Ozza:
     _data_directory = "data/"
     _data_filename = "default_store.oz"
     _test_filename = "test_store.oz"
+    _log_suffix = ".log"
+    _metadata_suffix = ".meta"
+    _segments_suffix = ".segments"
     _storage_location = ""
     _memory_data = {}
     _test_mode = False
+    _fsync_policy = "always"
+    _log_compaction_size = 64 * 1024 * 1024
+    _snapshot_rules = DEFAULT_SAVE_RULES
+    _expiry_reap_interval = 100
+    _expiry_reap_batch = 1000
+    _storage_format = "binary"
+    _storage_layout = "segments"
+    _member_layout = "compact"
+    _encoded_members = "on"
+    _max_memory = 0
+    _eviction_policy = NO_EVICTION
+    _eviction_samples = 5
+    _change_feed_backlog = DEFAULT_FEED_BACKLOG
+    _segment_count = 64
 
-    def __init__(self, test_mode=False):
+    def __init__(self, test_mode=False, data_filename=None):
         self._test_mode = test_mode
+        self._shard_filename = data_filename
+        self._lock = threading.RLock()
+        self._snapshot_lock = threading.Lock()
+        self._pending = threading.local()
+        self.dirty_operations = 0
+        self._dirty_keys = set()
+        self.last_save_time = time.time()
+        self._indexed_fields = {}
+        self._value_indexed_keys = []
+        self._columnar_keys = []
+        self._versions = {}
+        self._version = 0
+        self._epoch = uuid.uuid4().hex[:8]
+        self._expiry_heap = ExpiryHeap()
+        self.timings = MetricsRegistry()
+        self.used_memory = 0
+        self._key_sizes = {}
+        self.evicted_keys = 0
+        self.evicted_members = 0
+        self.rejected_writes = 0
+        self.read_only = False
+        self.replication = None
+        self.replication_log = None
         self._init_data_file()
+        self._snapshot_worker = SnapshotWorker(self, parse_save_rules(self._snapshot_rules))
+        self._expiry_reaper = ExpiryReaper(self, self._expiry_reap_interval / 1000, self._expiry_reap_batch)
 
     def _init_data_file(self):
         """
@@ -36,96 +189,816 @@ class Ozza:
                 If directory and file already exist will load data into memory.
                 """
         filename = self._test_filename if self._test_mode else self._data_filename
+        if self._shard_filename:
+            filename = self._shard_filename
         if environ.get("DATA_DIRECTORY"):
             self._data_directory = environ.get("DATA_DIRECTORY")
         if environ.get("DATA_FILENAME"):
             self._data_filename = environ.get("DATA_FILENAME")
+        if environ.get("FSYNC_POLICY"):
+            self._fsync_policy = environ.get("FSYNC_POLICY")
+        if environ.get("LOG_COMPACTION_SIZE"):
+            self._log_compaction_size = int(environ.get("LOG_COMPACTION_SIZE"))
+        if environ.get("SNAPSHOT_RULES"):
+            self._snapshot_rules = environ.get("SNAPSHOT_RULES")
+        if environ.get("EXPIRY_REAP_INTERVAL"):
+            self._expiry_reap_interval = int(environ.get("EXPIRY_REAP_INTERVAL"))
+        if environ.get("EXPIRY_REAP_BATCH"):
+            self._expiry_reap_batch = int(environ.get("EXPIRY_REAP_BATCH"))
+        if environ.get("STORAGE_FORMAT"):
+            self._storage_format = environ.get("STORAGE_FORMAT")
+        if environ.get("STORAGE_LAYOUT"):
+            self._storage_layout = environ.get("STORAGE_LAYOUT")
+        if environ.get("SEGMENT_COUNT"):
+            self._segment_count = int(environ.get("SEGMENT_COUNT"))
+        if environ.get("MEMBER_LAYOUT"):
+            self._member_layout = environ.get("MEMBER_LAYOUT")
+        if environ.get("ENCODED_MEMBERS"):
+            self._encoded_members = environ.get("ENCODED_MEMBERS")
+        if environ.get("MAX_MEMORY"):
+            self._max_memory = parse_size(environ.get("MAX_MEMORY"))
+        if environ.get("EVICTION_POLICY"):
+            self._eviction_policy = environ.get("EVICTION_POLICY")
+        if environ.get("EVICTION_SAMPLES"):
+            self._eviction_samples = int(environ.get("EVICTION_SAMPLES"))
+        if environ.get("CHANGE_FEED_BACKLOG"):
+            self._change_feed_backlog = int(environ.get("CHANGE_FEED_BACKLOG"))
+        self.change_log = ChangeLog(self._change_feed_backlog)
+        if self._eviction_policy not in EVICTION_POLICIES:
+            raise ValueError("Eviction policy must be one of {}".format(", ".join(EVICTION_POLICIES)))
+        self._access_tracker = AccessTracker(self._eviction_policy)
         self._storage_location = path.join(self._data_directory, filename)
+        self._segments = None
+        if self._storage_layout == "segments":
+            segments_location = self._storage_location + self._segments_suffix
+            self._segments = open_storage(segments_location,
+                                          lambda: SegmentStore(segments_location, self._segment_count))
         try:
-            with open(self._storage_location) as data:
-                self._memory_data = json.load(data)
+            if self._segments is not None and self._segments.exists():
+                self._memory_data = open_storage(segments_location, self._segments.load)
+            elif is_binary_snapshot(self._storage_location):
+                self._memory_data = open_storage(self._storage_location,
+                                                 lambda: BinarySnapshot(self._storage_location).entries())
+            else:
+                with open(self._storage_location) as data:
+                    self._memory_data = self._load_data(json.load(data))
+            self._key_index = KeyIndex(self._memory_data.keys())
+            if self._segments is not None and not self._segments.exists():
+                self._dirty_keys.update(self._memory_data.keys())
+                self.dirty_operations += len(self._memory_data)
         except FileNotFoundError:
             self._memory_data = dict()
+            self._key_index = KeyIndex()
             self._get_or_create_directory()
             self._persist_data()
         except IOError:
             self._memory_data = dict()
+            self._key_index = KeyIndex()
             self._persist_data()
-        except JSONDecodeError:
+        except (JSONDecodeError, ValueError):
             self._memory_data = dict()
+            self._key_index = KeyIndex()
             self._persist_data()
+        self._operation_log = OperationLog(self._storage_location + self._log_suffix, self._fsync_policy)
+        self._replay_operations()
+        self._load_metadata()
+        self._track_loaded_expiry()
+        [self._account_memory(key) for key in list(self._memory_data)]
+
+    def _load_metadata(self):
+        """
+        Loads the index declarations and builds the declared indexes.
+        """
+        try:
+            with open(self._storage_location + self._metadata_suffix) as metadata_file:
+                metadata = json.load(metadata_file)
+            self._indexed_fields = metadata.get("indexes", {})
+            self._value_indexed_keys = metadata.get("value_indexes", [])
+            self._columnar_keys = metadata.get("columnar", [])
+        except (IOError, JSONDecodeError):
+            self._indexed_fields = {}
+            self._value_indexed_keys = []
+            self._columnar_keys = []
+        for key, value in self._memory_data.items():
+            if isinstance(value, Resource):
+                self._apply_indexes(key, value)
+
+    def _persist_metadata(self):
+        write_snapshot(self._storage_location + self._metadata_suffix,
+                       dict(indexes=self._indexed_fields, value_indexes=self._value_indexed_keys,
+                            columnar=self._columnar_keys))
+
+    def _apply_indexes(self, key, resource):
+        if key in self._columnar_keys:
+            resource.create_columns()
+        [resource.create_index(field) for field in self._indexed_fields.get(key, [])]
+        if key in self._value_indexed_keys:
+            resource.create_value_index()
+        return resource
+
+    def _new_resource(self, key):
+        return self._apply_indexes(key, self._build_resource())
+
+    def _build_resource(self, members=None):
+        return Resource(members, compact=self._member_layout == "compact", encoded=self._encoded_members != "off")
+
+    def _value(self, key):
+        """
+        Returns the value stored at a key, decoding it first if it still sits unread in a binary snapshot.
+        """
+        value = self._memory_data.get(key)
+        if value is not None:
+            self._access_tracker.touch(key)
+        if not isinstance(value, LazyEntry):
+            return value
+        with self._lock:
+            value = self._memory_data.get(key)
+            if isinstance(value, LazyEntry):
+                value = self._materialize(key, value)
+        return value
+
+    def _materialize(self, key, entry):
+        value = entry.load()
+        if entry.kind == "resource":
+            value = self._apply_indexes(key, self._build_resource(value))
+            if value.expiring_count:
+                [self._track_expiry(key, member) for member in value.members()]
+        self._memory_data[key] = value
+        self._account_memory(key)
+        return value
+
+    def _resource(self, key):
+        value = self._value(key)
+        return value if isinstance(value, Resource) else None
+
+    def _track_loaded_expiry(self):
+        for key, value in self._memory_data.items():
+            if isinstance(value, Resource) and value.expiring_count:
+                [self._track_expiry(key, member) for member in value.members()]
+
+    def _track_expiry(self, key, member):
+        if member.get("expiry_time"):
+            self._expiry_heap.push(member.get("expiry_time"), key, member.get("id"))
+        else:
+            self._expiry_heap.discard(key, member.get("id"))
+
+    def _load_data(self, raw_data):
+        return {key: self._build_resource(value) if Resource.is_resource_data(value) else value
+                for key, value in raw_data.items()}
+
+    def _replay_operations(self):
+        """
+        Applies the operations logged since the last snapshot. They count as dirty
+        so the snapshot worker folds them into the next snapshot.
+        """
+        for record in self._operation_log.replay():
+            self._apply_operation(record)
+            self._dirty_keys.add(record.get("key"))
+            self.dirty_operations += 1
+
+    def _apply_operation(self, record):
+        operation = record.get("op")
+        key = record.get("key")
+        if operation == "create_resource":
+            self._set_key(key, self._new_resource(key))
+        elif operation in ("delete_resource", "evict_key"):
+            self._remove_key(key)
+        elif operation == "put_value":
+            self._set_key(key, record.get("value"))
+        elif operation == "put_member":
+            if self._resource(key) is None:
+                self._set_key(key, self._new_resource(key))
+            self._resource(key).put(record.get("member"))
+        elif operation in ("delete_member", "expire_member", "evict_member"):
+            if self._resource(key) is not None:
+                self._resource(key).remove(record.get("id"))
+
+    def _set_key(self, key, value):
+        if key not in self._memory_data:
+            self._key_index.add(key)
+        else:
+            self._expiry_heap.discard_key(key)
+        self._memory_data[key] = value
+        self._access_tracker.touch(key)
+
+    def _remove_key(self, key):
+        if self._memory_data.pop(key, None) is not None:
+            self._expiry_heap.discard_key(key)
+            self._key_index.discard(key)
+            self._access_tracker.forget(key)
+
+    def _key_size(self, key):
+        value = self._memory_data.get(key)
+        if value is None:
+            return 0
+        if isinstance(value, Resource):
+            size = value.memory_usage()
+        elif isinstance(value, LazyEntry):
+            size = value.length
+        else:
+            size = value_size(value)
+        return size + KEY_OVERHEAD + value_size(key)
+
+    def _account_memory(self, key):
+        """
+        Updates the used memory with the current size of a key, see `ozza.memory`.
+        """
+        size = self._key_size(key)
+        self.used_memory += size - self._key_sizes.pop(key, 0)
+        if size:
+            self._key_sizes[key] = size
+
+    def _make_room(self):
+        """
+        Evicts with the eviction policy until the used memory fits the memory limit.
+        Raises `OutOfMemoryException` when the store is over the limit and nothing can be evicted.
+        """
+        while self.used_memory > self._max_memory:
+            if not self._evict():
+                self.rejected_writes += 1
+                raise OutOfMemoryException()
+
+    def _evict(self):
+        """
+        Evicts the least recently or least frequently used of a few keys sampled at random,
+        or with `volatile-ttl` the member closest to its expiry time.
+        Returns:
+            Boolean, False if there was nothing to evict
+        """
+        if self._eviction_policy == VOLATILE_TTL:
+            return self._evict_soonest_expiring()
+        if self._eviction_policy not in (ALLKEYS_LRU, ALLKEYS_LFU):
+            return False
+        key = self._access_tracker.coldest(self._key_index.sample(self._eviction_samples))
+        if key is None:
+            return False
+        self._remove_key(key)
+        self._log_operation("evict_key", key)
+        self.evicted_keys += 1
+        return True
+
+    def _evict_soonest_expiring(self):
+        while True:
+            entry = self._expiry_heap.pop_soonest()
+            if entry is None:
+                return False
+            expiry_time, key, id_value = entry
+            members = self._resource(key)
+            member = members.get(id_value) if members is not None else None
+            if member is None or member.get("expiry_time") != expiry_time:
+                continue
+            members.remove(id_value)
+            self._log_operation("evict_member", key, id=id_value)
+            self.evicted_members += 1
+            return True
+
+    def _log_operation(self, operation, key, change=None, encoded_member=None, **payload):
+        """
+        Logs an operation and publishes its change event, `change` names the event when it is not the operation.
+        `encoded_member` is the encoded form of the member of the operation, written to the log as it is.
+        """
+        self.change_log.append(change_event(change or operation, key, payload))
+        payload.update(op=operation, key=key)
+        self._pending.seq = self._operation_log.append(payload, encoded_member)
+        self._dirty_keys.add(key)
+        self._version += 1
+        if key in self._memory_data:
+            self._versions[key] = self._version
+        else:
+            self._versions.pop(key, None)
+        self.dirty_operations += 1
+        self._account_memory(key)
+        if self.replication_log is not None:
+            self.replication_log.append(payload)
+
+    @contextmanager
+    def batch(self):
+        """
+        Defers the log commit of every mutation run inside the block to one commit when the block ends.
+        """
+        depth = getattr(self._pending, "depth", 0)
+        self._pending.depth = depth + 1
+        try:
+            yield self
+        finally:
+            self._pending.depth = depth
+            if not depth:
+                self._commit_operations()
+
+    def _commit_operations(self):
+        seq = getattr(self._pending, "seq", 0)
+        if not seq or getattr(self._pending, "depth", 0):
+            return
+        self._pending.seq = 0
+        with self.timings.time("ozza_log_commit_seconds"):
+            self._operation_log.commit(seq)
+        if self._operation_log.size > self._log_compaction_size:
+            self._snapshot_worker.request()
+
+    def save_snapshot(self):
+        """
+        Writes a snapshot of the current data and drops the log records it covers.
+        With the segment layout only the segments holding changed keys are captured and written.
+        Only capturing the data holds the engine lock, serialization happens outside of it.
+        Returns:
+            Boolean, False if there was nothing to save
+        """
+        with self._snapshot_lock:
+            capture_start = time.perf_counter()
+            with self._lock:
+                if not self.dirty_operations:
+                    return False
+                dirty_keys, self._dirty_keys = self._dirty_keys, set()
+                try:
+                    buckets = None
+                    if self._segments is not None:
+                        buckets = {self._segments.bucket_for(key) for key in dirty_keys}
+                    data = self._capture_data(buckets)
+                    self._operation_log.rotate()
+                except Exception:
+                    self._dirty_keys.update(dirty_keys)
+                    raise
+                captured_operations, self.dirty_operations = self.dirty_operations, 0
+            self.timings.observe("ozza_snapshot_seconds", time.perf_counter() - capture_start, phase="capture")
+            try:
+                with self.timings.time("ozza_snapshot_seconds", phase="write"):
+                    self._write_snapshot(data, buckets)
+            except Exception:
+                with self._lock:
+                    self.dirty_operations += captured_operations
+                    self._dirty_keys.update(dirty_keys)
+                raise
+            self._operation_log.discard_rotated()
+            self.last_save_time = time.time()
+            return True
+
+    def _capture_data(self, buckets=None):
+        """
+        Members are replaced instead of modified on update, so copying the containers is enough
+        for a consistent view of the data. With buckets given only the keys of those segments are captured.
+        """
+        return {key: value.capture() if isinstance(value, Resource) else value
+                for key, value in self._memory_data.items()
+                if buckets is None or self._segments.bucket_for(key) in buckets}
+
+    def _write_snapshot(self, data, buckets=None):
+        if self._segments is not None:
+            self._segments.write(data, buckets)
+        elif self._storage_format == "json":
+            write_snapshot(self._storage_location, {
+                key: value.load() if isinstance(value, LazyEntry) else list(value)
+                if isinstance(value, FrozenMembers) else value for key, value in data.items()})
+        else:
+            write_binary_snapshot(self._storage_location, data)
 
     def _get_or_create_directory(self):
         try:
-            makedirs(self._data_directory)
-        except FileExistsError as error:
-            if error.errno == errno.EEXIST and path.isdir(self._data_directory):
-                print("Directory already exist.")
-            else:
-                print("Can't create directoy, please check permission")
+            makedirs(self._data_directory, exist_ok=True)
+        except OSError:
+            logger.error("Can't create directory %s, please check permission", self._data_directory)
 
     def _persist_data(self):
         try:
-            with open(self._storage_location, "w") as data:
-                data.write(json.dumps(self._memory_data))
+            self._write_snapshot(self._capture_data())
         except IOError:
-            print("Data can't be written. Waiting for next operation")
+            logger.error("Data can't be written. Waiting for next operation")
 
     def get_resource(self, key):
         return self._fetch_matching_resource(key)
 
-    def create_resource(self, key):
+    def get_resource_encoded(self, key):
+        """
+        Returns what `get_resource` returns as JSON bytes, joined from the encoded members.
+        """
+        if not key:
+            raise EmptyParameterException()
+        now = get_unix_millis(current_utctime())
+        if not is_pattern(key):
+            value = self._value(key) if key in self._memory_data else []
+            return join_encoded(value.encoded_members(now)) if isinstance(value, Resource) else encode_value(value)
+        fragments = []
+        for matched_key in self._key_index.match(key):
+            value = self._value(matched_key)
+            if isinstance(value, Resource):
+                fragments.extend(value.encoded_members(now))
+            elif isinstance(value, list):
+                fragments.extend(encode_value(item) for item in value)
+            elif value is not None:
+                fragments.append(encode_value(value))
+        return join_encoded(fragments)
+
+    def get_resource_groups(self, key):
+        """
+        Returns a [key, members] pair for every key matching the pattern, in key order.
+        Used to merge wildcard lookups over several shards.
+        """
         if not key:
             raise EmptyParameterException()
-        self._memory_data[key] = []
-        self._persist_data()
+        matched_keys = self._key_index.match(key) if is_pattern(key) else [key] if key in self._memory_data else []
+        groups = []
+        for matched_key in matched_keys:
+            value = self._value(matched_key)
+            if isinstance(value, Resource):
+                groups.append([matched_key, self._live(value, value.members())])
+            elif value is not None:
+                groups.append([matched_key, value])
+        return groups
 
+    def get_resource_page(self, key, limit, cursor=None):
+        """
+        Returns a page of at most `limit` items of the matching keys, in key order and then member id order.
+        The cursor of the next page is returned with the items, None on the last page.
+        Cursors point at the last item returned, so they stay valid while members are added or deleted.
+        """
+        return page_from_entries(self.get_resource_page_entries(key, limit + 1, cursor), limit)
+
+    def get_resource_page_entries(self, key, limit, cursor=None):
+        """
+        Returns up to `limit` entries after the cursor, `[key, id, member]` for a member and `[key, value]`
+        for a plain value. Used to merge pages over several shards.
+        """
+        if not key or limit < 1:
+            raise EmptyParameterException()
+        matched_keys = self._key_index.match(key) if is_pattern(key) else [key] if key in self._memory_data else []
+        if cursor:
+            matched_keys = matched_keys[bisect_left(matched_keys, cursor[0]):]
+        now = get_unix_millis(current_utctime())
+        entries = []
+        with self._lock:
+            for matched_key in matched_keys:
+                resumed = bool(cursor) and matched_key == cursor[0]
+                if resumed and len(cursor) == 1:
+                    continue
+                value = self._value(matched_key)
+                if isinstance(value, Resource):
+                    for member in value.members_after(id_sort_key(cursor[1]) if resumed else None):
+                        if not member.get("expiry_time") or now < member.get("expiry_time"):
+                            entries.append([matched_key, member.get("id"), member])
+                            if len(entries) == limit:
+                                return entries
+                elif value is not None:
+                    entries.append([matched_key, value])
+                    if len(entries) == limit:
+                        return entries
+        return entries
+
+    @mutation
+    def create_resource(self, key):
+        self._create_resource(key)
+
+    @mutation
     def delete_resource(self, key):
         if not key:
             raise EmptyParameterException()
         if not self._resource_is_available(key):
             raise ResourceNotFoundException()
-        self._memory_data.pop(key, None)
-        self._persist_data()
+        self._remove_key(key)
+        self._log_operation("delete_resource", key)
         return "Resource deleted"
 
+    @mutation
+    def reap_expired(self, limit):
+        """
+        Deletes up to `limit` members whose expiry time has passed.
+        Returns:
+            Integer count of deleted members
+        """
+        reaped = 0
+        for expiry_time, key, id_value in self._expiry_heap.pop_due(get_unix_millis(current_utctime()), limit):
+            members = self._resource(key)
+            if members is None:
+                continue
+            member = members.get(id_value)
+            if member is None or member.get("expiry_time") != expiry_time:
+                continue
+            members.remove(id_value)
+            self._log_operation("expire_member", key, id=id_value)
+            reaped += 1
+        return reaped
+
+    def expiry_stats(self):
+        return dict(
+            tracked=len(self._expiry_heap),
+            backlog=self._expiry_heap.count_due(get_unix_millis(current_utctime())),
+            reaped=self._expiry_reaper.reaped,
+            runs=self._expiry_reaper.runs,
+            failed_runs=self._expiry_reaper.failed_runs,
+            last_run_ms=round(self._expiry_reaper.last_run_duration * 1000, 3),
+        )
+
+    def metrics(self):
+        """
+        Returns the engine timings together with store size, member count and index gauges, see `ozza.metrics`.
+        Unloaded keys are counted without being decoded.
+        """
+        kinds = dict(resource=0, value=0, unloaded=0)
+        members = 0
+        members_memory = 0
+        gauges = []
+        with self._lock:
+            for value in self._memory_data.values():
+                if isinstance(value, LazyEntry):
+                    kinds["unloaded"] += 1
+                elif isinstance(value, Resource):
+                    kinds["resource"] += 1
+                    members += len(value)
+                    members_memory += value.memory_usage()
+                else:
+                    kinds["value"] += 1
+            for key in sorted(set(self._indexed_fields) | set(self._value_indexed_keys) | set(self._columnar_keys)):
+                resource = self._memory_data.get(key)
+                if not isinstance(resource, Resource):
+                    continue
+                gauges.append(gauge("ozza_resource_members", len(resource), resource=key))
+                gauges.append(gauge("ozza_resource_memory_bytes", resource.memory_usage(), resource=key))
+                for field, size in resource.index_sizes().items():
+                    gauges.append(gauge("ozza_index_values", size, resource=key, field=field))
+                if resource.value_index is not None:
+                    gauges.append(gauge("ozza_value_index_values", len(resource.value_index), resource=key))
+            gauges.extend(gauge("ozza_keys", count, kind=kind) for kind, count in kinds.items())
+            gauges.extend([
+                gauge("ozza_members", members),
+                gauge("ozza_members_memory_bytes", members_memory),
+                gauge("ozza_used_memory_bytes", self.used_memory),
+                gauge("ozza_max_memory_bytes", self._max_memory),
+                counter("ozza_evicted_keys_total", self.evicted_keys),
+                counter("ozza_evicted_members_total", self.evicted_members),
+                counter("ozza_rejected_writes_total", self.rejected_writes),
+                gauge("ozza_log_size_bytes", self._operation_log.size),
+                gauge("ozza_dirty_operations", self.dirty_operations),
+                gauge("ozza_expiry_tracked", len(self._expiry_heap)),
+                counter("ozza_expiry_failed_runs_total", self._expiry_reaper.failed_runs),
+                gauge("ozza_last_snapshot_age_seconds", round(time.time() - self.last_save_time, 3)),
+            ])
+            if self.replication is not None:
+                status = self.replication.status()
+                gauges.append(gauge("ozza_replication_offset", status.get("offset"), role=status.get("role")))
+                if status.get("role") == "follower":
+                    gauges.append(gauge("ozza_replication_lag_operations", status.get("lag_operations")))
+                    gauges.append(gauge("ozza_replication_lag_seconds", status.get("lag_seconds")))
+        return self.timings.snapshot(gauges)
+
+    def memory_usage(self, key):
+        """
+        Returns the approximate bytes held by every key matching the key or pattern, see `ozza.memory`.
+        Keys still unread in a memory mapped snapshot count as the size of their records.
+        Returns:
+            Dictionary with the bytes of every key, in key order, and their total
+        """
+        if not key:
+            raise EmptyParameterException()
+        matched_keys = self._key_index.match(key) if is_pattern(key) else [key] if key in self._memory_data else []
+        with self._lock:
+            usage = {matched_key: self._key_size(matched_key) for matched_key in matched_keys}
+        return dict(keys=usage, total=sum(usage.values()))
+
+    def capture_replica(self):
+        """
+        Returns the data for the full sync of a follower together with the replication offset it is consistent with.
+        """
+        with self._lock:
+            return self._capture_data(), self.replication_log.offset
+
+    def become_replica(self):
+        """
+        Makes the engine a read-only replica. Expired members are deleted by the leader, so the reaper is stopped.
+        """
+        self.read_only = True
+        self._expiry_reaper.stop()
+
+    def load_replica(self, data):
+        """
+        Replaces the data with the full sync of the leader, `MemberList` values are resources.
+        Every key changed counts as dirty, so the next snapshot persists the synced data.
+        """
+        with self._lock:
+            changed_keys = set(self._memory_data) | set(data)
+            self._memory_data = {
+                key: self._apply_indexes(key, self._build_resource(value)) if isinstance(value, MemberList) else value
+                for key, value in data.items()}
+            self._key_index = KeyIndex(self._memory_data.keys())
+            self._access_tracker = AccessTracker(self._eviction_policy)
+            self._expiry_heap.clear()
+            self._track_loaded_expiry()
+            self.used_memory = 0
+            self._key_sizes = {}
+            [self._account_memory(key) for key in self._memory_data]
+            self._dirty_keys.update(changed_keys)
+            self.dirty_operations += len(changed_keys)
+            self._version += 1
+            self._versions = {key: self._version for key in self._memory_data}
+        self._snapshot_worker.request()
+
+    def apply_replicated(self, records):
+        """
+        Applies operation records streamed from the leader and logs them like local mutations.
+        """
+        with self._lock:
+            for record in records:
+                change = None
+                if record.get("op") == "put_member":
+                    resource = self._resource(record.get("key"))
+                    if resource is None or record.get("member").get("id") not in resource:
+                        change = "create"
+                self._apply_operation(record)
+                payload = {name: value for name, value in record.items() if name not in ("op", "key")}
+                self._log_operation(record.get("op"), record.get("key"), change, **payload)
+        self._commit_operations()
+
+    def changes_after(self, offset=None, limit=1000):
+        """
+        Returns the change events following a sequence number, see `ozza.changefeed.ChangeLog`.
+        """
+        return self.change_log.changes_after(offset, limit)
+
+    def replication_status(self):
+        if self.replication is None:
+            return dict(role="standalone")
+        return self.replication.status()
+
+    def eviction_stats(self):
+        return dict(
+            used_memory=self.used_memory,
+            max_memory=self._max_memory,
+            evicted_keys=self.evicted_keys,
+            evicted_members=self.evicted_members,
+            rejected_writes=self.rejected_writes,
+        )
+
+    def get_version(self, key):
+        """
+        Returns a token that changes whenever a mutation may change what a read of the key returns.
+        Patterns are versioned by the whole store. Tokens of different engine runs never match.
+        Only present keys keep a version, a write to a removed key takes the next version of the whole store,
+        so its tokens never repeat.
+        """
+        if not key:
+            raise EmptyParameterException()
+        version = self._version if is_pattern(key) else self._versions.get(key, 0)
+        return "{}-{}".format(self._epoch, version)
+
+    def is_loaded(self, key):
+        """
+        Checks whether reading the key is cheap, False while it still has to be decoded from the snapshot.
+        """
+        return not isinstance(self._memory_data.get(key), LazyEntry)
+
     def check_resource(self, key):
         return self._resource_is_available(key)
 
     def get_member(self, key, id_value):
-        result = self._fetch_matching_member_by_field(key, id_value)
-        print(result)
+        if is_pattern(id_value):
+            result = self._fetch_matching_member_by_field(key, id_value)
+        else:
+            member = self._get_members(key).get(id_value) if id_value else None
+            result = [member] if member and self._not_expired(member) else []
         return result[0] if len(result) > 0 else []
 
+    def get_members(self, key, ids):
+        """
+        Returns the live members with the given ids in request order, missing ids are skipped.
+        """
+        if not key or not ids:
+            raise EmptyParameterException()
+        members = self._get_members(key)
+        return [member for member in (members.get(id_value) for id_value in ids)
+                if member is not None and self._not_expired(member)]
+
+    def get_member_encoded(self, key, id_value):
+        """
+        Returns what `get_member` returns as JSON bytes, the encoded member as it was stored.
+        """
+        if is_pattern(id_value):
+            return encode_value(self.get_member(key, id_value))
+        members = self._get_members(key)
+        encoded_member = members.encoded(id_value, get_unix_millis(current_utctime())) if id_value else None
+        return encoded_member if encoded_member is not None else b"[]"
+
+    def get_members_encoded(self, key, ids):
+        """
+        Returns what `get_members` returns as JSON bytes, joined from the encoded members.
+        """
+        if not key or not ids:
+            raise EmptyParameterException()
+        members = self._get_members(key)
+        now = get_unix_millis(current_utctime())
+        return join_encoded([encoded_member for encoded_member in (members.encoded(id_value, now) for id_value in ids)
+                             if encoded_member is not None])
+
+    @mutation
     def put_member(self, key, member_value, expiry=0):
+        return self._put_member(key, member_value, expiry)
+
+    @mutation
+    def put_members(self, key, members):
+        """
+        Upserts many members of a resource under one lock hold and one log commit.
+        A member may carry an `expire_in` field with its own expiry, the field itself is not stored.
+        Returns:
+            List with the stored member or the error of every item, in request order
+        """
+        if not key or not members:
+            raise EmptyParameterException()
+        results = []
+        for member_value in members:
+            try:
+                if not isinstance(member_value, dict):
+                    raise IdNotFoundException()
+                member_value = dict(member_value)
+                expiry = parse_expiry(member_value.pop("expire_in", 0))
+                results.append(dict(result=self._put_member(key, member_value, expiry)))
+            except OzzaException as error:
+                results.append(dict(error=error.message, status=error.status_code))
+        return results
+
+    @mutation
+    def patch_member(self, key, id_value, patch, expected_version=None):
+        """
+        Changes fields of a member in place of a read followed by a write, see `ozza.patch`. The member is looked up
+        once and the patched member is logged as one operation. A missing or expired member is created from the patch.
+        `expected_version` and the `expect` fields of the patch must match or nothing is changed.
+        Returns:
+            Dictionary of the patched member
+        """
+        if not key or not id_value:
+            raise EmptyParameterException()
+        validate_patch(patch)
+        if expected_version is not None and expected_version != self.get_version(key):
+            raise PreconditionFailedException("Resource version does not match the expected version")
+        members = self._resource(key)
+        if members is None and self._resource_is_available(key):
+            raise ResourceNotFoundException("Key holds a plain value, not a resource")
+        current_member = members.get(id_value) if members is not None else None
+        if current_member is not None and not self._not_expired(current_member):
+            current_member = None
+        check_expected(current_member or {}, patch.get("expect"))
+        member = apply_patch(current_member or dict(id=id_value), patch)
+        if current_member is None:
+            creation_time = current_utctime()
+            expiry = patch.get("expire_in", 0)
+            member["created_at"] = get_unix_millis(creation_time)
+            member["expiry_time"] = get_expiry_time(expiry, creation_time) if expiry > 0 else 0
+        if members is None:
+            self._create_resource(key)
+            members = self._resource(key)
+        encoded_member = encode_value(member)
+        members.put(member, encoded_member)
+        self._track_expiry(key, member)
+        self._log_operation("put_member", key, change="create" if current_member is None else None,
+                            encoded_member=encoded_member, member=member)
+        return member
+
+    @mutation
+    def delete_members(self, key, ids):
+        """
+        Deletes many members of a resource under one lock hold and one log commit.
+        Returns:
+            Number of deleted members
+        """
+        if not key or not ids:
+            raise EmptyParameterException()
+        members = self._get_members(key)
+        deleted = 0
+        for id_value in ids:
+            if members.remove(id_value):
+                self._expiry_heap.discard(key, id_value)
+                self._log_operation("delete_member", key, id=id_value)
+                deleted += 1
+        return deleted
+
+    def _put_member(self, key, member_value, expiry=0):
         if not key or not member_value:
             raise EmptyParameterException()
         if "id" not in member_value.keys():
             raise IdNotFoundException()
+        if isinstance(member_value.get("id"), (list, dict)):
+            raise InvalidParameterException("Member id must be a string, a number or null")
         if not self._resource_is_available(key):
-            self.create_resource(key)
-        if self._member_id_existed(key, member_value.get("id")):
-            return self._update_member(key, member_value, expiry)
+            self._create_resource(key)
+        elif self._resource(key) is None:
+            raise ResourceNotFoundException("Key holds a plain value, not a resource")
+        current_member = self._get_members(key).get(member_value.get("id"))
+        if current_member is not None and self._not_expired(current_member):
+            return self._update_member(key, member_value, expiry, current_member)
         else:
             return self._create_member(key, member_value, expiry)
 
+    @mutation
     def put_value(self, key, value):
         if not key or not value:
             raise EmptyParameterException()
-        self._memory_data[key] = value
-        self._persist_data()
+        self._set_key(key, value)
+        self._log_operation("put_value", key, value=value)
         return value
 
+    @mutation
     def delete_member(self, key, id_value):
         if not key or not id_value:
             raise EmptyParameterException()
-        if not self._resource_is_available(key):
-            raise ResourceNotFoundException()
-        for idx, member in enumerate(self._memory_data.get(key)):
-            if member.get("id") == id_value:
-                del self._memory_data[key][idx]
-                self._persist_data()
-                return "Delete successful"
+        if self._get_members(key).remove(id_value):
+            self._expiry_heap.discard(key, id_value)
+            self._log_operation("delete_member", key, id=id_value)
+            return "Delete successful"
         return "Member not found"
 
     def check_member(self, key, id_value):
@@ -137,75 +1010,204 @@ class Ozza:
     def get_member_by_value(self, key, field_value):
         return self._fetch_matching_member_by_value(key, field_value)
 
+    def create_index(self, key, field):
+        """
+        Declares a hash index on a member field of a resource. Equality lookups and filters on the field
+        are then answered from the index. The declaration is kept even if the resource is deleted.
+        """
+        if not key or not field:
+            raise EmptyParameterException()
+        with self._lock:
+            fields = self._indexed_fields.setdefault(key, [])
+            if field not in fields:
+                fields.append(field)
+                self._persist_metadata()
+            if self._resource(key) is not None:
+                self._resource(key).create_index(field)
+
+    def drop_index(self, key, field):
+        if not key or not field:
+            raise EmptyParameterException()
+        with self._lock:
+            fields = self._indexed_fields.get(key, [])
+            if field in fields:
+                fields.remove(field)
+                if not fields:
+                    self._indexed_fields.pop(key)
+                self._persist_metadata()
+            if self._resource(key) is not None:
+                self._resource(key).drop_index(field)
+
+    def get_indexes(self, key):
+        return list(self._indexed_fields.get(key, []))
+
+    def create_value_index(self, key):
+        """
+        Declares an inverted index from the stringified member values of a resource to the member ids.
+        Exact and prefix value searches are then answered from the index.
+        """
+        if not key:
+            raise EmptyParameterException()
+        with self._lock:
+            if key not in self._value_indexed_keys:
+                self._value_indexed_keys.append(key)
+                self._persist_metadata()
+            if self._resource(key) is not None:
+                self._resource(key).create_value_index()
+
+    def drop_value_index(self, key):
+        if not key:
+            raise EmptyParameterException()
+        with self._lock:
+            if key in self._value_indexed_keys:
+                self._value_indexed_keys.remove(key)
+                self._persist_metadata()
+            if self._resource(key) is not None:
+                self._resource(key).drop_value_index()
+
+    def create_columnar(self, key):
+        """
+        Declares a columnar store for the members of a resource, see `ozza.columns`.
+        Aggregations over the resource then run over the columns.
+        """
+        if not key:
+            raise EmptyParameterException()
+        with self._lock:
+            if key not in self._columnar_keys:
+                self._columnar_keys.append(key)
+                self._persist_metadata()
+            if self._resource(key) is not None:
+                self._resource(key).create_columns()
+
+    def drop_columnar(self, key):
+        if not key:
+            raise EmptyParameterException()
+        with self._lock:
+            if key in self._columnar_keys:
+                self._columnar_keys.remove(key)
+                self._persist_metadata()
+            if self._resource(key) is not None:
+                self._resource(key).drop_columns()
+
+    def aggregate(self, key, aggregation):
+        """
+        Runs count, sum, min, max and avg aggregations over the members of a resource, see `ozza.aggregation`.
+        Resources without a columnar store are loaded into a temporary one first.
+        """
+        if not key or not aggregation:
+            raise EmptyParameterException()
+        members = self._get_members(key)
+        live_filter = None
+        if members.expiring_count:
+            now = get_unix_millis(current_utctime())
+            live_filter = {"or": [dict(field="expiry_time", value=0), dict(field="expiry_time", value=None),
+                                  dict(field="expiry_time", op="gt", value=now)]}
+        with self._lock:
+            columns = members.columns
+            if columns is None:
+                columns = ColumnMembers(dict((member.get("id"), member) for member in members.members()))
+            return aggregate(columns, aggregation, live_filter)
+
     def multiple_filter_member(self, key, filter_list, condition="and"):
         if condition == "and":
             return self._filter_and(key, filter_list)
         else:
             return self._filter_or(key, filter_list)
 
+    def query(self, key, query):
+        """
+        Runs a query over the members of a resource, see `ozza.query`. The query holds an optional `where` filter tree,
+        `sort` fields, a `limit` and the `select` list of fields to return.
+        Equality filters on indexed fields narrow the candidates before the compiled predicate runs.
+        """
+        if not key or not query:
+            raise EmptyParameterException()
+        compiled = compile_query(query)
+        members = self._get_members(key)
+        ids = compiled.candidate_ids(members)
+        candidates = members.members() if ids is None else members.members_by_ids(ids)
+        return compiled.run(self._live(members, candidates))
+
+    def _create_resource(self, key):
+        if not key:
+            raise EmptyParameterException()
+        self._set_key(key, self._new_resource(key))
+        self._log_operation("create_resource", key)
+
     def _create_member(self, key, member_value, expiry=0):
+        member_value = dict(member_value)
         creation_time = current_utctime()
         member_value["created_at"] = get_unix_millis(creation_time)
         member_value["expiry_time"] = get_expiry_time(expiry, creation_time) if expiry > 0 else 0
-        self._memory_data[key].append(member_value)
-        self._persist_data()
+        encoded_member = encode_value(member_value)
+        self._resource(key).put(member_value, encoded_member)
+        self._track_expiry(key, member_value)
+        self._log_operation("put_member", key, change="create", encoded_member=encoded_member, member=member_value)
         return self.get_member(key, member_value.get("id"))
 
-    def _update_member(self, key, member_value, expiry=0):
+    def _update_member(self, key, member_value, expiry=0, current_member=None):
         if not key or not member_value:
             raise EmptyParameterException()
-        if not self._resource_is_available(key):
-            raise ResourceNotFoundException()
-        current_member = self.get_member(key, member_value.get("id"))
+        members = self._get_members(key)
+        if current_member is None:
+            current_member = members.get(member_value.get("id"))
         member_value["created_at"] = current_member.get("created_at")
         creation_time = get_timestamp_from_millis(current_member.get("created_at"))
         member_value["expiry_time"] = get_expiry_time(expiry, creation_time) if expiry > 0 else 0
-        for idx, member in enumerate(self._memory_data.get(key)):
-            if member.get("id") == member_value.get("id"):
-                for field_key in member_value.keys():
-                    member[field_key] = member_value[field_key]
-                self._memory_data[key][idx] = member
-                self._persist_data()
-
-                return self._memory_data[key][idx]
+        member = {**current_member, **member_value}
+        encoded_member = encode_value(member)
+        members.put(member, encoded_member)
+        self._track_expiry(key, member)
+        self._log_operation("put_member", key, encoded_member=encoded_member, member=member)
+        return member
 
     def _resource_is_available(self, key):
         if not key:
             raise EmptyParameterException()
         return key in self._memory_data.keys()
 
+    def _get_members(self, key):
+        """
+        Returns the member container of a resource. Keys holding a plain value have no members.
+        """
+        if not self._resource_is_available(key):
+            raise ResourceNotFoundException()
+        members = self._resource(key)
+        return members if members is not None else Resource()
+
     def _member_id_existed(self, key, id_value):
         if not key and not id_value:
             raise EmptyParameterException()
-        if not self._resource_is_available(key):
-            raise ResourceNotFoundException()
-        result = filter(lambda item: item.get("id") == id_value, self.get_resource(key))
-        return len(list(result)) > 0
+        member = self._get_members(key).get(id_value)
+        return member is not None and self._not_expired(member)
 
     def _field_existed(self, key, field):
         if not key or not field:
             raise EmptyParameterException()
-        if not self._resource_is_available(key):
-            raise ResourceNotFoundException()
-        result = filter(lambda item: fnmatch.filter(item.keys(), field), self.get_resource(key))
-        return len(list(result)) > 0
+        members = self._get_members(key)
+        if is_pattern(field):
+            return len(fnmatch.filter(members.fields(), field)) > 0
+        return members.has_field(field)
 
     def _member_key_is_available(self, key, field):
         if not key and not field:
             raise EmptyParameterException()
         if not self._resource_is_available(key):
             raise ResourceNotFoundException()
-        result = filter(lambda item: fnmatch.filter(item.keys(), field), self._memory_data.get(key))
+        result = filter(lambda item: fnmatch.filter(item.keys(), field), self._get_members(key))
         return len(list(result)) > 0
 
     def _fetch_matching_resource(self, key):
+        """
+        Exact keys are a direct lookup and a plain value is returned as it is stored.
+        Patterns collect the members of every matching key, in key order.
+        """
         if not key:
             raise EmptyParameterException()
-        matched_keys = fnmatch.filter(self._memory_data.keys(), key)
-        data = []
-        for matched_key in matched_keys:
-            [data.append(item) for item in self._memory_data.get(matched_key)]
-        return data
+        if not is_pattern(key):
+            value = self._value(key) if key in self._memory_data else []
+            return self._live(value, value.members()) if isinstance(value, Resource) else value
+        return flatten_groups(self.get_resource_groups(key))
 
     def _fetch_matching_member_by_field(self, key, value, field="id"):
         if not key or not value:
@@ -214,24 +1216,55 @@ class Ozza:
             raise ResourceNotFoundException()
         if not self._field_existed(key, field):
             raise FieldNotFoundException()
-        result = filter(lambda item: fnmatch.fnmatch(item.get(field), value) and self._not_expired(item),
-                        self.get_resource(key))
-        return list(result)
+        members = self._get_members(key)
+        if members.is_indexed(field) and not is_pattern(value):
+            return self._live(members, members.members_by_ids(members.lookup(field, value)))
+        if not is_pattern(value):
+            return self._live(members, [item for item in members.members() if item.get(field) == value])
+        return self._live(members, [item for item in members.members() if match_pattern(item.get(field), value)])
 
     def _fetch_matching_member_by_value(self, key, value):
         if not key and not value:
             raise EmptyParameterException()
         if not self._resource_is_available(key):
             raise ResourceNotFoundException()
-        result = filter(lambda item: fnmatch.filter(self._stringify_dictionary_values(item), value),
-                        self.get_resource(key))
-        return list(result)
+        members = self._get_members(key)
+        if not is_pattern(value):
+            if members.value_index is not None:
+                return self._live(members, members.members_by_ids(members.value_index.lookup(value)))
+            matches = lambda stringified: stringified == value
+        else:
+            matcher = compile_pattern(value)
+            matches = lambda stringified: matcher(stringified) is not None
+            prefix = literal_prefix(value)
+            if prefix and members.value_index is not None:
+                candidates = self._live(members, members.members_by_ids(members.value_index.lookup_prefix(prefix)))
+                if value == prefix + "*":
+                    return candidates
+                return [item for item in candidates if self._any_value_matches(item, matches)]
+        return [item for item in self._live(members, members.members()) if self._any_value_matches(item, matches)]
+
+    @staticmethod
+    def _any_value_matches(item, matches):
+        for field_value in item.values():
+            if matches(field_value if type(field_value) is str else str(field_value)):
+                return True
+        return False
 
     def _stringify_dictionary_values(self, data_dict):
         if not data_dict:
             raise EmptyParameterException()
         return [str(value) if type(value) is not str else value for value in list(data_dict.values())]
 
+    def _live(self, members, items):
+        """
+        Drops the expired members the reaper has not deleted yet.
+        """
+        if not members.expiring_count:
+            return items
+        now = get_unix_millis(current_utctime())
+        return [item for item in items if not item.get("expiry_time") or now < item.get("expiry_time")]
+
     def _not_expired(self, item):
         if not item:
             raise EmptyParameterException()
@@ -248,6 +1281,23 @@ class Ozza:
                 return False
         return True
 
+    def _plan_filters(self, key, filter_list):
+        """
+        Splits the filters into the id sets of the indexed ones, smallest first,
+        and the (field, value) pairs that have to be checked against each member.
+        """
+        members = self._get_members(key)
+        id_sets = []
+        predicates = []
+        for filter_item in filter_list:
+            field, value = filter_item.get("field"), filter_item.get("value")
+            if members.is_indexed(field):
+                id_sets.append(members.lookup(field, value))
+            else:
+                predicates.append((field, value))
+        id_sets.sort(key=len)
+        return members, id_sets, predicates
+
     def _filter_and(self, key, filter_list):
         if not key or not filter_list:
             raise EmptyParameterException()
@@ -255,22 +1305,17 @@ class Ozza:
             raise ResourceNotFoundException()
         if not self._filters_are_valid(filter_list, key):
             raise InvalidFilterFormatException()
-        is_start = True
-        result = []
-        for filter_item in filter_list:
-            if is_start:
-                filter_result = filter(lambda item: item.get(filter_item.get("field")) == filter_item.get("value"),
-                                       self.get_resource(key))
-                filter_result = list(filter_result)
-                [result.append(item) for item in filter_result]
-                is_start = False
-            else:
-                if len(result) == 0:
+        members, id_sets, predicates = self._plan_filters(key, filter_list)
+        if id_sets:
+            ids = id_sets[0]
+            for id_set in id_sets[1:]:
+                if not ids:
                     return []
-                filter_result = filter(lambda item: item.get(filter_item.get("field")) == filter_item.get("value"),
-                                       result)
-                result = list(filter_result)
-        return result
+                ids = ids & id_set
+            candidates = self._live(members, members.members_by_ids(ids))
+        else:
+            candidates = self._live(members, members.members())
+        return [item for item in candidates if all(item.get(field) == value for field, value in predicates)]
 
     def _filter_or(self, key, filter_list):
         if not key or not filter_list:
@@ -279,13 +1324,23 @@ class Ozza:
             raise ResourceNotFoundException()
         if not self._filters_are_valid(filter_list, key):
             raise InvalidFilterFormatException()
-        result = []
-        for filter_item in filter_list:
-            filter_result = filter(lambda item: item.get(filter_item.get("field")) == filter_item.get("value"),
-                                   self.get_resource(key))
-            [result.append(item) for item in filter_result if item not in result]
-        return result
+        members, id_sets, predicates = self._plan_filters(key, filter_list)
+        if not predicates:
+            return self._live(members, members.members_by_ids(set().union(*id_sets)))
+        predicates = [(filter_item.get("field"), filter_item.get("value")) for filter_item in filter_list]
+        return [item for item in self._live(members, members.members())
+                if any(item.get(field) == value for field, value in predicates)]
+
+    def close(self):
+        self._expiry_reaper.stop()
+        self._snapshot_worker.stop()
+        self._operation_log.close()
 
     def _teardown_data(self):
-        if path.exists(self._storage_location):
-            remove(self._storage_location)
+        self.close()
+        for location in (self._storage_location, self._storage_location + self._metadata_suffix):
+            if path.exists(location):
+                remove(location)
+        if self._segments is not None:
+            self._segments.remove()
+        self._operation_log.remove()
@@ -0,0 +1,242 @@
+from itertools import compress
+
+from ozza.exceptions import InvalidQueryException
+from ozza.query import compile_predicate
+from ozza.query import value_sort_key
+from ozza.resource import index_key
+
+AGGREGATE_OPERATORS = {"count", "sum", "min", "max", "avg"}
+GROUP_MASK_LIMIT = 64
+REFLECTED_OPERATORS = {"eq": "__eq__", "ne": "__ne__", "lt": "__gt__", "lte": "__ge__", "gt": "__lt__", "gte": "__le__"}
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _ones(size):
+    return int.from_bytes(b"\x01" * size, "little")
+
+
+def _mask(values):
+    return int.from_bytes(bytes(values), "little")
+
+
+def _to_bytes(mask, size):
+    return mask.to_bytes(size, "little")
+
+
+def _count(mask, size):
+    return _to_bytes(mask, size).count(1)
+
+
+def _code_mask(column, codes):
+    """
+    Returns the mask of the rows of a string column holding one of the codes. Byte wide codes are
+    mapped to the mask with a single `bytes.translate`.
+    """
+    if column.values.typecode == "B":
+        table = bytes(1 if code in codes else 0 for code in range(256))
+        return int.from_bytes(column.values.tobytes().translate(table), "little")
+    return _mask(map(codes.__contains__, column.values))
+
+
+class _MaskBuilder:
+    """
+    Evaluates a filter tree over the columns into a mask of the matching rows. Masks are integers
+    with one byte per row, so and/or of whole columns are single integer operations, comparisons
+    run as `map` of the bound comparison method of the constant over the column array and string filters
+    are checked once per distinct string.
+    """
+
+    def __init__(self, members):
+        self._members = members
+        self.ones = _ones(members.size)
+
+    def mask(self, node):
+        if "and" in node or "or" in node:
+            masks = [self.mask(child) for child in node.get("and") or node.get("or")]
+            result = masks[0]
+            for mask in masks[1:]:
+                result = result & mask if "and" in node else result | mask
+            return result
+        return self._leaf(node.get("field"), node.get("op", "eq"), node.get("value"))
+
+    def _leaf(self, field, operator, value):
+        column = self._members.column(field)
+        present = _mask(column.present)
+        matches_null = compile_predicate(dict(field=field, op=operator, value=value))({})
+        null_mask = self.ones ^ present if matches_null else 0
+        if column.kind is None:
+            return null_mask
+        if column.kind == "object":
+            predicate = compile_predicate(dict(field="value", op=operator, value=value))
+            return _mask(predicate(dict(value=item)) for item in column.values) & present | null_mask
+        return self._typed_leaf(column, operator, value) & present | null_mask
+
+    def _typed_leaf(self, column, operator, value):
+        if column.kind == "str":
+            return _code_mask(column, self._string_codes(column, operator, value))
+        if operator == "in":
+            return _mask(map({item for item in value if is_number(item)}.__contains__, column.values))
+        if operator == "between":
+            return self._typed_leaf(column, "gte", value[0]) & self._typed_leaf(column, "lte", value[1])
+        if operator == "glob" or not is_number(value):
+            return self.ones if operator == "ne" else 0
+        constant = float(value) if column.kind == "float" or isinstance(value, float) else value
+        return _mask(map(getattr(constant, REFLECTED_OPERATORS.get(operator)), column.values))
+
+    @staticmethod
+    def _string_codes(column, operator, value):
+        """
+        Returns the codes of the dictionary strings matching the filter.
+        """
+        if operator == "eq":
+            return {column.codes.get(value)} if value in column.codes else set()
+        predicate = compile_predicate(dict(field="value", op=operator, value=value))
+        return {code for code, item in enumerate(column.dictionary) if predicate(dict(value=item))}
+
+
+def _reduce(operator, values):
+    """
+    Reduces a list of values, non numeric values are left out of sum and avg.
+    """
+    if operator in ("sum", "avg"):
+        values = [value for value in values if is_number(value)]
+    if not values:
+        return None
+    if operator == "sum":
+        return sum(values)
+    if operator == "avg":
+        return sum(values) / len(values)
+    return min(values) if operator == "min" else max(values)
+
+
+def _compute(operator, column, mask, size):
+    """
+    Computes an aggregation over the rows of a mask. `column` is None for a count of the rows.
+    Typed columns are reduced straight from the array without building a list of the values.
+    """
+    if column is None:
+        return _count(mask, size)
+    selected_rows = _to_bytes(mask & _mask(column.present), size)
+    count = selected_rows.count(1)
+    if operator == "count":
+        return count
+    if not count:
+        return None
+    if column.kind == "str":
+        if operator not in ("min", "max"):
+            raise InvalidQueryException("`{}` needs a numeric field".format(operator))
+        strings = map(column.dictionary.__getitem__, set(compress(column.values, selected_rows)))
+        return min(strings) if operator == "min" else max(strings)
+    selected = compress(column.values, selected_rows)
+    if column.kind == "object":
+        return _reduce(operator, [value for value in selected if is_number(value)])
+    if operator == "sum":
+        return sum(selected)
+    if operator == "avg":
+        return sum(selected) / count
+    return min(selected) if operator == "min" else max(selected)
+
+
+def _compute_rows(operator, column, rows):
+    """
+    Computes an aggregation over a list of rows, used for groups too many to split with masks.
+    """
+    if column is None:
+        return len(rows)
+    values = [value for value in map(column.get, rows) if value is not None]
+    if operator == "count":
+        return len(values)
+    if column.kind == "str" and operator not in ("min", "max"):
+        raise InvalidQueryException("`{}` needs a numeric field".format(operator))
+    return _reduce(operator, values)
+
+
+def _parse_aggregates(aggregates):
+    if not isinstance(aggregates, dict) or not aggregates:
+        raise InvalidQueryException("Aggregates must be an object of named aggregations")
+    parsed = {}
+    for name, aggregate in aggregates.items():
+        if not isinstance(aggregate, dict) or aggregate.get("op") not in AGGREGATE_OPERATORS:
+            raise InvalidQueryException("Aggregation operator must be one of count, sum, min, max and avg")
+        if aggregate.get("op") != "count" and not isinstance(aggregate.get("field"), str):
+            raise InvalidQueryException("`{}` needs a field".format(aggregate.get("op")))
+        parsed[name] = (aggregate.get("op"), aggregate.get("field"))
+    return parsed
+
+
+def aggregate(members, aggregation, extra_filter=None):
+    """
+    Runs count, sum, min, max and avg aggregations over the rows of `ColumnMembers` matching the `where` filter,
+    optionally per value of the `group_by` field. `extra_filter` is a filter tree the rows must match as well.
+    Returns:
+        Dictionary of the named results, or a list of them with the group value for grouped aggregations
+    """
+    if not isinstance(aggregation, dict):
+        raise InvalidQueryException("Aggregation must be an object")
+    aggregates = _parse_aggregates(aggregation.get("aggregates"))
+    where, group_by = aggregation.get("where"), aggregation.get("group_by")
+    if where:
+        compile_predicate(where)
+    if group_by is not None and not isinstance(group_by, str):
+        raise InvalidQueryException("Group by must be a field")
+    builder = _MaskBuilder(members)
+    mask = _mask(members.live)
+    for node in (where, extra_filter):
+        if node:
+            mask &= builder.mask(node)
+    size = members.size
+    columns = {name: members.column(field) if field else None for name, (_, field) in aggregates.items()}
+    if not group_by:
+        return {name: _compute(operator, columns.get(name), mask, size)
+                for name, (operator, _) in aggregates.items()}
+    group_column = members.column(group_by)
+    groups = _group_masks(group_column, mask, builder)
+    if groups is not None:
+        results = [dict({name: _compute(operator, columns.get(name), group_mask, size)
+                         for name, (operator, _) in aggregates.items()}, **{group_by: group})
+                   for group, group_mask in groups]
+    else:
+        results = [dict({name: _compute_rows(operator, columns.get(name), rows)
+                         for name, (operator, _) in aggregates.items()}, **{group_by: group})
+                   for group, rows in _group_rows(group_column, mask, size)]
+    return sorted(results, key=lambda result: value_sort_key(result.get(group_by)))
+
+
+def _group_masks(column, mask, builder):
+    """
+    Splits the mask by the values of a typed group column, each group mask is one pass over the column.
+    Returns None when there are too many groups or the column holds plain values.
+    """
+    if column.kind == "object":
+        return None
+    present = _mask(column.present)
+    groups = []
+    null_mask = mask & (builder.ones ^ present)
+    if null_mask:
+        groups.append((None, null_mask))
+    if column.kind is None:
+        return groups
+    mask &= present
+    distinct = set(compress(column.values, _to_bytes(mask, len(column))))
+    if len(distinct) > GROUP_MASK_LIMIT:
+        return None
+    for value in distinct:
+        if column.kind == "str":
+            groups.append((column.dictionary[value], mask & _code_mask(column, {value})))
+        else:
+            groups.append((value, mask & _mask(map(value.__eq__, column.values))))
+    return groups
+
+
+def _group_rows(column, mask, size):
+    """
+    Buckets the rows of the mask by the value of the group column in a single pass.
+    """
+    groups = {}
+    for row in compress(range(size), _to_bytes(mask, size)):
+        value = column.get(row)
+        groups.setdefault(index_key(value), (value, []))[1].append(row)
+    return list(groups.values())
@@ -0,0 +1,142 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ozza.exceptions import OzzaException
+from ozza.exceptions import WriteQueueFullException
+from ozza.keyindex import is_pattern
+
+POINT_READ_METHODS = {
+    "check_resource", "get_member", "get_members", "check_member", "get_indexes", "get_version", "expiry_stats",
+    "eviction_stats", "replication_status", "changes_after", "get_member_encoded", "get_members_encoded",
+}
+SCAN_METHODS = {
+    "get_resource", "get_resource_groups", "get_resource_page", "get_resource_page_entries",
+    "get_member_by_field_value", "get_member_by_value", "multiple_filter_member", "query", "aggregate", "metrics",
+    "memory_usage", "get_resource_encoded",
+}
+WRITE_METHODS = {
+    "create_resource", "delete_resource", "put_member", "put_members", "patch_member", "put_value", "delete_member",
+    "delete_members", "create_index", "drop_index", "create_value_index", "drop_value_index", "create_columnar",
+    "drop_columnar", "save_snapshot",
+}
+FEED_METHODS = {"wait_changes"}
+MEMBER_READ_METHODS = {"get_member", "get_members", "check_member", "get_member_encoded", "get_members_encoded"}
+PATTERN_ID_METHODS = {"get_member", "get_member_encoded"}
+
+
+class AsyncOzza:
+    """
+    Asyncio facade of an `Ozza` engine that never blocks the event loop.
+    Point reads run inline, scans run on a bounded thread pool and writes go through a bounded queue
+    to a single writer thread. The writer applies whatever is queued as one batch with a single log commit.
+    When the queue stays full for `write_timeout` seconds the write is rejected with `WriteQueueFullException`.
+    Member reads of a key not decoded from the snapshot yet, and lookups of ids given as a glob pattern,
+    are not cheap and run on the scan pool too.
+    The latency of every call, queueing included, is recorded in the engine timings.
+    """
+
+    def __init__(self, engine, scan_threads=4, write_queue_size=1024, write_batch_size=256, write_timeout=5):
+        self.engine = engine
+        self._scan_pool = ThreadPoolExecutor(max_workers=scan_threads)
+        self._scan_slots = None
+        self._scan_threads = scan_threads
+        self._write_pool = ThreadPoolExecutor(max_workers=1)
+        self._write_queue_size = write_queue_size
+        self._write_batch_size = write_batch_size
+        self._write_timeout = write_timeout
+        self._write_queue = None
+        self._writer = None
+
+    def _start(self):
+        if self._writer is None:
+            self._scan_slots = asyncio.Semaphore(self._scan_threads * 2)
+            self._write_queue = asyncio.Queue(maxsize=self._write_queue_size)
+            self._writer = asyncio.ensure_future(self._write_loop())
+
+    async def call(self, method, *args, **kwargs):
+        if method in FEED_METHODS:
+            return await getattr(self, method)(*args, **kwargs)
+        if method not in POINT_READ_METHODS and method not in SCAN_METHODS and method not in WRITE_METHODS:
+            raise OzzaException("Unknown method", 400)
+        start_time = time.perf_counter()
+        try:
+            if method in POINT_READ_METHODS and self._runs_inline(method, args):
+                return getattr(self.engine, method)(*args, **kwargs)
+            self._start()
+            if method in SCAN_METHODS or method in POINT_READ_METHODS:
+                return await self._scan(method, args, kwargs)
+            return await self._write(method, args, kwargs)
+        finally:
+            self.engine.timings.observe("ozza_engine_operation_seconds", time.perf_counter() - start_time,
+                                        operation=method)
+
+    def _runs_inline(self, method, args):
+        if method not in MEMBER_READ_METHODS or not args:
+            return True
+        if method in PATTERN_ID_METHODS and len(args) > 1 and is_pattern(args[1]):
+            return False
+        return self.engine.is_loaded(args[0])
+
+    async def wait_changes(self, offset=None, limit=1000, timeout=0):
+        """
+        Long polls the change feed, waits up to `timeout` seconds for an event following the sequence number.
+        Waiting holds no thread, so it is not timed with the engine operations.
+        """
+        if timeout:
+            await self.engine.change_log.wait(offset, timeout)
+        return self.engine.changes_after(offset, limit)
+
+    async def _scan(self, method, args, kwargs):
+        async with self._scan_slots:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(self._scan_pool, lambda: getattr(self.engine, method)(*args, **kwargs))
+
+    async def _write(self, method, args, kwargs):
+        future = asyncio.get_event_loop().create_future()
+        try:
+            await asyncio.wait_for(self._write_queue.put((method, args, kwargs, future)), self._write_timeout)
+        except asyncio.TimeoutError:
+            raise WriteQueueFullException()
+        return await future
+
+    async def _write_loop(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = [await self._write_queue.get()]
+            while len(batch) < self._write_batch_size and not self._write_queue.empty():
+                batch.append(self._write_queue.get_nowait())
+            outcomes = await loop.run_in_executor(self._write_pool, self._apply_batch, batch)
+            for (_, _, _, future), (result, error) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def _apply_batch(self, batch):
+        """
+        Runs a batch of writes with one log commit. When the commit fails every write of the batch fails with it,
+        the error is returned instead of raised so the write loop keeps running.
+        """
+        outcomes = []
+        try:
+            with self.engine.batch():
+                for method, args, kwargs, _ in batch:
+                    try:
+                        outcomes.append((getattr(self.engine, method)(*args, **kwargs), None))
+                    except Exception as error:
+                        outcomes.append((None, error))
+        except Exception as error:
+            return [(None, error)] * len(batch)
+        return outcomes
+
+    async def close(self):
+        if self._writer is not None:
+            while not self._write_queue.empty():
+                await asyncio.sleep(0.01)
+            self._writer.cancel()
+            self._writer = None
+        self._scan_pool.shutdown(wait=True)
+        self._write_pool.shutdown(wait=True)
@@ -0,0 +1,163 @@
+import argparse
+import json
+import mmap
+import struct
+from os import fsync
+from os import path
+from os import replace
+
+from ozza.compact import FrozenMembers
+from ozza.resource import MemberList
+from ozza.resource import Resource
+
+MAGIC = b"OZZB"
+VERSION = 1
+HEADER = MAGIC + bytes([VERSION])
+RECORD_HEADER = struct.Struct(">I")
+FOOTER = struct.Struct(">QQ4s")
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def is_binary_snapshot(location):
+    try:
+        with open(location, "rb") as snapshot:
+            return snapshot.read(len(HEADER)) == HEADER
+    except IOError:
+        return False
+
+
+def _write_record(output, payload):
+    output.write(RECORD_HEADER.pack(len(payload)))
+    output.write(payload)
+
+
+def write_binary_snapshot(location, data):
+    """
+    Writes the data in the binary format: a header, the length-prefixed records of every key,
+    a JSON directory of the keys with the offset and length of their records, and a fixed size footer
+    pointing at the directory. `MemberList` and `FrozenMembers` values are written one record per member,
+    from their encoded members when they carry them. Entries that were never loaded are copied over
+    from their snapshot without being decoded.
+    Like the JSON snapshot it is written to a temporary file and renamed into place.
+    """
+    temp_location = location + ".tmp"
+    directory = {}
+    with open(temp_location, "wb") as output:
+        output.write(HEADER)
+        for key, value in data.items():
+            offset = output.tell()
+            if isinstance(value, LazyEntry):
+                value.copy_to(output)
+                kind, count = value.kind, value.count
+            elif isinstance(value, (MemberList, FrozenMembers)):
+                records = value.encoded
+                if records is None:
+                    records = (json.dumps(member).encode() for member in value)
+                [_write_record(output, record) for record in records]
+                kind, count = "resource", len(value)
+            else:
+                _write_record(output, json.dumps(value).encode())
+                kind, count = "value", 1
+            directory[key] = dict(kind=kind, offset=offset, length=output.tell() - offset, count=count)
+        directory_offset = output.tell()
+        encoded_directory = json.dumps(directory).encode()
+        output.write(encoded_directory)
+        output.write(FOOTER.pack(directory_offset, len(encoded_directory), MAGIC))
+        output.flush()
+        fsync(output.fileno())
+    replace(temp_location, location)
+
+
+class BinarySnapshot:
+    """
+    Read access to a binary snapshot through `mmap`. Opening only reads the footer and the directory,
+    the records of a key are decoded when the key is loaded.
+    """
+
+    def __init__(self, location):
+        self._file = open(location, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        directory_offset, directory_length, magic = FOOTER.unpack_from(self._map, len(self._map) - FOOTER.size)
+        if magic != MAGIC:
+            raise ValueError("Snapshot footer is corrupted")
+        self.directory = json.loads(self._map[directory_offset:directory_offset + directory_length])
+
+    def entries(self):
+        return {key: LazyEntry(self, key, entry) for key, entry in self.directory.items()}
+
+    def read_records(self, entry):
+        return (json.loads(record) for record in self.read_raw_records(entry))
+
+    def read_raw_records(self, entry):
+        position = entry.get("offset")
+        end = position + entry.get("length")
+        while position < end:
+            length = RECORD_HEADER.unpack_from(self._map, position)[0]
+            position += RECORD_HEADER.size
+            yield self._map[position:position + length]
+            position += length
+
+    def copy_to(self, output, entry):
+        view = memoryview(self._map)
+        start, end = entry.get("offset"), entry.get("offset") + entry.get("length")
+        for chunk_start in range(start, end, COPY_CHUNK_SIZE):
+            output.write(view[chunk_start:min(chunk_start + COPY_CHUNK_SIZE, end)])
+        view.release()
+
+
+class LazyEntry:
+    """
+    Placeholder for a key of a binary snapshot that has not been decoded yet.
+    """
+
+    def __init__(self, snapshot, key, entry):
+        self._snapshot = snapshot
+        self.key = key
+        self.kind = entry.get("kind")
+        self.count = entry.get("count")
+        self.length = entry.get("length")
+        self._entry = entry
+
+    def load(self):
+        """
+        Returns:
+            `MemberList` of the members for a resource, carrying their records as encoded members,
+            the stored value otherwise
+        """
+        if self.kind == "resource":
+            records = list(self._snapshot.read_raw_records(self._entry))
+            members = MemberList(json.loads(record) for record in records)
+            members.encoded = records
+            return members
+        return next(self._snapshot.read_records(self._entry))
+
+    def copy_to(self, output):
+        self._snapshot.copy_to(output, self._entry)
+
+
+def convert_json_snapshot(source, target):
+    """
+    Converts a JSON `.oz` storage file into the binary format.
+    """
+    with open(source) as snapshot:
+        raw_data = json.load(snapshot)
+    data = {key: MemberList(value) if Resource.is_resource_data(value) else value for key, value in raw_data.items()}
+    write_binary_snapshot(target, data)
+    return len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a JSON Ozza storage file into the binary format")
+    parser.add_argument("source")
+    parser.add_argument("target", nargs="?")
+    arguments = parser.parse_args()
+    target = arguments.target or arguments.source
+    if not path.exists(arguments.source):
+        parser.error("{} does not exist".format(arguments.source))
+    if is_binary_snapshot(arguments.source):
+        parser.error("{} is already in the binary format".format(arguments.source))
+    print("Converted {} keys into {}".format(convert_json_snapshot(arguments.source, target), target))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import asyncio
+import itertools
+import json
+import threading
+import uuid
+from collections import deque
+
+from ozza.keyindex import compile_pattern
+from ozza.metrics import counter
+from ozza.metrics import gauge
+
+DEFAULT_FEED_BACKLOG = 10000
+DEFAULT_QUEUE_SIZE = 1000
+FETCH_LIMIT = 1000
+WAIT_TIMEOUT = 30
+RETRY_INTERVAL = 1
+
+CHANGE_TYPES = {"put_member": "update", "delete_member": "delete", "expire_member": "expire", "evict_member": "evict"}
+
+
+def change_event(change, key, payload):
+    """
+    Returns the change event of a logged operation. Member operations become `create`, `update`, `delete`,
+    `expire` or `evict` events carrying the member id, other operations keep their name.
+    """
+    event = dict(key=key, type=CHANGE_TYPES.get(change, change))
+    if payload.get("member") is not None:
+        event.update(id=payload.get("member").get("id"), member=payload.get("member"))
+    elif "id" in payload:
+        event.update(id=payload.get("id"))
+    elif "value" in payload:
+        event.update(value=payload.get("value"))
+    return event
+
+
+def encode_event(event):
+    return json.dumps(event, separators=(",", ":"), default=str)
+
+
+class ChangeLog:
+    """
+    Backlog of the last change events of an engine, numbered by a sequence number that grows with every
+    logged operation. The feed id changes with every start of the engine, sequence numbers of another feed
+    cannot be resumed from. Waiters are woken from the writer thread through their event loop.
+    """
+
+    def __init__(self, size=DEFAULT_FEED_BACKLOG):
+        self.feed_id = uuid.uuid4().hex
+        self.offset = 0
+        self._events = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._waiters = set()
+
+    def append(self, event):
+        with self._lock:
+            self.offset += 1
+            event["seq"] = self.offset
+            self._events.append(event)
+            waiters, self._waiters = self._waiters, set()
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+    def changes_after(self, offset, limit):
+        """
+        Returns up to `limit` events following the sequence number, `events` is None when the events following it
+        are no longer in the backlog. Without a sequence number only the current one is returned.
+        Returns:
+            Dictionary with the feed id, the sequence number of the last event returned and the events
+        """
+        with self._lock:
+            missing = None if offset is None else self.offset - offset
+            if missing is None or missing < 0 or missing > len(self._events):
+                return dict(feed=self.feed_id, offset=self.offset, events=None if offset is not None else [])
+            events = list(itertools.islice(reversed(self._events), missing))
+        events.reverse()
+        events = events[:limit]
+        return dict(feed=self.feed_id, offset=events[-1].get("seq") if events else offset, events=events)
+
+    async def wait(self, offset, timeout):
+        """
+        Waits up to `timeout` seconds for an event following the sequence number.
+        """
+        loop = asyncio.get_event_loop()
+        waiter = (loop, loop.create_future())
+        with self._lock:
+            if self.offset != offset:
+                return
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class Subscription:
+    """
+    Change events of the keys matching a pattern, queued for one client. The queue is bounded,
+    a client not keeping up is dropped and resumes from `last_seq` after reconnecting.
+    """
+
+    def __init__(self, hub, pattern, since, feed_id, queue_size):
+        self.pattern = pattern
+        self.since = since
+        self.feed_id = feed_id
+        self.last_seq = since
+        self.dropped = False
+        self.live_from = None
+        self._hub = hub
+        self._queue = asyncio.Queue(queue_size)
+
+    def push(self, seq, frame):
+        if self.dropped:
+            return
+        try:
+            self._queue.put_nowait((seq, frame))
+        except asyncio.QueueFull:
+            self.dropped = True
+            self._hub.unsubscribe(self)
+            self._hub.dropped += 1
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(None)
+
+    async def frames(self):
+        """
+        Yields the encoded frames to send to the client. The first frame tells the feed id and the sequence number
+        live events start after, events missed since the `since` sequence number come next, then live events.
+        """
+        async for seq, frame in self._hub.replay(self):
+            self.last_seq = seq
+            yield frame
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            self.last_seq, frame = item
+            yield frame
+
+
+class ChangeFeedHub:
+    """
+    Fans the change events of a store out to the subscriptions of one process. A single task long polls
+    the store with `fetch(offset, limit, timeout)` while there are subscriptions. Subscriptions are grouped
+    by pattern, every event is matched once per group and encoded once, the same frame is queued for every
+    subscription of the matching groups. When the store restarts or the feed falls out of the backlog,
+    subscriptions get a `reset` frame and should read the keys again.
+    """
+
+    def __init__(self, fetch, queue_size=DEFAULT_QUEUE_SIZE):
+        self.feed_id = None
+        self.offset = None
+        self.dropped = 0
+        self._fetch = fetch
+        self._queue_size = queue_size
+        self._groups = {}
+        self._matchers = {}
+        self._task = None
+        self._starting = None
+
+    async def subscribe(self, pattern, since=None, feed_id=None):
+        await self._start()
+        subscription = Subscription(self, pattern, since, feed_id, self._queue_size)
+        subscription.live_from = self.offset
+        if pattern not in self._groups:
+            self._matchers[pattern] = compile_pattern(pattern)
+        self._groups.setdefault(pattern, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        group = self._groups.get(subscription.pattern)
+        if group is None:
+            return
+        group.discard(subscription)
+        if not group:
+            del self._groups[subscription.pattern]
+            del self._matchers[subscription.pattern]
+
+    async def replay(self, subscription):
+        """
+        Yields the first frame of a subscription followed by the events it missed, up to the live events.
+        """
+        live_from = subscription.live_from
+        offset = subscription.since
+        subscribed = encode_event(dict(type="subscribed", feed=self.feed_id, offset=live_from))
+        yield live_from if offset is None else offset, subscribed
+        if offset is None:
+            return
+        if subscription.feed_id not in (None, self.feed_id) or offset > live_from:
+            yield live_from, encode_event(dict(type="reset", feed=self.feed_id, offset=live_from))
+            return
+        matcher = self._matchers.get(subscription.pattern) or compile_pattern(subscription.pattern)
+        while offset < live_from:
+            result = await self._fetch(offset, FETCH_LIMIT, 0)
+            if result.get("feed") != self.feed_id or result.get("events") is None:
+                yield live_from, encode_event(dict(type="reset", feed=self.feed_id, offset=live_from))
+                return
+            for event in result.get("events"):
+                offset = event.get("seq")
+                if offset > live_from:
+                    return
+                if matcher(event.get("key")):
+                    yield offset, encode_event(event)
+            if not result.get("events"):
+                return
+
+    async def _start(self):
+        if self._task is not None:
+            return
+        if self._starting is None:
+            self._starting = asyncio.ensure_future(self._fetch(None, 0, 0))
+        try:
+            result = await asyncio.shield(self._starting)
+        finally:
+            self._starting = None
+        if self._task is None:
+            self.feed_id, self.offset = result.get("feed"), result.get("offset")
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        try:
+            while self._groups:
+                try:
+                    result = await self._fetch(self.offset, FETCH_LIMIT, WAIT_TIMEOUT)
+                except (ConnectionError, OSError):
+                    await asyncio.sleep(RETRY_INTERVAL)
+                    continue
+                if result.get("feed") != self.feed_id or result.get("events") is None:
+                    self.feed_id, self.offset = result.get("feed"), result.get("offset")
+                    frame = encode_event(dict(type="reset", feed=self.feed_id, offset=self.offset))
+                    for subscription in [item for group in self._groups.values() for item in group]:
+                        subscription.push(self.offset, frame)
+                    continue
+                self._dispatch(result.get("events"))
+                self.offset = result.get("offset")
+        finally:
+            self._task = None
+
+    def _dispatch(self, events):
+        frames = {}
+        for pattern, group in list(self._groups.items()):
+            matcher = self._matchers.get(pattern)
+            for event in events:
+                if not matcher(event.get("key")):
+                    continue
+                seq = event.get("seq")
+                frame = frames.get(seq)
+                if frame is None:
+                    frame = frames[seq] = encode_event(event)
+                for subscription in list(group):
+                    subscription.push(seq, frame)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def gauges(self):
+        return [
+            gauge("ozza_change_feed_subscribers", sum(len(group) for group in self._groups.values())),
+            gauge("ozza_change_feed_groups", len(self._groups)),
+            counter("ozza_change_feed_dropped_total", self.dropped),
+        ]
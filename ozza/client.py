@@ -0,0 +1,76 @@
+import asyncio
+import itertools
+
+from ozza.protocol import decode_error
+from ozza.protocol import encode_frame
+from ozza.protocol import read_frame
+
+
+class OzzaClient:
+    """
+    Asyncio client of a `StoreServer`. All calls share one pipelined connection, which is opened
+    lazily inside the running event loop and reopened if the store restarts.
+    """
+
+    def __init__(self, socket_path):
+        self._socket_path = socket_path
+        self._ids = itertools.count(1)
+        self._waiting = {}
+        self._reader = None
+        self._writer = None
+        self._receiver = None
+        self._connecting = None
+
+    async def _connect(self):
+        if self._writer is not None and not self._writer.is_closing():
+            return
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._open_connection())
+        try:
+            await asyncio.shield(self._connecting)
+        finally:
+            self._connecting = None
+
+    async def _open_connection(self):
+        self._reader, self._writer = await asyncio.open_unix_connection(self._socket_path)
+        self._receiver = asyncio.ensure_future(self._receive(self._reader))
+
+    async def _receive(self, reader):
+        while True:
+            response = await read_frame(reader)
+            if response is None:
+                break
+            future = self._waiting.pop(response.get("id"), None)
+            if future is None or future.done():
+                continue
+            if "error" in response:
+                future.set_exception(decode_error(response.get("error")))
+            else:
+                future.set_result(response.get("result"))
+        waiting, self._waiting = self._waiting, {}
+        for future in waiting.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Connection to the store was closed"))
+        self._writer = None
+
+    async def call(self, method, *args, **kwargs):
+        await self._connect()
+        request_id = next(self._ids)
+        future = asyncio.get_event_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write(encode_frame(dict(id=request_id, method=method, args=list(args), kwargs=kwargs)))
+        return await future
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._receiver is not None:
+            await self._receiver
+
+    def __getattr__(self, method):
+        if method.startswith("_"):
+            raise AttributeError(method)
+
+        async def remote_method(*args, **kwargs):
+            return await self.call(method, *args, **kwargs)
+        return remote_method
@@ -0,0 +1,165 @@
+from array import array
+
+from ozza.members import MemberStore
+
+TYPECODES = {"int": "q", "float": "d", "str": "B"}
+WIDE_CODES = "i"
+INT_RANGE = (-2 ** 63, 2 ** 63 - 1)
+
+
+def kind_of(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return "object"
+    if isinstance(value, int):
+        return "int" if INT_RANGE[0] <= value <= INT_RANGE[1] else "object"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "str"
+    return "object"
+
+
+class Column:
+    """
+    Values of one field for every row. Integers and floats are kept in typed arrays, strings are dictionary
+    encoded into an array of codes, one byte wide until there are more than 256 distinct strings,
+    and any other value in a plain list. `present` is the null map of the column,
+    one byte per row set to 1 when the row holds a value, so it can be used as a mask as it is.
+    A column takes the type of its first value and is widened to float or to plain values when a later value
+    does not fit.
+    """
+
+    def __init__(self, size):
+        self.kind = None
+        self.values = None
+        self.present = bytearray(size)
+        self.dictionary = []
+        self.codes = {}
+
+    def __len__(self):
+        return len(self.present)
+
+    def _allocate(self, kind):
+        size = len(self.present)
+        self.kind = kind
+        if kind == "object":
+            self.values = [None] * size
+        else:
+            self.values = array(TYPECODES.get(kind), bytes(array(TYPECODES.get(kind)).itemsize * size))
+
+    def append_row(self):
+        self.present.append(0)
+        if self.kind == "object":
+            self.values.append(None)
+        elif self.kind is not None:
+            self.values.append(0)
+
+    def _widen(self, kind):
+        if self.kind == "int" and kind == "float":
+            self.values = array("d", self.values)
+            self.kind = "float"
+            return
+        values = [self.get(row) for row in range(len(self.present))]
+        self.kind = "object"
+        self.values = values
+        self.dictionary = []
+        self.codes = {}
+
+    def set(self, row, value):
+        kind = kind_of(value)
+        if kind is None:
+            self.clear(row)
+            return
+        if self.kind is None:
+            self._allocate(kind)
+        elif self.kind != kind and self.kind != "object" and not (self.kind == "float" and kind == "int"):
+            self._widen(kind)
+        if self.kind == "str":
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.dictionary)
+                self.dictionary.append(value)
+                if code > 255 and self.values.typecode != WIDE_CODES:
+                    self.values = array(WIDE_CODES, self.values)
+            value = code
+        elif self.kind == "float":
+            value = float(value)
+        self.values[row] = value
+        self.present[row] = 1
+
+    def get(self, row):
+        if not self.present[row]:
+            return None
+        if self.kind == "str":
+            return self.dictionary[self.values[row]]
+        return self.values[row]
+
+    def clear(self, row):
+        self.present[row] = 0
+        if self.kind == "object":
+            self.values[row] = None
+
+
+class ColumnMembers(MemberStore):
+    """
+    Mapping of member id to member backed by columns, a drop-in for the member dict of a `Resource`.
+    Every member is a row, its fields are written to the column of each field and the field names
+    are kept as a schema shared by all the rows with the same fields, so reads rebuild the original dict.
+    `live` marks the rows holding a member, one byte per row.
+    """
+
+    def __init__(self, members=None):
+        self._row_schemas = array("i")
+        self._schemas = []
+        self._schema_ids = {}
+        self.columns = {}
+        self.live = bytearray()
+        super().__init__(members)
+
+    def _write(self, row, member):
+        if self.live[row]:
+            self._clear_row(row)
+        schema = tuple(member)
+        schema_id = self._schema_ids.get(schema)
+        if schema_id is None:
+            schema_id = self._schema_ids[schema] = len(self._schemas)
+            self._schemas.append(schema)
+        self._row_schemas[row] = schema_id
+        for field, value in member.items():
+            column = self.columns.get(field)
+            if column is None:
+                column = self.columns[field] = Column(len(self.live))
+            column.set(row, value)
+        self.live[row] = 1
+
+    @property
+    def size(self):
+        return len(self.live)
+
+    def _clear(self, row):
+        self._clear_row(row)
+        self.live[row] = 0
+
+    def _member(self, row):
+        columns = self.columns
+        return {field: columns[field].get(row) for field in self._schemas[self._row_schemas[row]]}
+
+    def _append_position(self):
+        self.live.append(0)
+        self._row_schemas.append(0)
+        for column in self.columns.values():
+            column.append_row()
+        return len(self.live) - 1
+
+    def _clear_row(self, row):
+        for field in self._schemas[self._row_schemas[row]]:
+            self.columns[field].clear(row)
+
+    def column(self, field):
+        """
+        Returns the column of a field, an empty one when no member has the field.
+        """
+        column = self.columns.get(field)
+        return column if column is not None else Column(self.size)
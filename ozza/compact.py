@@ -0,0 +1,119 @@
+import sys
+from array import array
+
+from ozza.members import MemberStore
+
+PACKED_FIELDS = ("created_at", "expiry_time")
+PACKED_RANGE = (-2 ** 63, 2 ** 63 - 1)
+
+
+class Schema:
+    """
+    Field names shared by every row holding the same fields in the same order. `packed` lists the positions
+    and names of the timestamp fields whose values are kept in the packed arrays instead of the row.
+    `trailing` is set when the packed fields come after every other field, members are then rebuilt
+    from the row without moving values around.
+    """
+    __slots__ = ("fields", "packed", "trailing")
+
+    def __init__(self, fields, packed):
+        self.fields = tuple(sys.intern(field) if type(field) is str else field for field in fields)
+        self.packed = tuple((position, field) for position, field in enumerate(self.fields) if field in packed)
+        self.trailing = all(position >= len(fields) - len(packed) for position, _ in self.packed)
+
+
+def _packable(value):
+    return type(value) is int and PACKED_RANGE[0] <= value <= PACKED_RANGE[1]
+
+
+def _rebuild(schema, row, created_at, expiry_time):
+    if not schema.packed:
+        return dict(zip(schema.fields, row))
+    if schema.trailing:
+        member = dict(zip(schema.fields, row))
+        for _, field in schema.packed:
+            member[field] = created_at if field == "created_at" else expiry_time
+        return member
+    values = list(row)
+    for position, field in schema.packed:
+        values.insert(position, created_at if field == "created_at" else expiry_time)
+    return dict(zip(schema.fields, values))
+
+
+class CompactMembers(MemberStore):
+    """
+    Mapping of member id to member kept as compact rows, the default member store of a `Resource`.
+    A row is a tuple of the values of the member next to the shared `Schema` of its fields, `created_at`
+    and `expiry_time` are packed as 64 bit integers in arrays indexed by the slot of the member.
+    Members are rebuilt as dictionaries when read.
+    """
+
+    def __init__(self, members=None):
+        self._rows = []
+        self._row_schemas = []
+        self._created = array("q")
+        self._expiry = array("q")
+        self._schemas = {}
+        self._field_schemas = {}
+        super().__init__(members)
+
+    def _write(self, slot, member):
+        fields = tuple(member)
+        schema = self._field_schemas.get(fields)
+        if schema is None or not all(_packable(member[field]) for _, field in schema.packed):
+            packed = tuple(field for field in PACKED_FIELDS if field in member and _packable(member[field]))
+            schema = self._schemas.get((fields, packed))
+            if schema is None:
+                schema = self._schemas[(fields, packed)] = Schema(fields, packed)
+                self._field_schemas.setdefault(fields, schema)
+        values = list(member.values())
+        for position, field in reversed(schema.packed):
+            if field == "created_at":
+                self._created[slot] = values.pop(position)
+            else:
+                self._expiry[slot] = values.pop(position)
+        self._rows[slot] = tuple(values)
+        self._row_schemas[slot] = schema
+
+    def _clear(self, slot):
+        self._rows[slot] = None
+        self._row_schemas[slot] = None
+
+    def frozen(self):
+        """
+        Returns a consistent view of the members that can be read after the resource changes.
+        Rows are immutable, so copying the slot order, the row list and the packed arrays is enough.
+        """
+        return FrozenMembers(list(self._positions.values()), list(self._rows), list(self._row_schemas),
+                             array("q", self._created), array("q", self._expiry))
+
+    def _member(self, slot):
+        return _rebuild(self._row_schemas[slot], self._rows[slot], self._created[slot], self._expiry[slot])
+
+    def _append_position(self):
+        self._rows.append(None)
+        self._row_schemas.append(None)
+        self._created.append(0)
+        self._expiry.append(0)
+        return len(self._rows) - 1
+
+
+class FrozenMembers:
+    """
+    Snapshot view of `CompactMembers`, iterating rebuilds the members one at a time in resource order.
+    """
+
+    def __init__(self, slots, rows, row_schemas, created, expiry):
+        self._slots = slots
+        self._rows = rows
+        self._row_schemas = row_schemas
+        self._created = created
+        self._expiry = expiry
+        self.encoded = None
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __iter__(self):
+        rows, row_schemas, created, expiry = self._rows, self._row_schemas, self._created, self._expiry
+        return (_rebuild(row_schemas[slot], rows[slot], created[slot], expiry[slot]) for slot in self._slots)
@@ -0,0 +1,23 @@
+import json
+
+
+def encode_value(value):
+    """
+    Encodes a member or a value as compact JSON bytes, the form kept next to the members,
+    written to the operation log and snapshots and sent in responses.
+    """
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def join_encoded(fragments):
+    """
+    Joins encoded items into the bytes of a JSON array.
+    """
+    return b"[" + b",".join(fragments) + b"]"
+
+
+def wrap_result(encoded):
+    """
+    Returns the bytes of the `{"result": ...}` response body holding an encoded result.
+    """
+    return b"".join((b'{"result":', encoded, b"}"))
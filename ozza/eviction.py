@@ -0,0 +1,71 @@
+import random
+import time
+
+NO_EVICTION = "noeviction"
+ALLKEYS_LRU = "allkeys-lru"
+ALLKEYS_LFU = "allkeys-lfu"
+VOLATILE_TTL = "volatile-ttl"
+EVICTION_POLICIES = (NO_EVICTION, ALLKEYS_LRU, ALLKEYS_LFU, VOLATILE_TTL)
+
+LFU_INITIAL_COUNT = 5
+LFU_MAX_COUNT = 255
+LFU_LOG_FACTOR = 10
+LFU_DECAY_SECONDS = 60
+
+SIZE_UNITS = {"b": 1, "kb": 1024, "mb": 1024 ** 2, "gb": 1024 ** 3}
+
+
+def parse_size(size):
+    """
+    Parses a size in bytes, optionally with a `kb`, `mb` or `gb` unit.
+    """
+    size = str(size).strip().lower()
+    for unit in ("kb", "mb", "gb", "b"):
+        if size.endswith(unit):
+            return int(float(size[:-len(unit)]) * SIZE_UNITS.get(unit))
+    return int(size)
+
+
+class AccessTracker:
+    """
+    Approximate recency or frequency of the key accesses, kept in O(1) per access.
+    With `allkeys-lru` every access stamps the key with a logical clock. With `allkeys-lfu` every key
+    has a small logarithmic counter, incremented with a probability falling as the counter grows and
+    decremented for every `LFU_DECAY_SECONDS` the key was not accessed, so past popularity fades.
+    Other policies do not track accesses.
+    """
+
+    def __init__(self, policy):
+        self._policy = policy
+        self._accesses = {}
+        self._clock = 0
+
+    def touch(self, key):
+        if self._policy == ALLKEYS_LRU:
+            self._clock += 1
+            self._accesses[key] = self._clock
+        elif self._policy == ALLKEYS_LFU:
+            now = time.monotonic()
+            count = self._decayed_count(key, now)
+            probability = 1 / (max(0, count - LFU_INITIAL_COUNT) * LFU_LOG_FACTOR + 1)
+            if count < LFU_MAX_COUNT and random.random() < probability:
+                count += 1
+            self._accesses[key] = (count, now)
+
+    def forget(self, key):
+        self._accesses.pop(key, None)
+
+    def _decayed_count(self, key, now):
+        count, last_access = self._accesses.get(key, (LFU_INITIAL_COUNT, now))
+        return max(0, count - int((now - last_access) / LFU_DECAY_SECONDS))
+
+    def rank(self, key):
+        """
+        Returns the eviction rank of a key, the lowest rank is evicted first. Keys never accessed rank lowest.
+        """
+        if self._policy == ALLKEYS_LFU:
+            return self._decayed_count(key, time.monotonic()) if key in self._accesses else 0
+        return self._accesses.get(key, 0)
+
+    def coldest(self, keys):
+        return min(keys, key=self.rank) if keys else None
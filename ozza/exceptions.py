@@ -11,28 +11,28 @@ class EmptyParameterException(OzzaException):
     def __init__(self, message="Method parameter should not be empty"):
         self.message = message
         self.status_code = 400
-        super().__init__(self)
+        super().__init__(message, self.status_code)
 
 
 class IdNotFoundException(OzzaException):
     def __init__(self, message="Value must contain `id` field"):
         self.message = message
         self.status_code = 400
-        super().__init__(self)
+        super().__init__(message, self.status_code)
 
 
 class ResourceNotFoundException(OzzaException):
     def __init__(self, message="Resource with that key was not found"):
         self.message = message
         self.status_code = 404
-        super().__init__(self)
+        super().__init__(message, self.status_code)
 
 
 class FieldNotFoundException(OzzaException):
     def __init__(self, message="Requested field was not found in data"):
         self.message = message
         self.status_code = 500
-        super().__init__(self)
+        super().__init__(message, self.status_code)
 
 
 class InvalidFilterFormatException(OzzaException):
@@ -40,4 +40,60 @@ class InvalidFilterFormatException(OzzaException):
                  message="Filter item must be dict using `{\"field\":<field name>, \"value\":<field value>}` format"):
         self.message = message
         self.status_code = 400
-        super().__init__(self)
+        super().__init__(message, self.status_code)
+
+
+class WriteQueueFullException(OzzaException):
+    def __init__(self, message="Write queue is full, try again later"):
+        self.message = message
+        self.status_code = 503
+        super().__init__(message, self.status_code)
+
+
+class OutOfMemoryException(OzzaException):
+    def __init__(self, message="Memory limit reached and nothing can be evicted, write rejected"):
+        self.message = message
+        self.status_code = 507
+        super().__init__(message, self.status_code)
+
+
+class ReadOnlyReplicaException(OzzaException):
+    def __init__(self, message="This store is a read-only replica, send writes to the leader"):
+        self.message = message
+        self.status_code = 403
+        super().__init__(message, self.status_code)
+
+
+class InvalidQueryException(OzzaException):
+    def __init__(self, message="Query is not valid"):
+        self.message = message
+        self.status_code = 400
+        super().__init__(message, self.status_code)
+
+
+class InvalidPatchException(OzzaException):
+    def __init__(self, message="Patch is not valid"):
+        self.message = message
+        self.status_code = 400
+        super().__init__(message, self.status_code)
+
+
+class PreconditionFailedException(OzzaException):
+    def __init__(self, message="Member does not match the expected values"):
+        self.message = message
+        self.status_code = 412
+        super().__init__(message, self.status_code)
+
+
+class InvalidParameterException(OzzaException):
+    def __init__(self, message="Parameter is not valid"):
+        self.message = message
+        self.status_code = 400
+        super().__init__(message, self.status_code)
+
+
+class CorruptedStorageException(OzzaException):
+    def __init__(self, message="Storage file can't be read"):
+        self.message = message
+        self.status_code = 500
+        super().__init__(message, self.status_code)
@@ -0,0 +1,141 @@
+import heapq
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryHeap:
+    """
+    Min-heap of (expiry time, resource key, member id) entries, with the live expiry time of every tracked member
+    grouped by resource key. Pushing a new expiry time for a member leaves its previous entry in the heap as stale,
+    stale entries are skipped when popped and the heap is rebuilt from the live entries once they outnumber them.
+    Entries of deleted members are checked against the member by the caller when popped.
+    """
+
+    def __init__(self, rebuild_threshold=1024):
+        self._entries = []
+        self._live = {}
+        self._count = 0
+        self._rebuild_threshold = rebuild_threshold
+
+    def __len__(self):
+        return self._count
+
+    def push(self, expiry_time, key, id_value):
+        members = self._live.setdefault(key, {})
+        if members.get(id_value) == expiry_time:
+            return
+        self._count += id_value not in members
+        members[id_value] = expiry_time
+        heapq.heappush(self._entries, (expiry_time, key, id_value))
+        self._rebuild_if_stale()
+
+    def discard(self, key, id_value):
+        members = self._live.get(key)
+        if members is None or members.pop(id_value, None) is None:
+            return
+        self._count -= 1
+        if not members:
+            del self._live[key]
+
+    def discard_key(self, key):
+        """
+        Stops tracking every member of a resource, for a key that is removed or replaced as a whole.
+        """
+        self._count -= len(self._live.pop(key, ()))
+        self._rebuild_if_stale()
+
+    def _rebuild_if_stale(self):
+        if len(self._entries) > 2 * self._count + self._rebuild_threshold:
+            self._entries = [(expiry_time, key, id_value) for key, members in self._live.items()
+                             for id_value, expiry_time in members.items()]
+            heapq.heapify(self._entries)
+
+    def _is_live(self, entry):
+        return self._live.get(entry[1], {}).get(entry[2]) == entry[0]
+
+    def _pop(self):
+        entry = heapq.heappop(self._entries)
+        if not self._is_live(entry):
+            return None
+        self.discard(entry[1], entry[2])
+        return entry
+
+    def pop_due(self, now, limit):
+        """
+        Pops up to `limit` live entries whose expiry time has passed.
+        """
+        due = []
+        while self._entries and len(due) < limit and self._entries[0][0] <= now:
+            entry = self._pop()
+            if entry is not None:
+                due.append(entry)
+        return due
+
+    def pop_soonest(self):
+        while self._entries:
+            entry = self._pop()
+            if entry is not None:
+                return entry
+        return None
+
+    def count_due(self, now):
+        """
+        Counts the live entries whose expiry time has passed, only visiting the part of the heap that is due.
+        """
+        entries = self._entries
+        count = 0
+        positions = [0] if entries else []
+        while positions:
+            position = positions.pop()
+            if position >= len(entries) or entries[position][0] > now:
+                continue
+            count += self._is_live(entries[position])
+            positions.extend((2 * position + 1, 2 * position + 2))
+        return count
+
+    def clear(self):
+        self._entries = []
+        self._live = {}
+        self._count = 0
+
+
+class ExpiryReaper:
+    """
+    Background thread deleting expired members in bounded batches so the engine lock is never held for long.
+    A failed run is logged and retried on the next interval.
+    """
+
+    def __init__(self, engine, interval, batch_size):
+        self._engine = engine
+        self._interval = interval
+        self._batch_size = batch_size
+        self._stopped = threading.Event()
+        self.reaped = 0
+        self.runs = 0
+        self.failed_runs = 0
+        self.last_run_duration = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(self._interval):
+            started = time.time()
+            try:
+                while not self._stopped.is_set():
+                    reaped = self._engine.reap_expired(self._batch_size)
+                    self.reaped += reaped
+                    if reaped < self._batch_size:
+                        break
+                    time.sleep(0)
+            except Exception:
+                self.failed_runs += 1
+                logger.exception("Expired members can't be reaped. Retrying on next run")
+            self.runs += 1
+            self.last_run_duration = time.time() - started
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
@@ -0,0 +1,84 @@
+import fnmatch
+import random
+import re
+from bisect import bisect_left
+from functools import lru_cache
+
+PATTERN_CHARACTERS = "*?["
+PATTERN_CACHE_SIZE = 4096
+
+
+def is_pattern(value):
+    return isinstance(value, str) and any(character in value for character in PATTERN_CHARACTERS)
+
+
+def literal_prefix(pattern):
+    """
+    Returns the part of a glob pattern before its first wildcard character.
+    """
+    for position, character in enumerate(pattern):
+        if character in PATTERN_CHARACTERS:
+            return pattern[:position]
+    return pattern
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def compile_pattern(pattern):
+    """
+    Returns a match function for a glob pattern. Compiled patterns are cached with LRU eviction.
+    """
+    return re.compile(fnmatch.translate(pattern)).match
+
+
+def match_pattern(value, pattern):
+    return isinstance(value, str) and compile_pattern(pattern)(value) is not None
+
+
+class KeyIndex:
+    """
+    Sorted index of the store keys. Exact keys are answered by the caller with a dict lookup,
+    patterns only check the keys sharing their literal prefix.
+    """
+
+    def __init__(self, keys=None):
+        self._keys = sorted(keys or [])
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key):
+        position = bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            self._keys.insert(position, key)
+
+    def discard(self, key):
+        position = bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            del self._keys[position]
+
+    def sample(self, count):
+        """
+        Returns `count` keys picked at random, a key can be picked more than once.
+        """
+        keys = self._keys
+        return [keys[random.randrange(len(keys))] for _ in range(count)] if keys else []
+
+    def with_prefix(self, prefix):
+        keys = self._keys
+        position = bisect_left(keys, prefix)
+        matched = []
+        while position < len(keys) and keys[position].startswith(prefix):
+            matched.append(keys[position])
+            position += 1
+        return matched
+
+    def match(self, pattern):
+        """
+        Returns the keys matching the glob pattern in sorted order.
+        """
+        prefix = literal_prefix(pattern)
+        candidates = self.with_prefix(prefix) if prefix else list(self._keys)
+        if pattern == prefix + "*":
+            return candidates
+        matcher = compile_pattern(pattern)
+        return [key for key in candidates if matcher(key)]
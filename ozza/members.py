@@ -0,0 +1,108 @@
+import time
+
+
+class MemberStore:
+    """
+    Base of the member stores of a `Resource`, a mapping of member id to member kept at a position of the store.
+    Positions of deleted members are reused. Subclasses lay the members out and implement `_append_position`,
+    `_write`, `_clear` and `_member`.
+    Writes run under the engine lock while reads do not. `_writes` is odd while a write is in progress,
+    a read that overlapped a write is retried, so readers never see a torn member or the member of a reused position.
+    """
+    read_errors = (AttributeError, IndexError, KeyError, TypeError)
+
+    def __init__(self, members=None):
+        self._positions = {}
+        self._free_positions = []
+        self._writes = 0
+        for id_value, member in (members or {}).items():
+            self[id_value] = member
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, id_value):
+        return id_value in self._positions
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __getitem__(self, id_value):
+        member = self._read(id_value)
+        if member is None:
+            raise KeyError(id_value)
+        return member
+
+    def __setitem__(self, id_value, member):
+        self._writes += 1
+        try:
+            position = self._positions.get(id_value)
+            if position is None:
+                position = self._free_positions.pop() if self._free_positions else self._append_position()
+                self._positions[id_value] = position
+            self._write(position, member)
+        finally:
+            self._writes += 1
+
+    def get(self, id_value, default=None):
+        member = self._read(id_value)
+        return default if member is None else member
+
+    def pop(self, id_value, default=None):
+        position = self._positions.get(id_value)
+        if position is None:
+            return default
+        member = self._member(position)
+        self._writes += 1
+        try:
+            del self._positions[id_value]
+            self._clear(position)
+            self._free_positions.append(position)
+        finally:
+            self._writes += 1
+        return member
+
+    def keys(self):
+        return self._positions.keys()
+
+    def values(self):
+        return (member for _, member in self.items())
+
+    def items(self):
+        """
+        Yields the members present when the iteration started and still present when they are reached.
+        """
+        for id_value in list(self._positions):
+            member = self._read(id_value)
+            if member is not None:
+                yield id_value, member
+
+    def _read(self, id_value):
+        """
+        Returns the member with the id, None when there is none. Runs without the engine lock.
+        """
+        while True:
+            writes = self._writes
+            if not writes & 1:
+                try:
+                    position = self._positions.get(id_value)
+                    member = None if position is None else self._member(position)
+                except self.read_errors:
+                    if self._writes == writes:
+                        raise
+                    continue
+                if self._writes == writes:
+                    return member
+            time.sleep(0)
+
+    def _append_position(self):
+        raise NotImplementedError
+
+    def _write(self, position, member):
+        raise NotImplementedError
+
+    def _clear(self, position):
+        raise NotImplementedError
+
+    def _member(self, position):
+        raise NotImplementedError
@@ -0,0 +1,47 @@
+from sys import getsizeof
+
+from ozza.compact import PACKED_FIELDS
+
+MEMBER_OVERHEAD = 160
+ROW_HEADER_SIZE = 64
+INDEX_ENTRY_SIZE = 112
+KEY_OVERHEAD = 120
+ENCODED_ENTRY_SIZE = 40
+
+
+def value_size(value):
+    """
+    Approximates the bytes held by a value. Singletons and cached small integers are free,
+    containers add up the sizes of their items.
+    """
+    if value is None or value is True or value is False:
+        return 0
+    value_type = type(value)
+    if value_type is int and -5 <= value <= 256:
+        return 0
+    if value_type is dict:
+        return getsizeof(value) + sum(value_size(field) + value_size(item) for field, item in value.items())
+    if value_type is list or value_type is tuple:
+        return getsizeof(value) + sum(map(value_size, value))
+    return getsizeof(value)
+
+
+def encoded_size(encoded):
+    """
+    Approximates the bytes held by the encoded form of a member, with its entry in the mapping of id to bytes.
+    """
+    return ENCODED_ENTRY_SIZE + getsizeof(encoded)
+
+
+def member_size(member, compact=True):
+    """
+    Approximates the bytes held by a member in a resource, with its id slot and sequence number.
+    Compact members are a row tuple with packed timestamps, field names are shared by the schema.
+    """
+    if not compact:
+        return MEMBER_OVERHEAD + value_size(member)
+    size = MEMBER_OVERHEAD + ROW_HEADER_SIZE
+    for field, value in member.items():
+        if field not in PACKED_FIELDS or type(value) is not int:
+            size += 8 + value_size(value)
+    return size
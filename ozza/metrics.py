@@ -0,0 +1,156 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_HELP = {
+    "ozza_engine_operation_seconds": "Latency of engine operations, queueing included",
+    "ozza_log_commit_seconds": "Time spent writing and syncing a group of operation log records",
+    "ozza_snapshot_seconds": "Time spent taking a snapshot, per phase",
+    "ozza_http_request_seconds": "Latency of HTTP requests per route",
+    "ozza_keys": "Number of keys in the store per kind, unloaded keys have not been read since startup",
+    "ozza_members": "Number of members of the loaded resources",
+    "ozza_resource_members": "Number of members of the resources with declared indexes or columnar storage",
+    "ozza_resource_memory_bytes": "Approximate bytes held by the resources with declared indexes or columnar",
+    "ozza_members_memory_bytes": "Approximate bytes held by the members and indexes of the loaded resources",
+    "ozza_index_values": "Number of distinct values held by a field index",
+    "ozza_value_index_values": "Number of distinct values held by a value index",
+    "ozza_log_size_bytes": "Size of the operation log",
+    "ozza_dirty_operations": "Operations not covered by a snapshot yet",
+    "ozza_expiry_tracked": "Members with an expiry time",
+    "ozza_last_snapshot_age_seconds": "Seconds since the last snapshot",
+    "ozza_used_memory_bytes": "Approximate bytes held by the store, counted against the memory limit",
+    "ozza_max_memory_bytes": "Memory limit of the store, 0 when unlimited",
+    "ozza_evicted_keys_total": "Keys evicted to stay within the memory limit",
+    "ozza_evicted_members_total": "Members evicted before their expiry time to stay within the memory limit",
+    "ozza_replication_offset": "Replication offset reached by the leader or applied by a follower",
+    "ozza_replication_lag_operations": "Operations of the leader not applied by the follower yet",
+    "ozza_replication_lag_seconds": "Seconds since the follower was last caught up with the leader",
+    "ozza_change_feed_subscribers": "Change feed subscriptions served by the HTTP worker",
+    "ozza_change_feed_groups": "Distinct key patterns subscribed to on the HTTP worker",
+    "ozza_change_feed_dropped_total": "Change feed subscriptions dropped because the client did not keep up",
+    "ozza_rejected_writes_total": "Writes rejected because the memory limit was reached and nothing could be evicted",
+}
+
+
+class Histogram:
+    """
+    Latency histogram with fixed bucket bounds. Counts are kept per bucket and summed up when rendered.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Histograms by metric name and labels. Observing is a bucket lookup and three additions under a lock.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, **labels):
+        series = name, tuple(sorted(labels.items()))
+        with self._lock:
+            histogram = self._histograms.get(series)
+            if histogram is None:
+                histogram = self._histograms[series] = Histogram(self._buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, name, **labels):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start_time, **labels)
+
+    def snapshot(self, gauges=None):
+        """
+        Returns:
+            Dictionary of the histograms and the given gauges, plain data that can be sent to another process
+        """
+        with self._lock:
+            histograms = [dict(name=name, labels=dict(labels), buckets=list(histogram.buckets),
+                               counts=list(histogram.counts), sum=histogram.sum, count=histogram.count)
+                          for (name, labels), histogram in self._histograms.items()]
+        return dict(histograms=histograms, gauges=gauges or [])
+
+
+def gauge(name, value, **labels):
+    return dict(name=name, labels=labels, value=value)
+
+
+def counter(name, value, **labels):
+    return dict(name=name, labels=labels, value=value, type="counter")
+
+
+def merge_snapshots(snapshots, label=None):
+    """
+    Joins metric snapshots into one. With a label name given, the series of every snapshot
+    are told apart by that label set to the position of the snapshot.
+    """
+    merged = dict(histograms=[], gauges=[])
+    for position, snapshot in enumerate(snapshots):
+        for kind in ("histograms", "gauges"):
+            for series in snapshot.get(kind, []):
+                if label is not None:
+                    series = dict(series, labels=dict(series.get("labels"), **{label: str(position)}))
+                merged[kind].append(series)
+    return merged
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = ('{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+               for name, value in sorted(labels.items()))
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_metrics(snapshot):
+    """
+    Renders a metrics snapshot in the Prometheus text exposition format.
+    """
+    families = {}
+    for series in snapshot.get("gauges", []):
+        families.setdefault(series.get("name"), (series.get("type", "gauge"), []))[1].append(series)
+    for series in snapshot.get("histograms", []):
+        families.setdefault(series.get("name"), ("histogram", []))[1].append(series)
+    lines = []
+    for name, (kind, family) in families.items():
+        if name in METRIC_HELP:
+            lines.append("# HELP {} {}".format(name, METRIC_HELP.get(name)))
+        lines.append("# TYPE {} {}".format(name, kind))
+        for series in family:
+            labels = series.get("labels")
+            if kind != "histogram":
+                lines.append("{}{} {}".format(name, _format_labels(labels), _format_value(series.get("value"))))
+                continue
+            cumulative = 0
+            for bound, count in zip(list(series.get("buckets")) + [float("inf")], series.get("counts")):
+                cumulative += count
+                lines.append("{}_bucket{} {}".format(name, _format_labels(dict(labels, le=_format_value(bound))),
+                                                     cumulative))
+            lines.append("{}_sum{} {}".format(name, _format_labels(labels), _format_value(series.get("sum"))))
+            lines.append("{}_count{} {}".format(name, _format_labels(labels), series.get("count")))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,207 @@
+import json
+import logging
+import threading
+from os import fsync
+from os import path
+from os import remove
+from os import rename
+from os import truncate
+
+FSYNC_ALWAYS = "always"
+FSYNC_NEVER = "never"
+
+logger = logging.getLogger(__name__)
+
+
+class OperationLog:
+    """
+    Append-only log of store mutations, one JSON record per line. A record can embed a member already encoded.
+    Records are buffered and written in groups so concurrent writers share a single flush.
+    The fsync policy is either `always`, `never` or an interval in milliseconds.
+    """
+
+    def __init__(self, location, fsync_policy=FSYNC_ALWAYS):
+        self._location = location
+        self._rotated_location = location + ".old"
+        self._policy, self._interval = self._parse_policy(fsync_policy)
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._appended_seq = 0
+        self._flushed_seq = 0
+        self._file = None
+        self._size = path.getsize(location) if path.exists(location) else 0
+        self._closed = threading.Event()
+        self._flusher = None
+        if self._interval:
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._flusher.start()
+
+    @staticmethod
+    def _parse_policy(fsync_policy):
+        if fsync_policy in (FSYNC_ALWAYS, FSYNC_NEVER):
+            return fsync_policy, 0
+        try:
+            interval = int(fsync_policy)
+        except (TypeError, ValueError):
+            raise ValueError("fsync policy must be `always`, `never` or an interval in milliseconds")
+        if interval <= 0:
+            return FSYNC_ALWAYS, 0
+        return None, interval / 1000
+
+    @property
+    def location(self):
+        return self._location
+
+    @property
+    def size(self):
+        return self._size
+
+    def append(self, record, encoded_member=None):
+        """
+        Buffers a record without writing it. With `encoded_member` given, the bytes are written
+        as the `member` field of the record instead of encoding the member again.
+        Returns:
+            Integer sequence number to pass to `commit`
+        """
+        if encoded_member is None:
+            line = json.dumps(record).encode() + b"\n"
+        else:
+            fields = json.dumps({name: value for name, value in record.items() if name != "member"}).encode()
+            line = b"".join((fields[:-1], b', "member": ', encoded_member, b"}\n"))
+        with self._buffer_lock:
+            self._buffer.append(line)
+            self._size += len(line)
+            self._appended_seq += 1
+            return self._appended_seq
+
+    def commit(self, seq):
+        """
+        Makes sure the record with the given sequence number has been written according to the fsync policy.
+        Writers that arrive while another flush is running are covered by the next single flush.
+        """
+        if self._interval or self._flushed_seq >= seq:
+            return
+        self._flush(self._policy == FSYNC_ALWAYS, seq)
+
+    def write(self, record):
+        self.commit(self.append(record))
+
+    def flush(self):
+        self._flush(self._policy != FSYNC_NEVER)
+
+    def _flush(self, sync, seq=None):
+        with self._flush_lock:
+            if seq is not None and self._flushed_seq >= seq:
+                return
+            with self._buffer_lock:
+                batch, self._buffer = self._buffer, []
+                last_seq = self._appended_seq
+            self._write(batch, sync)
+            self._flushed_seq = last_seq
+
+    def _write(self, batch, sync):
+        """
+        Writes a batch of records taken from the buffer. When writing fails the batch goes back to the head
+        of the buffer and the file is cut back to where the batch started, so the next flush writes it again.
+        """
+        if not batch:
+            return
+        data_file = self._open()
+        position = data_file.tell()
+        try:
+            data_file.write(b"".join(batch))
+            data_file.flush()
+            if sync:
+                fsync(data_file.fileno())
+        except IOError:
+            with self._buffer_lock:
+                self._buffer[:0] = batch
+            self._discard_file(position)
+            raise
+
+    def _discard_file(self, position):
+        try:
+            self._file.close()
+        except IOError:
+            pass
+        self._file = None
+        try:
+            truncate(self._location, position)
+        except IOError:
+            pass
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self._interval):
+            try:
+                self.flush()
+            except IOError:
+                logger.error("Operation log can't be written. Retrying on next interval")
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self._location, "ab")
+        return self._file
+
+    def replay(self):
+        """
+        Yields every complete record in the log, starting with a rotated log a failed snapshot left behind.
+        A trailing partial record left by a crash is ignored.
+        """
+        for location in (self._rotated_location, self._location):
+            if path.exists(location):
+                yield from self._read_records(location)
+
+    @staticmethod
+    def _read_records(location):
+        with open(location) as log_file:
+            for line in log_file:
+                if not line.endswith("\n"):
+                    return
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+
+    def rotate(self):
+        """
+        Moves every record written so far aside so new records start in a fresh file.
+        The rotated records stay replayable until `discard_rotated` is called once a snapshot covers them.
+        """
+        with self._flush_lock:
+            with self._buffer_lock:
+                batch, self._buffer = self._buffer, []
+                last_seq, size = self._appended_seq, self._size
+            self._write(batch, self._policy != FSYNC_NEVER)
+            with self._buffer_lock:
+                self._flushed_seq = last_seq
+                self._size -= size
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if not path.exists(self._location):
+                return
+            if path.exists(self._rotated_location):
+                with open(self._location, "rb") as current, open(self._rotated_location, "ab") as rotated:
+                    rotated.write(current.read())
+                remove(self._location)
+            else:
+                rename(self._location, self._rotated_location)
+
+    def discard_rotated(self):
+        if path.exists(self._rotated_location):
+            remove(self._rotated_location)
+
+    def remove(self):
+        self.discard_rotated()
+        if path.exists(self._location):
+            remove(self._location)
+
+    def close(self):
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
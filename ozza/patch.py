@@ -0,0 +1,73 @@
+from ozza.exceptions import InvalidPatchException
+from ozza.exceptions import PreconditionFailedException
+
+PATCH_OPERATIONS = ("set", "increment", "append")
+PATCH_FIELDS = set(PATCH_OPERATIONS) | {"expect", "expire_in"}
+PROTECTED_FIELDS = {"id", "created_at", "expiry_time"}
+NUMBER_TYPES = (int, float)
+
+
+def _is_number(value):
+    return isinstance(value, NUMBER_TYPES) and not isinstance(value, bool)
+
+
+def validate_patch(patch):
+    """
+    Checks a patch document before anything is read. A patch holds any of `set` (fields to merge, `null` removes
+    a field), `increment` (numbers added to numeric fields), `append` (items appended to list fields),
+    `expect` (field values the member must hold) and `expire_in` (the expiry of a member the patch creates).
+    """
+    if not isinstance(patch, dict) or not patch or set(patch) - PATCH_FIELDS:
+        raise InvalidPatchException("Patch must hold set, increment, append, expect or expire_in")
+    if not any(patch.get(operation) for operation in PATCH_OPERATIONS):
+        raise InvalidPatchException("Patch must hold at least one of set, increment or append")
+    fields = set()
+    for operation in PATCH_OPERATIONS + ("expect",):
+        changes = patch.get(operation, {})
+        if not isinstance(changes, dict):
+            raise InvalidPatchException("Patch {} must be an object".format(operation))
+        if operation == "expect":
+            continue
+        if PROTECTED_FIELDS & set(changes):
+            raise InvalidPatchException("Fields id, created_at and expiry_time cannot be patched")
+        if fields & set(changes):
+            raise InvalidPatchException("A field can only be changed by one operation of a patch")
+        fields.update(changes)
+    if not all(_is_number(amount) for amount in patch.get("increment", {}).values()):
+        raise InvalidPatchException("Increment takes numbers")
+    expiry = patch.get("expire_in", 0)
+    if not _is_number(expiry) or expiry < 0:
+        raise InvalidPatchException("Patch expire_in must be a positive number")
+
+
+def check_expected(member, expected):
+    """
+    Raises when a field of the member does not hold the expected value, `null` expects the field to be missing.
+    """
+    for field, value in (expected or {}).items():
+        if member.get(field) != value:
+            raise PreconditionFailedException("Field {} does not hold the expected value".format(field))
+
+
+def apply_patch(member, patch):
+    """
+    Returns a new member with the changes of the patch applied, the given member is left untouched.
+    A missing field is incremented from 0 and appended to as an empty list.
+    """
+    result = dict(member)
+    for field, value in patch.get("set", {}).items():
+        if value is None:
+            result.pop(field, None)
+        else:
+            result[field] = value
+    for field, amount in patch.get("increment", {}).items():
+        current = result.get(field, 0)
+        if not _is_number(current):
+            raise InvalidPatchException("Field {} is not a number".format(field))
+        result[field] = current + amount
+    for field, item in patch.get("append", {}).items():
+        current = result.get(field, [])
+        if not isinstance(current, list):
+            raise InvalidPatchException("Field {} is not a list".format(field))
+        result[field] = current + [item]
+    return result
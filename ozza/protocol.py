@@ -0,0 +1,57 @@
+import asyncio
+import json
+import struct
+
+from ozza import exceptions
+
+HEADER = struct.Struct(">I")
+RAW_ID = struct.Struct(">Q")
+RAW_FLAG = 1 << 31
+
+
+def encode_frame(message):
+    """
+    Encodes a message as a length-prefixed JSON frame.
+    """
+    payload = json.dumps(message).encode()
+    return HEADER.pack(len(payload)) + payload
+
+
+def encode_raw_frame(request_id, payload):
+    """
+    Encodes a response whose result is already encoded bytes. The length carries `RAW_FLAG`
+    and the payload is the request id followed by the bytes, sent as they are.
+    """
+    return HEADER.pack((RAW_ID.size + len(payload)) | RAW_FLAG) + RAW_ID.pack(request_id) + payload
+
+
+async def read_frame(reader):
+    """
+    Reads one frame from an asyncio stream. The result of a raw frame is the bytes it carries.
+    Returns:
+        Decoded message, None when the stream is closed
+    """
+    try:
+        length = HEADER.unpack(await reader.readexactly(HEADER.size))[0]
+        if length & RAW_FLAG:
+            request_id = RAW_ID.unpack(await reader.readexactly(RAW_ID.size))[0]
+            return dict(id=request_id, result=await reader.readexactly((length & ~RAW_FLAG) - RAW_ID.size))
+        payload = await reader.readexactly(length)
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        return None
+    return json.loads(payload.decode())
+
+
+def encode_error(error):
+    return dict(type=type(error).__name__, message=getattr(error, "message", str(error)),
+                status_code=getattr(error, "status_code", None))
+
+
+def decode_error(error):
+    """
+    Rebuilds the engine exception described by an error frame so callers can catch the usual exception types.
+    """
+    exception_class = getattr(exceptions, error.get("type"), None)
+    if exception_class is None or exception_class is exceptions.OzzaException:
+        return exceptions.OzzaException(error.get("message"), error.get("status_code"))
+    return exception_class(error.get("message"))
@@ -0,0 +1,235 @@
+import heapq
+import itertools
+import json
+from functools import cmp_to_key
+from functools import lru_cache
+
+from ozza.exceptions import InvalidQueryException
+from ozza.keyindex import compile_pattern
+from ozza.resource import id_sort_key
+from ozza.resource import index_key
+
+QUERY_CACHE_SIZE = 1024
+COMPARISON_OPERATORS = {"lt": "<", "lte": "<=", "gt": ">", "gte": ">="}
+OPERATORS = {"eq", "ne", "in", "between", "glob"} | set(COMPARISON_OPERATORS)
+NUMBER_TYPES = (int, float)
+
+
+def value_sort_key(value):
+    """
+    Orders field values of mixed types, numbers first, then strings, then missing values, then lists and objects.
+    """
+    if isinstance(value, (list, dict)):
+        return 3, json.dumps(value, sort_keys=True)
+    return id_sort_key(value)
+
+
+def _type_guard(variable, constant):
+    """
+    Range operators only compare values of the constant type, anything else does not match.
+    """
+    if isinstance(constant, bool) or not isinstance(constant, NUMBER_TYPES + (str,)):
+        raise InvalidQueryException("Range operators take a number or a string")
+    if isinstance(constant, str):
+        return "{}.__class__ is str".format(variable)
+    return "{}.__class__ in _numbers".format(variable)
+
+
+class _PredicateCompiler:
+    """
+    Turns a `where` tree into the source of one Python function. Every field is read once per member,
+    constants are passed in the function namespace instead of being written into the source.
+    """
+
+    def __init__(self):
+        self.namespace = dict(_numbers=NUMBER_TYPES, _key=index_key)
+        self.fields = {}
+
+    def _constant(self, value):
+        name = "_c{}".format(len(self.namespace))
+        self.namespace[name] = value
+        return name
+
+    def _field(self, field):
+        if not isinstance(field, str) or not field:
+            raise InvalidQueryException("Filter field must be a string")
+        if field not in self.fields:
+            self.fields[field] = "_v{}".format(len(self.fields))
+        return self.fields[field]
+
+    def expression(self, node):
+        if not isinstance(node, dict):
+            raise InvalidQueryException("Filter must be an object")
+        for condition, joiner in (("and", " and "), ("or", " or ")):
+            if condition in node:
+                children = node.get(condition)
+                if not isinstance(children, list) or not children:
+                    raise InvalidQueryException("`{}` takes a list of filters".format(condition))
+                return "(" + joiner.join(self.expression(child) for child in children) + ")"
+        if "field" not in node or "value" not in node:
+            raise InvalidQueryException()
+        operator, value = node.get("op", "eq"), node.get("value")
+        if operator not in OPERATORS:
+            raise InvalidQueryException("Unknown operator `{}`".format(operator))
+        variable = self._field(node.get("field"))
+        if operator == "eq":
+            return "({} == {})".format(variable, self._constant(value))
+        if operator == "ne":
+            return "({} != {})".format(variable, self._constant(value))
+        if operator == "in":
+            if not isinstance(value, list):
+                raise InvalidQueryException("`in` takes a list of values")
+            return "(_key({}) in {})".format(variable, self._constant({index_key(item) for item in value}))
+        if operator == "glob":
+            if not isinstance(value, str):
+                raise InvalidQueryException("`glob` takes a string pattern")
+            return "({}.__class__ is str and {}({}) is not None)".format(
+                variable, self._constant(compile_pattern(value)), variable)
+        if operator == "between":
+            if not isinstance(value, list) or len(value) != 2 or type(value[0]) is not type(value[1]):
+                raise InvalidQueryException("`between` takes a list of two values of the same type")
+            return "({} and {} <= {} <= {})".format(
+                _type_guard(variable, value[0]), self._constant(value[0]), variable, self._constant(value[1]))
+        return "({} and {} {} {})".format(
+            _type_guard(variable, value), variable, COMPARISON_OPERATORS.get(operator), self._constant(value))
+
+    def compile(self, where):
+        expression = self.expression(where)
+        lines = ["def predicate(member):", "    get = member.get"]
+        lines += ["    {} = get({})".format(variable, self._constant(field)) for field, variable in self.fields.items()]
+        lines.append("    return {}".format(expression))
+        exec("\n".join(lines), self.namespace)
+        return self.namespace.get("predicate")
+
+
+def compile_predicate(where):
+    """
+    Compiles a filter tree into a single function of a member. A filter is either
+    `{"field": <field>, "op": <operator>, "value": <value>}` or `{"and": [filters]}` / `{"or": [filters]}`.
+    Operators are eq (default), ne, lt, lte, gt, gte, between, in and glob.
+    """
+    return _PredicateCompiler().compile(where)
+
+
+def _sort_fields(sort):
+    if isinstance(sort, (str, dict)):
+        sort = [sort]
+    if not isinstance(sort, list):
+        raise InvalidQueryException("Sort must be a field or a list of fields")
+    fields = []
+    for item in sort:
+        if isinstance(item, str):
+            fields.append((item.lstrip("-"), item.startswith("-")))
+        elif isinstance(item, dict) and isinstance(item.get("field"), str):
+            fields.append((item.get("field"), item.get("order", "asc") == "desc"))
+        else:
+            raise InvalidQueryException("Sort field must be a string or `{\"field\": <field>, \"order\": asc|desc}`")
+    return fields
+
+
+class Query:
+    """
+    A compiled query: one fused predicate, the ids that can be read from the field indexes,
+    and the sort, limit and projection applied to the matching members.
+    """
+
+    def __init__(self, query):
+        if not isinstance(query, dict):
+            raise InvalidQueryException("Query must be an object")
+        where = query.get("where")
+        self.predicate = compile_predicate(where) if where else None
+        self.equalities = self._equalities(where) if where else []
+        self.sort = _sort_fields(query.get("sort")) if query.get("sort") else []
+        self.limit = query.get("limit")
+        if self.limit is not None and (not isinstance(self.limit, int) or self.limit < 0):
+            raise InvalidQueryException("Limit must be a positive number")
+        self.select = query.get("select")
+        if self.select is not None and not (
+                isinstance(self.select, list) and all(isinstance(field, str) for field in self.select)):
+            raise InvalidQueryException("Select must be a list of fields")
+
+    @staticmethod
+    def _equalities(where):
+        """
+        Returns the (field, values) pairs every matching member must satisfy, from the top level `and`.
+        """
+        nodes = where.get("and") if "and" in where else [where]
+        equalities = []
+        for node in nodes:
+            if "field" not in node:
+                continue
+            if node.get("op", "eq") == "eq":
+                equalities.append((node.get("field"), [node.get("value")]))
+            elif node.get("op") == "in":
+                equalities.append((node.get("field"), node.get("value")))
+        return equalities
+
+    def candidate_ids(self, resource):
+        """
+        Intersects the index lookups of the indexed equality filters, smallest first. None when no index applies.
+        """
+        id_sets = [set().union(*[resource.lookup(field, value) for value in values])
+                   for field, values in self.equalities if resource.is_indexed(field)]
+        if not id_sets:
+            return None
+        id_sets.sort(key=len)
+        ids = id_sets[0]
+        for id_set in id_sets[1:]:
+            if not ids:
+                break
+            ids = ids & id_set
+        return ids
+
+    def _sort_key(self):
+        sort = self.sort
+        if len(sort) == 1:
+            field = sort[0][0]
+            return lambda member: value_sort_key(member.get(field))
+        if len({descending for _, descending in sort}) == 1:
+            return lambda member: tuple(value_sort_key(member.get(field)) for field, _ in sort)
+
+        def compare(left, right):
+            for field, descending in sort:
+                left_key, right_key = value_sort_key(left.get(field)), value_sort_key(right.get(field))
+                if left_key != right_key:
+                    return (-1 if left_key < right_key else 1) * (-1 if descending else 1)
+            return 0
+        return cmp_to_key(compare)
+
+    def run(self, members):
+        """
+        Visits every candidate member once. Without sort the scan stops at the limit,
+        with sort and limit only the top members are kept in a heap.
+        """
+        matched = members if self.predicate is None else filter(self.predicate, members)
+        if self.sort:
+            key = self._sort_key()
+            mixed = len({descending for _, descending in self.sort}) > 1
+            descending = self.sort[0][1] and not mixed
+            if self.limit is None:
+                matched = sorted(matched, key=key, reverse=descending)
+            elif descending:
+                matched = heapq.nlargest(self.limit, matched, key=key)
+            else:
+                matched = heapq.nsmallest(self.limit, matched, key=key)
+        elif self.limit is not None:
+            matched = itertools.islice(matched, self.limit)
+        if self.select is None:
+            return list(matched)
+        select = self.select
+        return [{field: member.get(field) for field in select if field in member} for member in matched]
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _compile_query(encoded_query):
+    return Query(json.loads(encoded_query))
+
+
+def compile_query(query):
+    """
+    Returns the compiled query, compiled queries are cached with LRU eviction.
+    """
+    try:
+        return _compile_query(json.dumps(query, sort_keys=True))
+    except TypeError:
+        raise InvalidQueryException("Query must be JSON")
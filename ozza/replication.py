@@ -0,0 +1,266 @@
+import asyncio
+import itertools
+import threading
+import time
+import uuid
+from collections import deque
+
+from ozza.binary import LazyEntry
+from ozza.compact import FrozenMembers
+from ozza.protocol import encode_frame
+from ozza.protocol import read_frame
+from ozza.resource import MemberList
+
+DEFAULT_BACKLOG_SIZE = 100000
+STREAM_BATCH_SIZE = 1000
+SYNC_CHUNK_SIZE = 1000
+PING_INTERVAL = 1
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+class ReplicationLog:
+    """
+    Backlog of the last operation records of the leader, numbered by a replication offset.
+    Records are appended under the engine lock, so offsets follow the order the mutations were applied in.
+    A follower that reconnects with an offset still in the backlog only receives the records it missed.
+    """
+
+    def __init__(self, size=DEFAULT_BACKLOG_SIZE):
+        self.replication_id = uuid.uuid4().hex
+        self.offset = 0
+        self._records = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._listeners = set()
+
+    def append(self, record):
+        with self._lock:
+            self.offset += 1
+            self._records.append(record)
+        for listener in list(self._listeners):
+            listener()
+
+    def read_after(self, offset, limit):
+        """
+        Returns up to `limit` records following the offset, walking the backlog from its end.
+        Returns None when the records following the offset are no longer in the backlog.
+        """
+        with self._lock:
+            missing = self.offset - offset
+            if missing < 0 or missing > len(self._records):
+                return None
+            records = list(itertools.islice(reversed(self._records), missing))
+        records.reverse()
+        return records[:limit]
+
+    def subscribe(self, listener):
+        self._listeners.add(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.discard(listener)
+
+
+class ReplicationLeader:
+    """
+    Serves the mutations of an engine to followers over TCP. A follower sends the replication id and offset
+    it holds. When they can be continued from the backlog it only gets the missing records,
+    otherwise it first gets a full sync of the data as of an offset, then every record after it.
+    Each connection pushes records as they are logged and pings with the current offset while idle.
+    """
+
+    def __init__(self, engine, host, port, backlog_size=DEFAULT_BACKLOG_SIZE):
+        self._engine = engine
+        self._host = host
+        self._port = port
+        self._log = ReplicationLog(backlog_size)
+        self._server = None
+        self._followers = []
+        self._connections = set()
+        engine.replication_log = self._log
+        engine.replication = self
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1] if self._server is not None else self._port
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve_follower, self._host, self._port)
+        return self._server
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            [connection.cancel() for connection in self._connections]
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+
+    def status(self):
+        return dict(role="leader", replication_id=self._log.replication_id, offset=self._log.offset,
+                    followers=[dict(follower) for follower in self._followers])
+
+    async def _serve_follower(self, reader, writer):
+        handshake = await read_frame(reader)
+        if handshake is None:
+            writer.close()
+            return
+        peer = writer.get_extra_info("peername")
+        follower = dict(address="{}:{}".format(*peer[:2]) if peer else None, offset=0)
+        loop = asyncio.get_event_loop()
+        wake = asyncio.Event()
+
+        def notify():
+            if not wake.is_set():
+                loop.call_soon_threadsafe(wake.set)
+
+        self._followers.append(follower)
+        self._connections.add(asyncio.current_task())
+        self._log.subscribe(notify)
+        try:
+            offset = handshake.get("offset") or 0
+            if handshake.get("replication_id") != self._log.replication_id or \
+                    self._log.read_after(offset, 0) is None:
+                offset = await self._full_sync(writer)
+            else:
+                writer.write(encode_frame(dict(type="continue", offset=offset, leader_offset=self._log.offset)))
+            while True:
+                follower["offset"] = offset
+                wake.clear()
+                records = self._log.read_after(offset, STREAM_BATCH_SIZE)
+                if records is None:
+                    offset = await self._full_sync(writer)
+                elif records:
+                    offset += len(records)
+                    writer.write(encode_frame(dict(type="ops", records=records, offset=offset,
+                                                   leader_offset=self._log.offset)))
+                    await writer.drain()
+                else:
+                    try:
+                        await asyncio.wait_for(wake.wait(), PING_INTERVAL)
+                    except asyncio.TimeoutError:
+                        writer.write(encode_frame(dict(type="ping", leader_offset=self._log.offset)))
+                        await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._log.unsubscribe(notify)
+            self._followers.remove(follower)
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def _full_sync(self, writer):
+        """
+        Sends every key as of the offset the data was captured at, resources in chunks of members.
+        Returns:
+            Integer offset the follower continues from
+        """
+        loop = asyncio.get_event_loop()
+        data, offset = await loop.run_in_executor(None, self._engine.capture_replica)
+        writer.write(encode_frame(dict(type="sync", replication_id=self._log.replication_id, offset=offset)))
+        for key, value in data.items():
+            if isinstance(value, LazyEntry):
+                value = value.load()
+            if not isinstance(value, (MemberList, FrozenMembers)):
+                writer.write(encode_frame(dict(type="key", key=key, kind="value", value=value)))
+                await writer.drain()
+                continue
+            members = iter(value)
+            chunk = list(itertools.islice(members, SYNC_CHUNK_SIZE))
+            while True:
+                writer.write(encode_frame(dict(type="key", key=key, kind="resource", members=chunk)))
+                await writer.drain()
+                chunk = list(itertools.islice(members, SYNC_CHUNK_SIZE))
+                if not chunk:
+                    break
+        writer.write(encode_frame(dict(type="synced", offset=offset, leader_offset=self._log.offset)))
+        await writer.drain()
+        return offset
+
+
+class ReplicationFollower:
+    """
+    Keeps a read-only engine in sync with a leader. Received records are applied and logged like local
+    mutations, so the follower persists the data and serves reads like any store.
+    The connection is retried every `retry_interval` seconds, continuing from the offset held when possible.
+    """
+
+    def __init__(self, engine, leader, retry_interval=1):
+        self._engine = engine
+        self._leader = leader
+        self._host, self._port = parse_address(leader)
+        self._retry_interval = retry_interval
+        self._task = None
+        self.replication_id = None
+        self.offset = 0
+        self.leader_offset = 0
+        self.connected = False
+        self.full_syncs = 0
+        self._caught_up_at = None
+        engine.replication = self
+
+    async def start(self):
+        self._engine.become_replica()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def status(self):
+        lag_operations = max(0, self.leader_offset - self.offset)
+        caught_up = self.connected and self._caught_up_at is not None and not lag_operations
+        lag_seconds = 0 if caught_up else time.time() - (self._caught_up_at or time.time())
+        return dict(role="follower", leader=self._leader, connected=self.connected,
+                    replication_id=self.replication_id, offset=self.offset, leader_offset=self.leader_offset,
+                    lag_operations=lag_operations, lag_seconds=round(lag_seconds, 3), full_syncs=self.full_syncs)
+
+    async def _run(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self._host, self._port)
+            except OSError:
+                await asyncio.sleep(self._retry_interval)
+                continue
+            self.connected = True
+            try:
+                writer.write(encode_frame(dict(replication_id=self.replication_id, offset=self.offset)))
+                await self._receive(reader)
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                self.connected = False
+                writer.close()
+            await asyncio.sleep(self._retry_interval)
+
+    async def _receive(self, reader):
+        loop = asyncio.get_event_loop()
+        synced_data = None
+        while True:
+            message = await read_frame(reader)
+            if message is None:
+                return
+            message_type = message.get("type")
+            if message_type == "sync":
+                synced_data = {}
+                self.replication_id = message.get("replication_id")
+                self.offset = 0
+            elif message_type == "key" and message.get("kind") == "resource":
+                synced_data.setdefault(message.get("key"), MemberList()).extend(message.get("members"))
+            elif message_type == "key":
+                synced_data[message.get("key")] = message.get("value")
+            elif message_type == "synced":
+                await loop.run_in_executor(None, self._engine.load_replica, synced_data)
+                synced_data = None
+                self.offset = message.get("offset")
+                self.full_syncs += 1
+            elif message_type == "ops":
+                await loop.run_in_executor(None, self._engine.apply_replicated, message.get("records"))
+                self.offset = message.get("offset")
+            if synced_data is None:
+                self.leader_offset = max(message.get("leader_offset", 0), self.offset)
+                if self.offset >= self.leader_offset:
+                    self._caught_up_at = time.time()
@@ -0,0 +1,365 @@
+import itertools
+import json
+
+from ozza.columns import ColumnMembers
+from ozza.compact import CompactMembers
+from ozza.encoding import encode_value
+from ozza.memory import INDEX_ENTRY_SIZE
+from ozza.memory import encoded_size
+from ozza.memory import member_size
+from ozza.sortedkeys import SortedKeys
+
+
+def stringify_values(member):
+    return [value if type(value) is str else str(value) for value in member.values()]
+
+
+class MemberList(list):
+    """
+    List form of a resource in a snapshot. Tells the members of a resource apart from a plain list value.
+    `encoded` holds the encoded members in the same order when they are known.
+    """
+    encoded = None
+
+
+def flatten_groups(groups):
+    """
+    Joins the values of [key, value] groups into one list. Member lists are concatenated, plain values appended.
+    """
+    data = []
+    for _, value in groups:
+        if isinstance(value, list):
+            data.extend(value)
+        else:
+            data.append(value)
+    return data
+
+
+def page_from_entries(entries, limit):
+    """
+    Cuts page entries fetched with one entry over the limit down to a page.
+    Member entries are `[key, id, member]` and plain value entries `[key, value]`,
+    the cursor of an entry is its key and member id.
+    Returns:
+        Dictionary with the items of the page and the cursor of the next page, None on the last page
+    """
+    if len(entries) <= limit:
+        return dict(result=[entry[-1] for entry in entries], cursor=None)
+    entries = entries[:limit]
+    return dict(result=[entry[-1] for entry in entries], cursor=entries[-1][:-1])
+
+
+def id_sort_key(id_value):
+    """
+    Orders member ids of mixed types, numbers first, then strings, then null.
+    """
+    if id_value is None:
+        return 2, 0
+    if isinstance(id_value, str):
+        return 1, id_value
+    return 0, id_value
+
+
+def index_key(value):
+    """
+    Returns a hashable key for a field value. Unhashable values (lists and dictionaries) are keyed by their JSON form.
+    """
+    if isinstance(value, (list, dict)):
+        return "__json__", json.dumps(value, sort_keys=True)
+    return value
+
+
+class ValueIndex:
+    """
+    Inverted index from the stringified field values of the members to their ids.
+    Distinct values are also kept sorted so prefix queries only visit the values sharing the prefix.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._values = SortedKeys()
+
+    def add(self, id_value, member):
+        for value in set(stringify_values(member)):
+            bucket = self._ids.get(value)
+            if bucket is None:
+                bucket = self._ids[value] = {}
+                self._values.add(value)
+            bucket[id_value] = None
+
+    def remove(self, id_value, member):
+        for value in set(stringify_values(member)):
+            bucket = self._ids.get(value)
+            if bucket is None:
+                continue
+            bucket.pop(id_value, None)
+            if not bucket:
+                del self._ids[value]
+                self._values.discard(value)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def lookup(self, value):
+        return set(self._ids.get(value, ()))
+
+    def lookup_prefix(self, prefix):
+        ids = set()
+        for value in self._values.irange(prefix, inclusive=True):
+            if not value.startswith(prefix):
+                break
+            ids.update(self._ids.get(value, ()))
+        return ids
+
+
+class Resource:
+    """
+    Member container of a resource. Members are kept in a mapping keyed by their `id` value,
+    which gives constant time lookups, upserts and deletes while keeping insertion order.
+    The mapping is `CompactMembers` unless `compact` is off, then members are plain dicts.
+    Fields can be indexed with a hash index from field value to the ids of the members holding it.
+    The member mapping can be swapped for a columnar store with `create_columns`.
+    Unless `encoded` is off, the JSON bytes of every member are kept next to it, encoded once when it is written.
+    They are kept in the same order as the members and serve reads and snapshots without encoding again.
+    `memory_size` keeps an estimate of the bytes held by the members, see `ozza.memory`.
+    """
+
+    def __init__(self, members=None, compact=True, encoded=True):
+        self.compact = compact
+        self._members = CompactMembers() if compact else {}
+        self._encoded = {} if encoded else None
+        self._expiring = {}
+        self._sequence = {}
+        self._next_sequence = 0
+        self._field_counts = {}
+        self._indexes = {}
+        self._value_index = None
+        self._sorted_ids = None
+        self.memory_size = 0
+        for member, encoded_member in zip(members or [], getattr(members, "encoded", None) or itertools.repeat(None)):
+            self.put(member, encoded_member)
+
+    @staticmethod
+    def is_resource_data(value):
+        """
+        Checks whether a stored value is the list form of a resource, a list of dictionaries with `id` field.
+        """
+        return isinstance(value, list) and all(isinstance(item, dict) and "id" in item for item in value)
+
+    def __len__(self):
+        return len(self._members)
+
+    def __iter__(self):
+        return iter(self.members())
+
+    @property
+    def expiring_count(self):
+        return len(self._expiring)
+
+    def __contains__(self, id_value):
+        return id_value in self._members
+
+    def get(self, id_value):
+        return self._members.get(id_value)
+
+    def put(self, member, encoded_member=None):
+        """
+        Inserts the member or replaces the member with the same `id`. A replaced member keeps its position.
+        `encoded_member` is the encoded form of the member when the caller already has it.
+        """
+        id_value = member.get("id")
+        if self._encoded is not None:
+            previous = self._encoded.get(id_value)
+            if previous is not None:
+                self.memory_size -= encoded_size(previous)
+            encoded_member = self._encoded[id_value] = encoded_member or encode_value(member)
+            self.memory_size += encoded_size(encoded_member)
+        current_member = self._members.get(id_value)
+        if current_member is not None:
+            self._unindex(id_value, current_member)
+            self.memory_size -= member_size(current_member, self.compact)
+        else:
+            self._sequence[id_value] = self._next_sequence
+            self._next_sequence += 1
+            if self._sorted_ids is not None:
+                self._sorted_ids.add(id_sort_key(id_value))
+        self._members[id_value] = member
+        self.memory_size += member_size(member, self.compact)
+        self._index(id_value, member)
+
+    def remove(self, id_value):
+        member = self._members.pop(id_value, None)
+        if member is None:
+            return False
+        del self._sequence[id_value]
+        if self._encoded is not None:
+            self.memory_size -= encoded_size(self._encoded.pop(id_value))
+        if self._sorted_ids is not None:
+            self._sorted_ids.discard(id_sort_key(id_value))
+        self._unindex(id_value, member)
+        self.memory_size -= member_size(member, self.compact)
+        return True
+
+    def ids(self):
+        return list(self._members.keys())
+
+    def members(self):
+        return list(self._members.values())
+
+    def encoded(self, id_value, now=None):
+        """
+        Returns the encoded member, None when it is missing or expired at `now`, in unix milliseconds.
+        """
+        expiry_time = self._expiring.get(id_value)
+        if now is not None and expiry_time and now >= expiry_time:
+            return None
+        if self._encoded is not None:
+            return self._encoded.get(id_value)
+        member = self._members.get(id_value)
+        return encode_value(member) if member is not None else None
+
+    def encoded_members(self, now=None):
+        """
+        Returns the encoded members in resource order, without the members expired at `now`, in unix milliseconds.
+        """
+        expired = set()
+        if now is not None and self._expiring:
+            expired = {id_value for id_value, expiry_time in list(self._expiring.items()) if now >= expiry_time}
+        if self._encoded is None:
+            return [encode_value(member) for id_value, member in list(self._members.items()) if id_value not in expired]
+        if not expired:
+            return list(self._encoded.values())
+        return [encoded_member for id_value, encoded_member in list(self._encoded.items()) if id_value not in expired]
+
+    def capture(self):
+        """
+        Returns the members as they are now for a snapshot, cheap enough to call under the engine lock.
+        """
+        if isinstance(self._members, CompactMembers):
+            members = self._members.frozen()
+        else:
+            members = MemberList(self._members.values())
+        if self._encoded is not None:
+            members.encoded = list(self._encoded.values())
+        return members
+
+    def memory_usage(self):
+        """
+        Returns the approximate bytes held by the members and their indexes.
+        """
+        entries = len(self._members) * len(self._indexes)
+        if self._value_index is not None:
+            entries += sum(self._field_counts.values())
+        if self._sorted_ids is not None:
+            entries += len(self._sorted_ids)
+        entries += len(self._expiring)
+        return self.memory_size + entries * INDEX_ENTRY_SIZE
+
+    def members_after(self, after_key=None):
+        """
+        Yields the members in id order, starting after the member whose `id_sort_key` is `after_key`.
+        The sorted ids are built on the first call and kept up to date from then on.
+        """
+        if self._sorted_ids is None:
+            self._sorted_ids = SortedKeys(id_sort_key(id_value) for id_value in list(self._members))
+        for rank, id_value in self._sorted_ids.irange(after_key):
+            member = self._members.get(id_value if rank < 2 else None)
+            if member is not None:
+                yield member
+
+    def has_field(self, field):
+        return self._field_counts.get(field, 0) > 0
+
+    def fields(self):
+        return list(self._field_counts.keys())
+
+    def create_index(self, field):
+        if field in self._indexes:
+            return
+        index = self._indexes[field] = {}
+        for id_value, member in self._members.items():
+            index.setdefault(index_key(member.get(field)), {})[id_value] = None
+
+    def drop_index(self, field):
+        self._indexes.pop(field, None)
+
+    def is_indexed(self, field):
+        return field in self._indexes
+
+    def index_sizes(self):
+        """
+        Returns the number of distinct values of every field index.
+        """
+        return {field: len(index) for field, index in self._indexes.items()}
+
+    def create_value_index(self):
+        if self._value_index is not None:
+            return
+        self._value_index = ValueIndex()
+        for id_value, member in self._members.items():
+            self._value_index.add(id_value, member)
+
+    def drop_value_index(self):
+        self._value_index = None
+
+    @property
+    def value_index(self):
+        return self._value_index
+
+    def create_columns(self):
+        """
+        Moves the members into a columnar store. Members are rebuilt as dictionaries when read.
+        """
+        if not isinstance(self._members, ColumnMembers):
+            self._members = ColumnMembers(self._members)
+
+    def drop_columns(self):
+        if isinstance(self._members, ColumnMembers):
+            self._members = CompactMembers(self._members) if self.compact else dict(self._members.items())
+
+    @property
+    def columns(self):
+        return self._members if isinstance(self._members, ColumnMembers) else None
+
+    def lookup(self, field, value):
+        """
+        Returns the set of ids whose field equals the value, using the field index.
+        """
+        return set(self._indexes[field].get(index_key(value), ()))
+
+    def members_by_ids(self, ids):
+        """
+        Returns the members with the given ids in resource order.
+        """
+        if len(ids) * 8 > len(self._members):
+            return [member for id_value, member in list(self._members.items()) if id_value in ids]
+        sequence = self._sequence
+        ordered = sorted(ids, key=lambda id_value: sequence.get(id_value, -1))
+        return [member for member in (self._members.get(id_value) for id_value in ordered) if member is not None]
+
+    def _index(self, id_value, member):
+        if member.get("expiry_time"):
+            self._expiring[id_value] = member.get("expiry_time")
+        for field in member:
+            self._field_counts[field] = self._field_counts.get(field, 0) + 1
+        for field, index in self._indexes.items():
+            index.setdefault(index_key(member.get(field)), {})[id_value] = None
+        if self._value_index is not None:
+            self._value_index.add(id_value, member)
+
+    def _unindex(self, id_value, member):
+        if member.get("expiry_time"):
+            self._expiring.pop(id_value, None)
+        for field in member:
+            self._field_counts[field] -= 1
+            if not self._field_counts[field]:
+                del self._field_counts[field]
+        for field, index in self._indexes.items():
+            value_key = index_key(member.get(field))
+            bucket = index.get(value_key)
+            if bucket is not None:
+                bucket.pop(id_value, None)
+                if not bucket:
+                    del index[value_key]
+        if self._value_index is not None:
+            self._value_index.remove(id_value, member)
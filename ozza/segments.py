@@ -0,0 +1,85 @@
+import json
+import zlib
+from os import listdir
+from os import makedirs
+from os import path
+from os import remove
+from os import rmdir
+
+from ozza.binary import BinarySnapshot
+from ozza.binary import write_binary_snapshot
+from ozza.snapshot import write_snapshot
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+class SegmentStore:
+    """
+    Storage layout splitting the keys over hash buckets, each bucket in its own binary segment file,
+    plus a manifest listing the current file of every bucket. A snapshot only rewrites the segments
+    of the buckets whose keys changed. The manifest is replaced atomically and is the commit point,
+    segment files it no longer lists are removed afterwards.
+    """
+
+    def __init__(self, directory, segment_count=64):
+        self._directory = directory
+        self._manifest_location = path.join(directory, MANIFEST_FILENAME)
+        self._manifest = dict(segment_count=segment_count, generation=0, segments={})
+        if self.exists():
+            with open(self._manifest_location) as manifest:
+                self._manifest = json.load(manifest)
+
+    @property
+    def segment_count(self):
+        return self._manifest.get("segment_count")
+
+    def exists(self):
+        return path.exists(self._manifest_location)
+
+    def bucket_for(self, key):
+        return zlib.crc32(key.encode()) % self.segment_count
+
+    def load(self):
+        """
+        Opens every segment listed in the manifest. Only the segment directories are read,
+        the keys are returned as `LazyEntry` placeholders.
+        """
+        data = {}
+        for filename in self._manifest.get("segments").values():
+            data.update(BinarySnapshot(path.join(self._directory, filename)).entries())
+        return data
+
+    def write(self, data, buckets=None):
+        """
+        Writes the segments of the given buckets from the data, which must hold every key of those buckets.
+        Buckets left without keys are dropped from the manifest. When no buckets are given every segment is rewritten.
+        """
+        makedirs(self._directory, exist_ok=True)
+        segments = dict(self._manifest.get("segments"))
+        generation = self._manifest.get("generation") + 1
+        if buckets is None:
+            buckets = set(range(self.segment_count))
+        grouped = {}
+        for key, value in data.items():
+            grouped.setdefault(self.bucket_for(key), {})[key] = value
+        replaced = []
+        for bucket in buckets:
+            if str(bucket) in segments:
+                replaced.append(segments.pop(str(bucket)))
+            if grouped.get(bucket):
+                filename = "segment-{:04d}-{}.ozs".format(bucket, generation)
+                write_binary_snapshot(path.join(self._directory, filename), grouped.get(bucket))
+                segments[str(bucket)] = filename
+        manifest = dict(segment_count=self.segment_count, generation=generation, segments=segments)
+        write_snapshot(self._manifest_location, manifest)
+        self._manifest = manifest
+        for filename in replaced:
+            if path.exists(path.join(self._directory, filename)):
+                remove(path.join(self._directory, filename))
+
+    def remove(self):
+        if not path.isdir(self._directory):
+            return
+        for filename in listdir(self._directory):
+            remove(path.join(self._directory, filename))
+        rmdir(self._directory)
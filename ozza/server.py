@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+from os import environ
+from os import path
+from os import remove
+
+from ozza import Ozza
+from ozza.async_engine import FEED_METHODS
+from ozza.async_engine import AsyncOzza
+from ozza.exceptions import OzzaException
+from ozza.protocol import encode_error
+from ozza.protocol import encode_frame
+from ozza.protocol import encode_raw_frame
+from ozza.protocol import read_frame
+from ozza.replication import DEFAULT_BACKLOG_SIZE
+from ozza.replication import ReplicationFollower
+from ozza.replication import ReplicationLeader
+
+
+class StoreServer:
+    """
+    Storage owner process. Holds the only `Ozza` instance and serves it to the HTTP workers over a Unix socket.
+    Requests are pipelined, a client can send many requests before reading the responses, which carry
+    the request `id`. Requests go through `AsyncOzza`, so scans and writes never hold up point reads.
+    Results that are already encoded bytes are sent in raw frames without another encoding.
+    A `ReplicationLeader` or `ReplicationFollower` given is started and stopped with the server.
+    """
+
+    def __init__(self, engine, socket_path, replication=None):
+        self._engine = AsyncOzza(engine)
+        self._socket_path = socket_path
+        self._replication = replication
+        self._server = None
+
+    async def start(self):
+        if path.exists(self._socket_path):
+            remove(self._socket_path)
+        self._server = await asyncio.start_unix_server(self._serve_connection, path=self._socket_path)
+        if self._replication is not None:
+            await self._replication.start()
+        return self._server
+
+    async def serve_forever(self):
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+    async def stop(self):
+        if self._replication is not None:
+            await self._replication.stop()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self._engine.close()
+        if path.exists(self._socket_path):
+            remove(self._socket_path)
+
+    async def _serve_connection(self, reader, writer):
+        pending = set()
+        polls = set()
+        while True:
+            request = await read_frame(reader)
+            if request is None:
+                break
+            task = asyncio.ensure_future(self._handle(request, writer))
+            tasks = polls if request.get("method") in FEED_METHODS else pending
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        [task.cancel() for task in polls]
+        if pending or polls:
+            await asyncio.wait(pending | polls)
+        writer.close()
+
+    async def _handle(self, request, writer):
+        try:
+            result = await self._engine.call(request.get("method"), *request.get("args", []),
+                                             **request.get("kwargs", {}))
+            response = dict(id=request.get("id"), result=result)
+        except Exception as error:
+            response = dict(id=request.get("id"), error=encode_error(error))
+        try:
+            if isinstance(response.get("result"), bytes):
+                frame = encode_raw_frame(response.get("id"), response.get("result"))
+            else:
+                frame = encode_frame(response)
+        except (TypeError, ValueError) as error:
+            frame = encode_frame(dict(id=request.get("id"), error=encode_error(OzzaException(str(error), 500))))
+        writer.write(frame)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ozza storage owner process")
+    parser.add_argument("--socket", default=environ.get("STORE_SOCKET", "/tmp/ozza.sock"))
+    parser.add_argument("--replication-host", default=environ.get("REPLICATION_HOST", "0.0.0.0"))
+    parser.add_argument("--replication-port", type=int, default=environ.get("REPLICATION_PORT"),
+                        help="Serve the mutations to followers on this port")
+    parser.add_argument("--replication-backlog", type=int,
+                        default=int(environ.get("REPLICATION_BACKLOG", DEFAULT_BACKLOG_SIZE)))
+    parser.add_argument("--replicate-from", default=environ.get("REPLICATE_FROM"),
+                        help="Run as a read-only follower of the leader at host:port")
+    arguments = parser.parse_args()
+    engine = Ozza()
+    replication = None
+    if arguments.replicate_from:
+        replication = ReplicationFollower(engine, arguments.replicate_from)
+        print("Ozza store replicating from {}".format(arguments.replicate_from))
+    elif arguments.replication_port is not None:
+        replication = ReplicationLeader(engine, arguments.replication_host, arguments.replication_port,
+                                        arguments.replication_backlog)
+        print("Ozza store serving followers at {}:{}".format(arguments.replication_host,
+                                                               arguments.replication_port))
+    server = StoreServer(engine, arguments.socket, replication)
+    print("Ozza store serving at {}".format(arguments.socket))
+    try:
+        asyncio.get_event_loop().run_until_complete(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import heapq
+import itertools
+import multiprocessing
+import zlib
+from os import environ
+
+from ozza import Ozza
+from ozza.client import OzzaClient
+from ozza.encoding import encode_value
+from ozza.exceptions import OzzaException
+from ozza.keyindex import is_pattern
+from ozza.metrics import merge_snapshots
+from ozza.resource import flatten_groups
+from ozza.resource import page_from_entries
+from ozza.server import StoreServer
+
+BROADCAST_METHODS = {"expiry_stats", "eviction_stats", "save_snapshot"}
+
+
+def shard_for(key, shard_count):
+    """
+    Returns the shard owning a key. The hash is stable across processes and restarts.
+    """
+    return zlib.crc32(key.encode()) % shard_count
+
+
+def shard_socket_path(socket_path, shard):
+    return "{}.{}".format(socket_path, shard)
+
+
+def shard_filename(filename, shard):
+    return "shard{}_{}".format(shard, filename)
+
+
+class ShardRouter:
+    """
+    Client of a hash partitioned store. Single key operations go to the shard owning the key,
+    wildcard resource lookups are sent to every shard and merged in key order.
+    """
+
+    def __init__(self, socket_path, shard_count):
+        self._clients = [OzzaClient(shard_socket_path(socket_path, shard)) for shard in range(shard_count)]
+
+    def client_for(self, key):
+        return self._clients[shard_for(key, len(self._clients))]
+
+    async def call(self, method, *args, **kwargs):
+        if method in BROADCAST_METHODS:
+            results = await asyncio.gather(*[client.call(method, *args, **kwargs) for client in self._clients])
+            return self._combine(method, results)
+        if method in ("wait_changes", "changes_after"):
+            raise OzzaException("Change feeds of sharded stores are not supported", 400)
+        if method == "replication_status":
+            results = await asyncio.gather(*[client.call(method, *args, **kwargs) for client in self._clients])
+            return dict(role="sharded", shards=results)
+        if method == "metrics":
+            results = await asyncio.gather(*[client.call(method, *args, **kwargs) for client in self._clients])
+            return merge_snapshots(results, label="shard")
+        if method in ("get_resource", "get_resource_groups") and args and is_pattern(args[0]):
+            groups = await self._gather_groups(args[0])
+            return groups if method == "get_resource_groups" else flatten_groups(groups)
+        if method == "get_resource_encoded" and args and is_pattern(args[0]):
+            return encode_value(flatten_groups(await self._gather_groups(args[0])))
+        if method == "get_version" and args and is_pattern(args[0]):
+            versions = await asyncio.gather(*[client.call(method, *args, **kwargs) for client in self._clients])
+            return ".".join(versions)
+        if method == "memory_usage" and args and is_pattern(args[0]):
+            results = await asyncio.gather(*[client.call(method, *args, **kwargs) for client in self._clients])
+            keys = dict(sorted(itertools.chain.from_iterable(result.get("keys").items() for result in results)))
+            return dict(keys=keys, total=sum(result.get("total") for result in results))
+        if method in ("get_resource_page", "get_resource_page_entries") and args and is_pattern(args[0]):
+            return await self._gather_page(method, *args, **kwargs)
+        return await self.client_for(args[0]).call(method, *args, **kwargs)
+
+    async def _gather_groups(self, pattern):
+        results = await asyncio.gather(*[client.call("get_resource_groups", pattern) for client in self._clients])
+        return list(heapq.merge(*results, key=lambda group: group[0]))
+
+    async def _gather_page(self, method, pattern, limit, cursor=None):
+        """
+        Every shard returns its first entries after the cursor, the page is the first of them in key order.
+        """
+        fetched = limit + 1 if method == "get_resource_page" else limit
+        results = await asyncio.gather(*[client.call("get_resource_page_entries", pattern, fetched, cursor)
+                                         for client in self._clients])
+        entries = list(itertools.islice(heapq.merge(*results, key=lambda entry: entry[0]), fetched))
+        return page_from_entries(entries, limit) if method == "get_resource_page" else entries
+
+    @staticmethod
+    def _combine(method, results):
+        if method == "save_snapshot":
+            return any(results)
+        combined = {}
+        for result in results:
+            for name, value in result.items():
+                if name == "last_run_ms":
+                    combined[name] = max(combined.get(name, 0), value)
+                else:
+                    combined[name] = combined.get(name, 0) + value
+        return combined
+
+    async def close(self):
+        await asyncio.gather(*[client.close() for client in self._clients])
+
+
+def serve_shard(socket_path, shard, filename):
+    engine = Ozza(data_filename=shard_filename(filename, shard))
+    server = StoreServer(engine, shard_socket_path(socket_path, shard))
+    try:
+        asyncio.get_event_loop().run_until_complete(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ozza hash partitioned store, one process per shard")
+    parser.add_argument("--socket", default=environ.get("STORE_SOCKET", "/tmp/ozza.sock"))
+    parser.add_argument("--shards", type=int, default=int(environ.get("STORE_SHARDS", multiprocessing.cpu_count())))
+    arguments = parser.parse_args()
+    filename = environ.get("DATA_FILENAME", Ozza._data_filename)
+    processes = [multiprocessing.Process(target=serve_shard, args=(arguments.socket, shard, filename))
+                 for shard in range(arguments.shards)]
+    [process.start() for process in processes]
+    print("Ozza store serving {} shards at {}.*".format(arguments.shards, arguments.socket))
+    try:
+        [process.join() for process in processes]
+    except KeyboardInterrupt:
+        [process.join() for process in processes]
+
+
+if __name__ == "__main__":
+    main()
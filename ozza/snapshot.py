@@ -0,0 +1,83 @@
+import json
+import logging
+import threading
+import time
+from os import fsync
+from os import replace
+
+DEFAULT_SAVE_RULES = "900:1,300:10,60:10000"
+
+logger = logging.getLogger(__name__)
+
+
+def parse_save_rules(rules):
+    """
+    Parses snapshot rules written as `seconds:changes` pairs separated by commas.
+    `60:1000` means a snapshot is taken when 60 seconds have passed and at least 1000 operations happened.
+    Returns:
+        List of (seconds, changes) tuples
+    """
+    parsed = []
+    for rule in rules.split(","):
+        if not rule.strip():
+            continue
+        seconds, changes = rule.split(":")
+        parsed.append((int(seconds), int(changes)))
+    return parsed
+
+
+def write_snapshot(location, data):
+    """
+    Writes the data into a temporary file and renames it into place, so a crash mid-write
+    never leaves a truncated snapshot behind.
+    """
+    temp_location = location + ".tmp"
+    with open(temp_location, "w") as snapshot:
+        json.dump(data, snapshot)
+        snapshot.flush()
+        fsync(snapshot.fileno())
+    replace(temp_location, location)
+
+
+class SnapshotWorker:
+    """
+    Background thread saving a snapshot of the engine when one of the save rules is met
+    or when a snapshot is explicitly requested.
+    """
+
+    def __init__(self, engine, save_rules, check_interval=1):
+        self._engine = engine
+        self._save_rules = save_rules
+        self._check_interval = check_interval
+        self._requested = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self):
+        self._requested.set()
+
+    def _should_save(self):
+        dirty_operations = self._engine.dirty_operations
+        if not dirty_operations:
+            return False
+        elapsed = time.time() - self._engine.last_save_time
+        return any(elapsed >= seconds and dirty_operations >= changes for seconds, changes in self._save_rules)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._requested.wait(self._check_interval)
+            if self._stopped.is_set():
+                return
+            requested = self._requested.is_set()
+            self._requested.clear()
+            if requested or self._should_save():
+                try:
+                    self._engine.save_snapshot()
+                except IOError:
+                    logger.error("Snapshot can't be written. Retrying on next check")
+
+    def stop(self):
+        self._stopped.set()
+        self._requested.set()
+        self._thread.join()
@@ -0,0 +1,81 @@
+from bisect import bisect_left
+from bisect import bisect_right
+
+BUCKET_SIZE = 512
+
+
+class SortedKeys:
+    """
+    Sorted collection of distinct keys split in buckets of at most twice `bucket_size` keys, next to the largest
+    key of every bucket. Adding or discarding a key shifts one bucket instead of every key after it,
+    so writes stay cheap however many keys there are.
+    """
+
+    def __init__(self, keys=(), bucket_size=BUCKET_SIZE):
+        keys = sorted(set(keys))
+        self._bucket_size = bucket_size
+        self._buckets = [keys[start:start + bucket_size] for start in range(0, len(keys), bucket_size)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._length = len(keys)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return self.irange()
+
+    def add(self, key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._length = 1
+            return
+        index = bisect_left(self._maxes, key)
+        if index == len(self._maxes):
+            index -= 1
+            self._buckets[index].append(key)
+            self._maxes[index] = key
+        else:
+            bucket = self._buckets[index]
+            position = bisect_left(bucket, key)
+            if bucket[position] == key:
+                return
+            bucket.insert(position, key)
+        self._length += 1
+        bucket = self._buckets[index]
+        if len(bucket) > 2 * self._bucket_size:
+            half = len(bucket) // 2
+            self._buckets[index:index + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[index:index + 1] = [bucket[half - 1], bucket[-1]]
+
+    def discard(self, key):
+        index = bisect_left(self._maxes, key)
+        if index == len(self._maxes):
+            return
+        bucket = self._buckets[index]
+        position = bisect_left(bucket, key)
+        if bucket[position] != key:
+            return
+        del bucket[position]
+        self._length -= 1
+        if not bucket:
+            del self._buckets[index]
+            del self._maxes[index]
+        elif position == len(bucket):
+            self._maxes[index] = bucket[-1]
+
+    def irange(self, start=None, inclusive=False):
+        """
+        Yields the keys in order from `start`, the keys after it unless `inclusive` is set.
+        Keys are yielded one bucket at a time from a copy, iterating resumes after the last yielded key
+        so it can go on while keys are added or discarded.
+        """
+        find = bisect_left if inclusive else bisect_right
+        while True:
+            index = 0 if start is None else find(self._maxes, start)
+            if index == len(self._buckets):
+                return
+            bucket = self._buckets[index]
+            chunk = bucket[0 if start is None else find(bucket, start):]
+            yield from chunk
+            start, find = chunk[-1], bisect_right
@@ -1,35 +1,103 @@
+import asyncio
 import time
-from datetime import datetime
+from os import environ
 
 from sanic import Sanic
+from sanic.response import json
+from sanic.response import text
 
+from ozza.changefeed import DEFAULT_QUEUE_SIZE
+from ozza.changefeed import ChangeFeedHub
+from ozza.exceptions import OzzaException
+from ozza.metrics import merge_snapshots
+from ozza.metrics import render_metrics
+from rest_api.access_log import AccessLog
+from rest_api.access_log import DEFAULT_FLUSH_INTERVAL
+from rest_api.access_log import DEFAULT_SAMPLE_RATE
 from rest_api.api_service import ApiService
 from rest_api.member_api import MemberApi
 from rest_api.resource_api import ResourceApi
 
+SLOW_CONSUMER_CLOSE_CODE = 4008
 
-def create_api():
-    service = ApiService()
+
+def create_api(service=None):
+    service = service or ApiService()
     api = Sanic(name="OzzaAPI", configure_logging=False)
+    access_log = AccessLog(sample_rate=float(environ.get("ACCESS_LOG_SAMPLE_RATE", DEFAULT_SAMPLE_RATE)),
+                           flush_interval=int(environ.get("ACCESS_LOG_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL)) / 1000)
+    change_feed = ChangeFeedHub(service.wait_changes,
+                                queue_size=int(environ.get("CHANGE_FEED_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)))
+
+    @api.listener("after_server_start")
+    async def start_access_log(app, loop):
+        access_log.start()
 
+    @api.listener("before_server_stop")
+    async def close_access_log(app, loop):
+        await access_log.close()
+        await change_feed.close()
 
     @api.middleware('request')
     async def embed_start_time(request):
-        request.ctx.start_time = time.time()
+        request.ctx.start_time = time.perf_counter()
 
     @api.middleware('response')
     async def log_request(request, response):
-        spend_time = round((time.time() - request.ctx.start_time) * 1000)
-        print("[{}] [ACCESS] LEN:{}b\tLAT:{}ms IP:{} STATUS:{} {}\t{} {}".format(
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            len(response.body),
-            spend_time,
-            request.headers.get('remote_addr'),
-            response.status,
-            request.method,
-            request.path,
-            request.query_string
-        ))
+        latency = time.perf_counter() - request.ctx.start_time
+        service.timings.observe("ozza_http_request_seconds", latency, method=request.method,
+                                route=getattr(request, "uri_template", None) or "unmatched", status=response.status)
+        access_log.record(request, response, latency)
+
+    @api.exception(OzzaException)
+    async def engine_error(request, error):
+        return json(dict(error=error.message), status=error.status_code or error.error_code)
+
+    @api.route("/metrics")
+    async def metrics(request):
+        snapshot = merge_snapshots([await service.metrics(), service.timings.snapshot(change_feed.gauges())])
+        return text(render_metrics(snapshot), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    @api.route("/_cache")
+    async def cache_stats(request):
+        return json(dict(result=service.response_cache.stats()))
+
+    @api.route("/_memory")
+    async def memory_usage(request):
+        return json(dict(result=await service.memory_usage(request.args.get("key", "*")),
+                         eviction=await service.eviction_stats()))
+
+    @api.route("/_replication")
+    async def replication_status(request):
+        return json(dict(result=await service.replication_status()))
+
+    @api.websocket("/_changes")
+    async def changes(request, ws):
+        try:
+            since = int(request.args.get("since")) if request.args.get("since") is not None else None
+            subscription = await change_feed.subscribe(request.args.get("key", "*"), since, request.args.get("feed"))
+        except (ValueError, OzzaException) as error:
+            await ws.close(code=1008, reason=getattr(error, "message", str(error)))
+            return
+
+        async def send_frames():
+            async for frame in subscription.frames():
+                await ws.send(frame)
+
+        async def receive_until_closed():
+            while True:
+                await ws.recv()
+
+        tasks = [asyncio.ensure_future(send_frames()), asyncio.ensure_future(receive_until_closed())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            change_feed.unsubscribe(subscription)
+            [task.cancel() for task in tasks]
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if subscription.dropped:
+            await ws.close(code=SLOW_CONSUMER_CLOSE_CODE,
+                           reason="Slow consumer, resume from {}".format(subscription.last_seq))
 
     api.add_route(ResourceApi.as_view(service=service), "/<resource>")
     api.add_route(MemberApi.as_view(service=service), "/<resource>/<id_value>")
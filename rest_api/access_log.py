@@ -0,0 +1,77 @@
+import asyncio
+import random
+import sys
+import time
+
+DEFAULT_SAMPLE_RATE = 1.0
+DEFAULT_FLUSH_INTERVAL = 1000
+DEFAULT_BUFFER_SIZE = 1024
+
+
+class AccessLog:
+    """
+    Buffered access log. A `sample_rate` share of the requests is kept, the entries are buffered as tuples
+    and formatted and written by a background task every `flush_interval` seconds, or once `buffer_size`
+    entries are waiting. Writes run on the default executor so a slow stream never blocks the event loop.
+    Entries arriving while ten buffers are already waiting are dropped and counted.
+    """
+
+    def __init__(self, stream=None, sample_rate=DEFAULT_SAMPLE_RATE, flush_interval=DEFAULT_FLUSH_INTERVAL / 1000,
+                 buffer_size=DEFAULT_BUFFER_SIZE):
+        self._stream = stream or sys.stdout
+        self._sample_rate = sample_rate
+        self._flush_interval = flush_interval
+        self._buffer_size = buffer_size
+        self._buffer = []
+        self._wake = None
+        self._task = None
+        self.dropped = 0
+
+    def record(self, request, response, latency):
+        if self._sample_rate <= 0 or self._sample_rate < 1 and random.random() >= self._sample_rate:
+            return
+        if len(self._buffer) >= self._buffer_size * 10:
+            self.dropped += 1
+            return
+        self._buffer.append((time.time(), len(getattr(response, "body", None) or b""), round(latency * 1000),
+                             request.headers.get("remote_addr"), response.status, request.method, request.path,
+                             request.query_string))
+        if len(self._buffer) >= self._buffer_size and self._wake is not None:
+            self._wake.set()
+
+    @staticmethod
+    def format(entry):
+        timestamp, length, latency, address, status, method, request_path, query_string = entry
+        return "[{}] [ACCESS] LEN:{}b\tLAT:{}ms IP:{} STATUS:{} {}\t{} {}\n".format(
+            time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp)),
+            length, latency, address, status, method, request_path, query_string
+        )
+
+    def _write(self, entries):
+        self._stream.write("".join(map(self.format, entries)))
+        self._stream.flush()
+
+    async def flush(self):
+        entries, self._buffer = self._buffer, []
+        if entries:
+            await asyncio.get_event_loop().run_in_executor(None, self._write, entries)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
@@ -1,44 +1,147 @@
+from os import environ
+
+from ozza.async_engine import AsyncOzza
+from ozza.client import OzzaClient
 from ozza.exceptions import ResourceNotFoundException
+from ozza.metrics import MetricsRegistry
+from ozza.sharding import ShardRouter
 from ozza import Ozza
+from rest_api.response_cache import DEFAULT_RESPONSE_CACHE_SIZE
+from rest_api.response_cache import ResponseCache
+
+STREAM_PAGE_SIZE = 1000
 
 
 class ApiService:
 
     def __init__(self):
-        self.ozza = Ozza()
+        store_socket = environ.get("STORE_SOCKET")
+        if store_socket and environ.get("STORE_SHARDS"):
+            self.ozza = ShardRouter(store_socket, int(environ.get("STORE_SHARDS")))
+        elif store_socket:
+            self.ozza = OzzaClient(store_socket)
+        else:
+            self.ozza = AsyncOzza(Ozza())
+        self.response_cache = ResponseCache(int(environ.get("RESPONSE_CACHE_SIZE", DEFAULT_RESPONSE_CACHE_SIZE)))
+        self.timings = MetricsRegistry()
+
+    async def _call(self, method, *args):
+        """
+        Calls the engine, either in process or through the storage owner process when `STORE_SOCKET` is set,
+        or through the shard processes when `STORE_SHARDS` is set as well.
+        """
+        return await self.ozza.call(method, *args)
+
+    async def metrics(self):
+        return await self._call("metrics")
+
+    async def memory_usage(self, key):
+        return await self._call("memory_usage", key)
+
+    async def eviction_stats(self):
+        return await self._call("eviction_stats")
+
+    async def replication_status(self):
+        return await self._call("replication_status")
+
+    async def wait_changes(self, offset, limit, timeout):
+        return await self._call("wait_changes", offset, limit, timeout)
+
+    async def get_version(self, key):
+        return await self._call("get_version", key)
 
     async def get_resource(self, key):
         try:
-            return self.ozza.get_resource(key)
+            return await self._call("get_resource", key)
         except ResourceNotFoundException:
             return []
 
+    async def get_resource_encoded(self, key):
+        try:
+            return await self._call("get_resource_encoded", key)
+        except ResourceNotFoundException:
+            return b"[]"
+
+    async def get_resource_page(self, key, limit, cursor=None):
+        return await self._call("get_resource_page", key, limit, cursor)
+
+    async def iterate_resource_pages(self, key, page_size=STREAM_PAGE_SIZE):
+        """
+        Yields the items of the matching keys one page at a time, so only a single page is held in memory.
+        """
+        cursor = None
+        while True:
+            page = await self.get_resource_page(key, page_size, cursor)
+            yield page.get("result")
+            cursor = page.get("cursor")
+            if cursor is None:
+                return
+
     async def delete_resource(self, key):
-        return self.ozza.delete_resource(key)
+        return await self._call("delete_resource", key)
 
     async def put_member(self, key, member_value, expiry=0):
-        return self.ozza.put_member(key, member_value, expiry)
+        return await self._call("put_member", key, member_value, expiry)
+
+    async def patch_member(self, key, id_value, patch, expected_version=None):
+        return await self._call("patch_member", key, id_value, patch, expected_version)
 
     async def get_member(self, key, id_value):
         try:
-            return self.ozza.get_member(key, id_value)
+            return await self._call("get_member", key, id_value)
+        except ResourceNotFoundException:
+            return []
+
+    async def get_member_encoded(self, key, id_value):
+        try:
+            return await self._call("get_member_encoded", key, id_value)
+        except ResourceNotFoundException:
+            return b"[]"
+
+    async def put_members(self, key, members):
+        return await self._call("put_members", key, members)
+
+    async def get_members(self, key, ids):
+        try:
+            return await self._call("get_members", key, ids)
         except ResourceNotFoundException:
             return []
 
+    async def get_members_encoded(self, key, ids):
+        try:
+            return await self._call("get_members_encoded", key, ids)
+        except ResourceNotFoundException:
+            return b"[]"
+
+    async def delete_members(self, key, ids):
+        try:
+            return await self._call("delete_members", key, ids)
+        except ResourceNotFoundException:
+            return 0
+
+    async def query(self, key, query):
+        try:
+            return await self._call("query", key, query)
+        except ResourceNotFoundException:
+            return []
+
+    async def aggregate(self, key, aggregation):
+        return await self._call("aggregate", key, aggregation)
+
     async def put_value(self, key, value):
-        return self.ozza.put_value(key, value)
+        return await self._call("put_value", key, value)
 
     async def check_member(self, key, id_value):
         try:
-            return self.ozza.check_member(key, id_value)
+            return await self._call("check_member", key, id_value)
         except ResourceNotFoundException:
             return False
 
     async def delete_member(self, key, id_value):
         try:
-            return self.ozza.delete_member(key, id_value)
+            return await self._call("delete_member", key, id_value)
         except ResourceNotFoundException:
             return {}
 
     async def get_member_by_value(self, key, value):
-        return self.ozza.get_member_by_value(key, value)
+        return await self._call("get_member_by_value", key, value)
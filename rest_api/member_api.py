@@ -1,19 +1,35 @@
 from sanic.response import json, text
 from rest_api.ozza_api_view import OzzaApiView
+from rest_api.response_cache import cached_json
+
+
+def expected_version(if_match):
+    """
+    Returns the resource version of an `If-Match` header, the ETag of a read without quotes.
+    """
+    if not if_match or if_match.strip() == "*":
+        return None
+    tag = if_match.strip()
+    return (tag[2:] if tag.startswith("W/") else tag).strip('"')
 
 
 class MemberApi(OzzaApiView):
 
-    async def get(self, request, service, resource, id_value):
-        result = await service.get_member(resource, id_value)
+    async def get(self, request, resource, id_value):
+        service = request.ctx.service
+        return await cached_json(request, service, resource, lambda: service.get_member_encoded(resource, id_value))
+
+    async def patch(self, request, resource, id_value):
+        result = await request.ctx.service.patch_member(
+            resource, id_value, request.json, expected_version(request.headers.get("if-match")))
         return json(dict(result=result))
 
-    async def head(self, request, service, resource, id_value):
-        existed = await service.check_member(resource, id_value)
+    async def head(self, request, resource, id_value):
+        existed = await request.ctx.service.check_member(resource, id_value)
         if existed:
             return text('')
         return text('', status=204)
 
-    async def delete(self, request, service, resource, id_value):
-        result = await service.delete_member(resource, id_value)
+    async def delete(self, request, resource, id_value):
+        result = await request.ctx.service.delete_member(resource, id_value)
         return json(dict(result=result))
@@ -2,16 +2,18 @@ from sanic.views import HTTPMethodView
 
 class OzzaApiView(HTTPMethodView):
 
-    def dispatch_request(self, request, service=None, *args, **kwargs, ):
+    def dispatch_request(self, request, *args, **kwargs):
         handler = getattr(self, request.method.lower(), None)
-        return handler(request, api_service=service, *args, **kwargs)
+        return handler(request, *args, **kwargs)
 
     @classmethod
     def as_view(cls, *class_args, **class_kwargs):
+        service = class_kwargs.get("service")
 
-        def view(*args, **kwargs):
+        def view(request, *args, **kwargs):
+            request.ctx.service = service
             self = view.view_class()
-            return self.dispatch_request(service=kwargs.get("api_service"), *args, **kwargs)
+            return self.dispatch_request(request, *args, **kwargs)
 
         if cls.decorators:
             view.__module__ = cls.__module__
@@ -22,4 +24,4 @@ class OzzaApiView(HTTPMethodView):
         view.__doc__ = cls.__doc__
         view.__module__ = cls.__module__
         view.__name__ = cls.__name__
-        return view
\ No newline at end of file
+        return view
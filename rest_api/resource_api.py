@@ -1,26 +1,124 @@
+from base64 import urlsafe_b64decode
+from base64 import urlsafe_b64encode
+from json import dumps
+from json import loads
+
+from sanic.exceptions import InvalidUsage
 from sanic.response import json
+from sanic.response import stream
+from ozza import parse_expiry
 from rest_api.ozza_api_view import OzzaApiView
+from rest_api.response_cache import cached_json
+
+STREAM_CONTENT_TYPES = {"json": "application/json", "ndjson": "application/x-ndjson"}
+
+
+def bulk_members(request):
+    """
+    Reads the members of a bulk request, a JSON array or one JSON member per line
+    with `Content-Type: application/x-ndjson`.
+    """
+    if "ndjson" in request.headers.get("content-type", ""):
+        try:
+            return [loads(line) for line in request.body.decode().splitlines() if line.strip()]
+        except ValueError:
+            raise InvalidUsage("Every line must be a JSON member")
+    if not isinstance(request.json, list):
+        raise InvalidUsage("Bulk body must be a JSON array of members")
+    return request.json
+
+
+def encode_cursor(cursor):
+    if cursor is None:
+        return None
+    return urlsafe_b64encode(dumps(cursor).encode()).decode()
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        cursor = loads(urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise InvalidUsage("Invalid cursor")
+    if not isinstance(cursor, list) or not 1 <= len(cursor) <= 2 or not isinstance(cursor[0], str):
+        raise InvalidUsage("Invalid cursor")
+    return cursor
+
+
+def parse_limit(limit):
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise InvalidUsage("Limit must be a number")
+    if limit < 1:
+        raise InvalidUsage("Limit must be at least 1")
+    return limit
+
+
+def stream_resource(service, resource, stream_format):
+    """
+    Streams the items page by page as a chunked JSON document or as NDJSON, one item per line.
+    """
+    if stream_format not in STREAM_CONTENT_TYPES:
+        raise InvalidUsage("Stream format must be json or ndjson")
+
+    async def write_items(response):
+        separator = "\n" if stream_format == "ndjson" else ","
+        written = False
+        if stream_format == "json":
+            await response.write('{"result":[')
+        async for items in service.iterate_resource_pages(resource):
+            if not items:
+                continue
+            chunk = separator.join(dumps(item) for item in items)
+            await response.write(separator + chunk if written else chunk)
+            written = True
+        await response.write("]}" if stream_format == "json" else "\n" if written else "")
+
+    return stream(write_items, content_type=STREAM_CONTENT_TYPES.get(stream_format))
 
 
 class ResourceApi(OzzaApiView):
 
     async def get(self, request, resource):
+        service = request.ctx.service
+        if "stream" in request.args:
+            return stream_resource(service, resource, request.args.get("stream"))
+        if "limit" in request.args:
+            page = await service.get_resource_page(
+                resource, parse_limit(request.args.get("limit")), decode_cursor(request.args.get("cursor")))
+            return json(dict(result=page.get("result"), cursor=encode_cursor(page.get("cursor"))))
         if "filter" in request.args:
-            result = await request.ctx.service.get_member_by_value(resource, request.args.get("filter"))
+            return await cached_json(request, service, resource,
+                                     lambda: service.get_member_by_value(resource, request.args.get("filter")))
+        if "ids" in request.args:
+            return await cached_json(request, service, resource,
+                                     lambda: service.get_members_encoded(resource, request.args.get("ids").split(",")))
+        return await cached_json(request, service, resource, lambda: service.get_resource_encoded(resource))
+
+    async def post(self, request, resource):
+        if "aggregate" in request.args:
+            result = await request.ctx.service.aggregate(resource, request.json)
             return json(dict(result=result))
-        result = await request.ctx.service.get_resource(resource)
+        result = await request.ctx.service.query(resource, request.json)
         return json(dict(result=result))
 
     async def put(self, request, resource):
         expiry = 0
-        if "member" in request.args:
+        if "bulk" in request.args:
+            result = await request.ctx.service.put_members(resource, bulk_members(request))
+        elif "member" in request.args:
             if "expire_in" in request.args:
-                expiry = int(request.args.get("expire_in"))
+                expiry = parse_expiry(request.args.get("expire_in"))
             result = await request.ctx.service.put_member(resource, request.json, expiry)
         else:
             result = await request.ctx.service.put_value(resource, request.json)
         return json(dict(result=result))
 
     async def delete(self, request, resource):
+        if "ids" in request.args:
+            result = await request.ctx.service.delete_members(resource, request.args.get("ids").split(","))
+            return json(dict(result=result))
         result = await request.ctx.service.delete_resource(resource)
         return json(dict(result=result))
@@ -0,0 +1,79 @@
+from collections import OrderedDict
+
+from sanic.response import HTTPResponse
+from sanic.response import json_dumps
+from sanic.response import raw
+
+from ozza.encoding import wrap_result
+
+DEFAULT_RESPONSE_CACHE_SIZE = 32 * 1024 * 1024
+
+
+class ResponseCache:
+    """
+    LRU cache of encoded response bodies, bounded by their total size. Every entry remembers the version
+    of the resource it was encoded at and only answers a lookup for that version, a newer encoding
+    replaces the entry of an older version.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_RESPONSE_CACHE_SIZE):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, version, body):
+        if len(body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous[1])
+        self._entries[key] = (version, body)
+        self._size += len(body)
+        while self._size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return dict(entries=len(self._entries), bytes=self._size, max_bytes=self.max_bytes, hits=self.hits,
+                    misses=self.misses, evictions=self.evictions, hit_rate=self.hits / lookups if lookups else 0)
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    return any(tag.strip() in (etag, "*", "W/" + etag) for tag in if_none_match.split(","))
+
+
+async def cached_json(request, service, resource, produce):
+    """
+    Answers a read through the response cache. The ETag is the version of the resource, so a matching
+    `If-None-Match` gets a 304 and an unchanged result is served as the bytes encoded the first time.
+    The version is read before the result, so a cached body is never older than its version.
+    A result already encoded as bytes is wrapped as it is.
+    """
+    version = await service.get_version(resource)
+    etag = '"{}"'.format(version)
+    headers = {"ETag": etag}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return HTTPResponse(status=304, headers=headers)
+    cache_key = (request.path, request.query_string)
+    body = service.response_cache.get(cache_key, version)
+    if body is None:
+        result = await produce()
+        body = wrap_result(result) if isinstance(result, bytes) else json_dumps(dict(result=result)).encode()
+        service.response_cache.put(cache_key, version, body)
+    return raw(body, content_type="application/json", headers=headers)
@@ -0,0 +1,70 @@
+import unittest
+
+from ozza import Ozza
+from ozza.aggregation import aggregate
+from ozza.columns import ColumnMembers
+from ozza.exceptions import InvalidQueryException
+
+MEMBERS = [
+    dict(id="some-id1", city="jakarta", age=21, score=1.5),
+    dict(id="some-id2", city="bandung", age=32, score=2.5),
+    dict(id="some-id3", city="jakarta", age=45),
+    dict(id="some-id4", age="unknown"),
+]
+
+
+class AggregationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.members = ColumnMembers({member.get("id"): member for member in MEMBERS})
+
+    def test_aggregates(self):
+        aggregates = dict(count=dict(op="count"), total=dict(op="sum", field="score"),
+                          oldest=dict(op="max", field="age"), average=dict(op="avg", field="score"),
+                          first_city=dict(op="min", field="city"))
+        result = aggregate(self.members, dict(aggregates=aggregates))
+        self.assertEqual(result, dict(count=4, total=4.0, oldest=45, average=2.0, first_city="bandung"))
+
+    def test_where_and_group_by(self):
+        aggregation = dict(where=dict(field="age", op="gte", value=30), group_by="city",
+                           aggregates=dict(count=dict(op="count"), total=dict(op="sum", field="age")))
+        self.assertEqual(aggregate(self.members, aggregation),
+                         [dict(city="bandung", count=1, total=32), dict(city="jakarta", count=1, total=45)])
+        aggregation = dict(where={"or": [dict(field="city", value="jakarta"), dict(field="age", value="unknown")]},
+                           group_by="city", aggregates=dict(count=dict(op="count")))
+        self.assertEqual(aggregate(self.members, aggregation),
+                         [dict(city="jakarta", count=2), dict(city=None, count=1)])
+
+    def test_many_groups(self):
+        members = ColumnMembers({idx: dict(id=idx, group=idx % 100, value=idx) for idx in range(1000)})
+        result = aggregate(members, dict(group_by="group", aggregates=dict(total=dict(op="sum", field="value"))))
+        self.assertEqual(len(result), 100)
+        self.assertEqual(result[0], dict(group=0, total=sum(range(0, 1000, 100))))
+
+    def test_invalid_aggregation(self):
+        with self.assertRaises(InvalidQueryException):
+            aggregate(self.members, dict(aggregates=dict(total=dict(op="median", field="age"))))
+        with self.assertRaises(InvalidQueryException):
+            aggregate(self.members, dict(aggregates=dict(total=dict(op="sum", field="city"))))
+
+
+class OzzaAggregationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ozza = Ozza(test_mode=True)
+
+    def test_columnar_resource(self):
+        self.ozza.create_columnar("test-data")
+        self.ozza.put_members("test-data", MEMBERS)
+        self.ozza.put_member("test-data", dict(id="some-id5", city="bandung", age=50), expiry=1)
+        self.assertEqual(self.ozza.get_member("test-data", "some-id1").get("city"), "jakarta")
+        aggregation = dict(aggregates=dict(count=dict(op="count")), group_by="city")
+        self.assertEqual(self.ozza.aggregate("test-data", aggregation),
+                         [dict(city="bandung", count=2), dict(city="jakarta", count=2), dict(city=None, count=1)])
+        self.ozza.close()
+        restarted = Ozza(test_mode=True)
+        self.assertIsNotNone(restarted._resource("test-data").columns)
+        restarted.close()
+
+    def tearDown(self):
+        self.ozza._teardown_data()
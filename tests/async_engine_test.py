@@ -0,0 +1,92 @@
+import asyncio
+import unittest
+
+from ozza import Ozza
+from ozza.async_engine import AsyncOzza
+from ozza.exceptions import ResourceNotFoundException
+from ozza.exceptions import WriteQueueFullException
+
+
+class AsyncOzzaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ozza = Ozza(test_mode=True)
+        self.loop = asyncio.new_event_loop()
+
+    def test_batched_writes(self):
+        engine = AsyncOzza(self.ozza)
+
+        async def scenario():
+            await asyncio.gather(*[engine.call("put_member", "test-data", dict(id="some-id{}".format(idx)))
+                                   for idx in range(50)])
+            resource = await engine.call("get_resource", "test-data")
+            member = await engine.call("get_member", "test-data", "some-id7")
+            with self.assertRaises(ResourceNotFoundException):
+                await engine.call("delete_resource", "not-found")
+            await engine.close()
+            return resource, member
+
+        resource, member = self.loop.run_until_complete(scenario())
+        self.assertEqual(len(resource), 50)
+        self.assertEqual(member.get("id"), "some-id7")
+
+    def test_backpressure(self):
+        engine = AsyncOzza(self.ozza, write_queue_size=1, write_timeout=0.05)
+
+        async def scenario():
+            self.ozza._lock.acquire()
+            try:
+                writes = [asyncio.ensure_future(engine.call("put_value", "value-test", idx)) for idx in range(1, 4)]
+                await asyncio.sleep(0.2)
+            finally:
+                self.ozza._lock.release()
+            results = await asyncio.gather(*writes, return_exceptions=True)
+            await engine.close()
+            return results
+
+        results = self.loop.run_until_complete(scenario())
+        self.assertTrue(any(isinstance(result, WriteQueueFullException) for result in results))
+        self.assertTrue(any(result == 1 for result in results))
+
+    def test_failed_batch_keeps_writing(self):
+        engine = AsyncOzza(self.ozza, write_timeout=1)
+        commit = self.ozza._operation_log.commit
+
+        def fail_once(seq):
+            self.ozza._operation_log.commit = commit
+            raise IOError("disk full")
+
+        async def scenario():
+            self.ozza._operation_log.commit = fail_once
+            with self.assertRaises(IOError):
+                await engine.call("put_member", "test-data", dict(id="some-id1"))
+            await asyncio.wait_for(engine.call("put_member", "test-data", dict(id="some-id2")), 5)
+            member = await engine.call("get_member", "test-data", "some-id2")
+            await engine.close()
+            return member
+
+        self.assertEqual(self.loop.run_until_complete(scenario()).get("id"), "some-id2")
+
+    def test_costly_point_reads_leave_the_loop(self):
+        self.ozza.put_member("test-data", dict(id="some-id1", name="some-name"))
+        self.ozza.save_snapshot()
+        self.ozza.close()
+        self.ozza = Ozza(test_mode=True)
+        engine = AsyncOzza(self.ozza)
+        self.assertFalse(engine._runs_inline("get_member", ("test-data", "some-id1")))
+        self.assertTrue(engine._runs_inline("get_version", ("test-data",)))
+
+        async def scenario():
+            member = await engine.call("get_member", "test-data", "some-id1")
+            matched = await engine.call("get_member", "test-data", "some-*")
+            await engine.close()
+            return member, matched
+
+        member, matched = self.loop.run_until_complete(scenario())
+        self.assertEqual(member, matched)
+        self.assertTrue(engine._runs_inline("get_member", ("test-data", "some-id1")))
+        self.assertFalse(engine._runs_inline("get_member_encoded", ("test-data", "some-*")))
+
+    def tearDown(self):
+        self.loop.close()
+        self.ozza._teardown_data()
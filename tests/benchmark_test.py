@@ -0,0 +1,25 @@
+import unittest
+
+from benchmarks.run import compare
+from benchmarks.stats import percentile
+from benchmarks.stats import summarize
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_summarize(self):
+        record = summarize("get_member", [0.001] * 98 + [0.002, 0.1], 0.2)
+        self.assertEqual(record.get("ops"), 100)
+        self.assertEqual(record.get("ops_per_sec"), 500)
+        self.assertEqual(record.get("p50_ms"), 1)
+        self.assertEqual(record.get("p99_ms"), 2)
+        self.assertEqual(percentile([], 0.5), 0)
+
+    def test_compare(self):
+        baseline = dict(results=[dict(suite="engine", size=1000, operation="get_member", ops_per_sec=1000, p99_ms=1)])
+        results = dict(results=[dict(suite="engine", size=1000, operation="get_member", ops_per_sec=900, p99_ms=1.1),
+                                dict(suite="engine", size=1000, operation="put_member", ops_per_sec=1, p99_ms=1)])
+        self.assertEqual(compare(results, baseline, 0.2), [])
+        results.get("results")[0].update(ops_per_sec=700, p99_ms=2)
+        self.assertEqual([regression.get("metric") for regression in compare(results, baseline, 0.2)],
+                         ["ops_per_sec", "p99_ms"])
@@ -0,0 +1,82 @@
+import json
+import os
+import unittest
+
+from ozza import Ozza
+from ozza.binary import BinarySnapshot
+from ozza.binary import LazyEntry
+from ozza.binary import convert_json_snapshot
+from ozza.binary import is_binary_snapshot
+from ozza.binary import write_binary_snapshot
+from ozza.resource import MemberList
+
+
+class BinarySnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.location = "tests/binary_test.oz"
+        self.json_location = "tests/binary_test.json"
+
+    def test_round_trip(self):
+        data = {"test-data": MemberList([dict(id="some-id1"), dict(id="some-id2")]), "value-test": [1, 2]}
+        write_binary_snapshot(self.location, data)
+        self.assertTrue(is_binary_snapshot(self.location))
+        entries = BinarySnapshot(self.location).entries()
+        self.assertTrue(isinstance(entries.get("test-data"), LazyEntry))
+        self.assertEqual(entries.get("test-data").count, 2)
+        self.assertEqual(entries.get("test-data").load(), data.get("test-data"))
+        self.assertTrue(isinstance(entries.get("test-data").load(), MemberList))
+        self.assertEqual(entries.get("value-test").load(), [1, 2])
+
+    def test_encoded_members_are_written_and_loaded(self):
+        members = MemberList([dict(id="some-id1")])
+        members.encoded = [b'{"id": "some-id1", "name": "kept"}']
+        write_binary_snapshot(self.location, {"test-data": members})
+        loaded = BinarySnapshot(self.location).entries().get("test-data").load()
+        self.assertEqual(loaded, [dict(id="some-id1", name="kept")])
+        self.assertEqual(loaded.encoded, members.encoded)
+
+    def test_unread_entries_are_copied(self):
+        write_binary_snapshot(self.location, {"test-data": MemberList([dict(id="some-id1")])})
+        entries = BinarySnapshot(self.location).entries()
+        entries["value-test"] = "some-value"
+        write_binary_snapshot(self.location, entries)
+        entries = BinarySnapshot(self.location).entries()
+        self.assertEqual(entries.get("test-data").load(), [dict(id="some-id1")])
+        self.assertEqual(entries.get("value-test").load(), "some-value")
+
+    def test_convert_json_snapshot(self):
+        with open(self.json_location, "w") as snapshot:
+            json.dump({"test-data": [dict(id="some-id1")], "value-test": "some-value"}, snapshot)
+        self.assertFalse(is_binary_snapshot(self.json_location))
+        self.assertEqual(convert_json_snapshot(self.json_location, self.location), 2)
+        entries = BinarySnapshot(self.location).entries()
+        self.assertEqual(entries.get("test-data").kind, "resource")
+        self.assertEqual(entries.get("value-test").kind, "value")
+
+    def tearDown(self):
+        for location in (self.location, self.json_location):
+            if os.path.exists(location):
+                os.remove(location)
+
+
+class OzzaBinaryStorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ozza = Ozza(test_mode=True)
+
+    def test_lazy_load(self):
+        self.ozza.put_member("test-data", dict(id="some-id1", name="some-name"))
+        self.ozza.put_member("other-data", dict(id="some-id2", name="other-name"))
+        self.ozza.save_snapshot()
+        self.ozza.close()
+        restarted = Ozza(test_mode=True)
+        self.assertTrue(isinstance(restarted._memory_data.get("test-data"), LazyEntry))
+        self.assertEqual(restarted.get_member("test-data", "some-id1").get("name"), "some-name")
+        self.assertFalse(isinstance(restarted._memory_data.get("test-data"), LazyEntry))
+        self.assertTrue(isinstance(restarted._memory_data.get("other-data"), LazyEntry))
+        self.assertEqual(len(restarted.get_resource("*-data")), 2)
+        restarted.close()
+
+    def tearDown(self):
+        self.ozza._teardown_data()
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import unittest
+
+from ozza import Ozza
+from ozza.async_engine import AsyncOzza
+from ozza.changefeed import ChangeFeedHub
+from ozza.changefeed import ChangeLog
+from ozza.changefeed import change_event
+from ozza.client import OzzaClient
+from ozza.server import StoreServer
+
+
+class ChangeLogTest(unittest.TestCase):
+
+    def test_changes_after(self):
+        log = ChangeLog(size=3)
+        [log.append(change_event("put_value", "key-{}".format(idx), dict(value=idx))) for idx in range(5)]
+        result = log.changes_after(3, 10)
+        self.assertEqual([event.get("seq") for event in result.get("events")], [4, 5])
+        self.assertEqual(result.get("offset"), 5)
+        self.assertEqual(log.changes_after(2, 1).get("offset"), 3)
+        self.assertEqual(log.changes_after(5, 10).get("events"), [])
+        self.assertIsNone(log.changes_after(1, 10).get("events"))
+        self.assertEqual(log.changes_after(None, 10), dict(feed=log.feed_id, offset=5, events=[]))
+
+    def test_change_event(self):
+        member = dict(id="some-id", name="some-name")
+        self.assertEqual(change_event("create", "test-data", dict(member=member)),
+                         dict(key="test-data", type="create", id="some-id", member=member))
+        self.assertEqual(change_event("expire_member", "test-data", dict(id="some-id")),
+                         dict(key="test-data", type="expire", id="some-id"))
+        self.assertEqual(change_event("delete_resource", "test-data", dict()),
+                         dict(key="test-data", type="delete_resource"))
+
+
+class ChangeFeedHubTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ozza = Ozza(test_mode=True)
+        self.engine = AsyncOzza(self.ozza)
+        self.hub = ChangeFeedHub(self.engine.wait_changes, queue_size=10)
+        self.loop = asyncio.new_event_loop()
+
+    def run_scenario(self, coroutine):
+        return self.loop.run_until_complete(asyncio.wait_for(coroutine, 5))
+
+    @staticmethod
+    async def receive(subscription, count):
+        frames = subscription.frames()
+        return [json.loads(await frames.__anext__()) for _ in range(count)]
+
+    def test_member_events(self):
+        async def scenario():
+            subscription = await self.hub.subscribe("test-*")
+            other = await self.hub.subscribe("other-data")
+            await self.engine.call("put_member", "test-data", dict(id="some-id", name="some-name"))
+            await self.engine.call("put_member", "test-data", dict(id="some-id", name="other-name"))
+            await self.engine.call("put_member", "other-data", dict(id="some-id"))
+            await self.engine.call("delete_member", "test-data", "some-id")
+            messages = await self.receive(subscription, 5)
+            other_messages = await self.receive(other, 2)
+            return messages, other_messages
+
+        messages, other_messages = self.run_scenario(scenario())
+        self.assertEqual(messages[0].get("type"), "subscribed")
+        self.assertEqual([message.get("type") for message in messages[1:]],
+                         ["create_resource", "create", "update", "delete"])
+        self.assertEqual(messages[3].get("member").get("name"), "other-name")
+        self.assertEqual(other_messages[1].get("type"), "create_resource")
+        self.assertEqual(self.hub.gauges()[1].get("value"), 2)
+
+    def test_resume_from_sequence_number(self):
+        async def scenario():
+            subscription = await self.hub.subscribe("test-data")
+            await self.engine.call("put_member", "test-data", dict(id="some-id0"))
+            first = await self.receive(subscription, 3)
+            self.hub.unsubscribe(subscription)
+            for idx in range(1, 4):
+                await self.engine.call("put_member", "test-data", dict(id="some-id{}".format(idx)))
+            await self.engine.call("put_member", "other-data", dict(id="some-id"))
+            resumed = await self.hub.subscribe("test-data", since=first[-1].get("seq"), feed_id=first[0].get("feed"))
+            await self.engine.call("put_member", "test-data", dict(id="some-id4"))
+            return first, await self.receive(resumed, 5)
+
+        first, resumed = self.run_scenario(scenario())
+        self.assertEqual([message.get("id") for message in resumed[1:]],
+                         ["some-id1", "some-id2", "some-id3", "some-id4"])
+        self.assertEqual(resumed[-1].get("seq"), first[-1].get("seq") + 6)
+
+    def test_resume_from_another_feed(self):
+        async def scenario():
+            subscription = await self.hub.subscribe("test-data", since=3, feed_id="other-feed")
+            return await self.receive(subscription, 2)
+
+        messages = self.run_scenario(scenario())
+        self.assertEqual(messages[1].get("type"), "reset")
+
+    def test_slow_consumer_is_dropped(self):
+        async def scenario():
+            slow = await self.hub.subscribe("test-data")
+            fast = await self.hub.subscribe("test-data")
+            received = []
+
+            async def consume():
+                async for frame in fast.frames():
+                    received.append(frame)
+            consumer = asyncio.ensure_future(consume())
+            for idx in range(20):
+                await self.engine.call("put_member", "test-data", dict(id="some-id{}".format(idx)))
+                await asyncio.sleep(0)
+            await asyncio.sleep(0.05)
+            frames = [frame async for frame in slow.frames()]
+            consumer.cancel()
+            return slow, frames, received
+
+        slow, frames, received = self.run_scenario(scenario())
+        self.assertTrue(slow.dropped)
+        self.assertEqual(slow.last_seq, 0)
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(len(received), 22)
+        self.assertEqual(self.hub.dropped, 1)
+
+    def test_feed_through_store_server(self):
+        socket_path = "tests/changefeed_test.sock"
+        server = StoreServer(self.ozza, socket_path)
+        client = OzzaClient(socket_path)
+        hub = ChangeFeedHub(client.wait_changes)
+
+        async def scenario():
+            await server.start()
+            subscription = await hub.subscribe("test-data")
+            await client.put_member("test-data", dict(id="some-id"))
+            messages = await self.receive(subscription, 3)
+            await hub.close()
+            await client.close()
+            await server.stop()
+            return messages
+
+        messages = self.run_scenario(scenario())
+        self.assertEqual(messages[2].get("type"), "create")
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.hub.close())
+        self.loop.run_until_complete(self.engine.close())
+        self.loop.close()
+        self.ozza._teardown_data()
@@ -0,0 +1,55 @@
+import unittest
+
+from ozza.columns import ColumnMembers
+from ozza.resource import Resource
+from tests.compact_test import race_readers
+from tests.compact_test import read_members
+from tests.compact_test import write_members
+
+
+class ColumnMembersTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        members = ColumnMembers()
+        member = dict(id="some-id1", name="some-name", age=21, score=1.5, tags=["a"], active=True, note=None)
+        members["some-id1"] = member
+        self.assertEqual(members.get("some-id1"), member)
+        self.assertEqual(list(members.get("some-id1")), list(member))
+        self.assertEqual(members.columns.get("name").kind, "str")
+        self.assertEqual(members.columns.get("age").kind, "int")
+        self.assertEqual(members.columns.get("tags").kind, "object")
+
+    def test_widen_and_reuse_rows(self):
+        members = ColumnMembers()
+        members["some-id1"] = dict(id="some-id1", age=21)
+        members["some-id2"] = dict(id="some-id2", age=21.5)
+        self.assertEqual(members.columns.get("age").kind, "float")
+        members["some-id3"] = dict(id="some-id3", age="unknown")
+        self.assertEqual(members.columns.get("age").kind, "object")
+        self.assertEqual([member.get("age") for member in members.values()], [21, 21.5, "unknown"])
+        self.assertEqual(members.pop("some-id1"), dict(id="some-id1", age=21))
+        members["some-id4"] = dict(id="some-id4")
+        self.assertEqual(members.size, 3)
+        self.assertEqual(list(members.keys()), ["some-id2", "some-id3", "some-id4"])
+        self.assertEqual(members.get("some-id4"), dict(id="some-id4"))
+
+    def test_concurrent_reads(self):
+        def write(members, step):
+            write_members(members, step)
+            members["label"] = dict(id="label", a=step, b=step, created_at=step, expiry_time=step,
+                                    label=step if step < 500 else "some-label{}".format(step))
+
+        errors = race_readers(ColumnMembers(), write, read_members)
+        self.assertEqual(errors, [])
+
+    def test_resource_columns(self):
+        resource = Resource([dict(id="some-id1", name="some-name"), dict(id="some-id2", name="other-name")])
+        resource.create_index("name")
+        resource.create_columns()
+        resource.put(dict(id="some-id2", name="some-name"))
+        self.assertEqual(resource.lookup("name", "some-name"), {"some-id1", "some-id2"})
+        self.assertEqual(resource.members(),
+                         [dict(id="some-id1", name="some-name"), dict(id="some-id2", name="some-name")])
+        resource.drop_columns()
+        self.assertIsNone(resource.columns)
+        self.assertEqual(resource.get("some-id2"), dict(id="some-id2", name="some-name"))
@@ -0,0 +1,107 @@
+import sys
+import threading
+import time
+import unittest
+
+from ozza.compact import CompactMembers
+from ozza.memory import member_size
+from ozza.memory import value_size
+
+
+def race_readers(members, write, read, duration=0.5):
+    """
+    Runs `write` in a loop on one thread while two threads run `read`, returns the errors the readers raised.
+    """
+    errors = []
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            try:
+                read(members)
+            except Exception as error:
+                errors.append(error)
+
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    threads = [threading.Thread(target=reader) for _ in range(2)]
+    try:
+        [thread.start() for thread in threads]
+        deadline = time.time() + duration
+        step = 0
+        while time.time() < deadline:
+            write(members, step)
+            step += 1
+    finally:
+        done.set()
+        [thread.join() for thread in threads]
+        sys.setswitchinterval(switch_interval)
+    return errors
+
+
+def write_members(members, step):
+    id_value = "some-id{}".format(step % 50)
+    if step % 3 == 0:
+        members.pop(id_value)
+    fields = dict(id=id_value, a=step, b=step, created_at=step, expiry_time=step)
+    if step % 2:
+        fields["extra"] = step
+    members[id_value] = fields
+
+
+def read_members(members):
+    for id_value, member in members.items():
+        assert member.get("id") == id_value and member.get("a") == member.get("b") == member.get("created_at"), member
+    for idx in range(50):
+        member = members.get("some-id{}".format(idx))
+        assert member is None or member.get("id") == "some-id{}".format(idx) and \
+            member.get("a") == member.get("expiry_time"), member
+
+
+class CompactMembersTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        members = CompactMembers()
+        member = dict(id="some-id1", name="some-name", created_at=1600000000000, expiry_time=0)
+        members["some-id1"] = member
+        self.assertEqual(members.get("some-id1"), member)
+        self.assertEqual(list(members.get("some-id1")), list(member))
+        self.assertEqual(members._rows[0], ("some-id1", "some-name"))
+        self.assertEqual(members._created[0], 1600000000000)
+
+    def test_field_order_and_unpacked_timestamps(self):
+        members = CompactMembers()
+        members["some-id1"] = dict(id="some-id1", created_at=1, name="some-name", expiry_time=2)
+        members["some-id2"] = dict(id="some-id2", created_at="yesterday", expiry_time=None)
+        self.assertEqual(list(members.get("some-id1").items()),
+                         [("id", "some-id1"), ("created_at", 1), ("name", "some-name"), ("expiry_time", 2)])
+        self.assertEqual(members.get("some-id2"), dict(id="some-id2", created_at="yesterday", expiry_time=None))
+
+    def test_concurrent_reads(self):
+        errors = race_readers(CompactMembers(), write_members, read_members)
+        self.assertEqual(errors, [])
+
+    def test_pop_reuses_slots_and_frozen_view(self):
+        members = CompactMembers()
+        members["some-id1"] = dict(id="some-id1", created_at=1)
+        members["some-id2"] = dict(id="some-id2", created_at=2)
+        frozen = members.frozen()
+        self.assertEqual(members.pop("some-id1"), dict(id="some-id1", created_at=1))
+        members["some-id3"] = dict(id="some-id3", created_at=3)
+        self.assertEqual(len(members._rows), 2)
+        self.assertEqual(list(members.keys()), ["some-id2", "some-id3"])
+        self.assertEqual([member.get("id") for member in frozen], ["some-id1", "some-id2"])
+        self.assertEqual(len(frozen), 2)
+
+
+class MemorySizeTest(unittest.TestCase):
+
+    def test_value_size(self):
+        self.assertEqual(value_size(None), 0)
+        self.assertEqual(value_size(7), 0)
+        self.assertGreater(value_size(["some-value"]), value_size("some-value"))
+
+    def test_compact_member_is_smaller(self):
+        member = dict(id="some-id1", name="some-name", created_at=1600000000000, expiry_time=0)
+        self.assertLess(member_size(member), member_size(member, compact=False))
+
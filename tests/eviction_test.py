@@ -0,0 +1,95 @@
+import os
+import unittest
+
+from ozza import Ozza
+from ozza.eviction import ALLKEYS_LFU
+from ozza.eviction import ALLKEYS_LRU
+from ozza.eviction import AccessTracker
+from ozza.eviction import parse_size
+from ozza.exceptions import OutOfMemoryException
+
+
+class AccessTrackerTest(unittest.TestCase):
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size("1024"), 1024)
+        self.assertEqual(parse_size("64mb"), 64 * 1024 * 1024)
+        self.assertEqual(parse_size("1.5KB"), 1536)
+
+    def test_lru(self):
+        tracker = AccessTracker(ALLKEYS_LRU)
+        [tracker.touch(key) for key in ("key-1", "key-2", "key-3", "key-1")]
+        self.assertEqual(tracker.coldest(["key-1", "key-2", "key-3"]), "key-2")
+        self.assertEqual(tracker.coldest(["key-1", "never-touched"]), "never-touched")
+
+    def test_lfu(self):
+        tracker = AccessTracker(ALLKEYS_LFU)
+        [tracker.touch("key-1") for _ in range(100)]
+        tracker.touch("key-2")
+        self.assertEqual(tracker.coldest(["key-1", "key-2"]), "key-2")
+        self.assertGreater(tracker.rank("key-1"), tracker.rank("key-2"))
+
+
+class EvictionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.engines = []
+
+    def engine(self, policy, max_memory):
+        os.environ.update(MAX_MEMORY=str(max_memory), EVICTION_POLICY=policy)
+        try:
+            engine = Ozza(test_mode=True)
+        finally:
+            os.environ.pop("MAX_MEMORY")
+            os.environ.pop("EVICTION_POLICY")
+        self.engines.append(engine)
+        return engine
+
+    def test_noeviction_rejects_writes(self):
+        ozza = self.engine("noeviction", 2000)
+        with self.assertRaises(OutOfMemoryException):
+            for number in range(100):
+                ozza.put_value("key-{}".format(number), "some-value")
+        self.assertLessEqual(len(ozza._memory_data), 10)
+        ozza.delete_resource("key-0")
+        self.assertEqual(ozza.eviction_stats().get("rejected_writes"), 1)
+
+    def test_lru_evicts_keys(self):
+        ozza = self.engine("allkeys-lru", 4000)
+        ozza.put_value("hot-key", "some-value")
+        for number in range(200):
+            ozza.put_value("key-{}".format(number), "some-value")
+            ozza.get_resource("hot-key")
+        stats = ozza.eviction_stats()
+        self.assertGreater(stats.get("evicted_keys"), 0)
+        self.assertLessEqual(stats.get("used_memory"), 4000 + 500)
+        self.assertTrue("hot-key" in ozza._memory_data)
+        self.assertTrue("key-199" in ozza._memory_data)
+
+    def test_volatile_ttl_evicts_soonest_expiring(self):
+        ozza = self.engine("volatile-ttl", 6000)
+        ozza.put_member("test-data", dict(id="lasting"))
+        for number in range(50):
+            ozza.put_member("test-data", dict(id="some-id{}".format(number)), expiry=1000 - number)
+        self.assertGreater(ozza.eviction_stats().get("evicted_members"), 0)
+        self.assertIsNotNone(ozza._resource("test-data").get("lasting"))
+        self.assertIsNotNone(ozza._resource("test-data").get("some-id0"))
+        self.assertIsNone(ozza._resource("test-data").get("some-id48"))
+        with self.assertRaises(OutOfMemoryException):
+            for number in range(50):
+                ozza.put_member("test-data", dict(id="no-expiry{}".format(number)))
+
+    def test_used_memory_survives_restart(self):
+        ozza = self.engine("noeviction", 0)
+        ozza.put_member("test-data", dict(id="some-id1", name="some-name"))
+        ozza.put_value("value-test", "some-value")
+        used_memory = ozza.used_memory
+        ozza.delete_resource("value-test")
+        self.assertLess(ozza.used_memory, used_memory)
+        ozza.put_value("value-test", "some-value")
+        ozza.close()
+        restarted = self.engine("noeviction", 0)
+        self.assertEqual(restarted.used_memory, used_memory)
+
+    def tearDown(self):
+        [engine._teardown_data() for engine in self.engines]
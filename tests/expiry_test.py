@@ -0,0 +1,113 @@
+import time
+import unittest
+
+from ozza import Ozza
+from ozza.expiry import ExpiryHeap
+
+
+class ExpiryHeapTest(unittest.TestCase):
+
+    def test_pop_due(self):
+        heap = ExpiryHeap()
+        heap.push(30, "test-data", "some-id3")
+        heap.push(10, "test-data", "some-id1")
+        heap.push(20, "test-data", "some-id2")
+        self.assertEqual(heap.count_due(25), 2)
+        self.assertEqual(heap.pop_due(25, 1), [(10, "test-data", "some-id1")])
+        self.assertEqual(heap.pop_due(25, 10), [(20, "test-data", "some-id2")])
+        self.assertEqual(len(heap), 1)
+
+    def test_one_live_entry_per_member(self):
+        heap = ExpiryHeap(rebuild_threshold=10)
+        heap.push(10, "test-data", "some-id1")
+        heap.push(10, "test-data", "some-id1")
+        self.assertEqual(len(heap._entries), 1)
+        for expiry_time in range(11, 100):
+            heap.push(expiry_time, "test-data", "some-id1")
+        heap.push(50, "test-data", "some-id2")
+        self.assertEqual(len(heap), 2)
+        self.assertLessEqual(len(heap._entries), 2 * len(heap) + 10)
+        self.assertEqual(heap.count_due(60), 1)
+        self.assertEqual(heap.pop_due(100, 10), [(50, "test-data", "some-id2"), (99, "test-data", "some-id1")])
+        heap.push(10, "test-data", "some-id3")
+        heap.discard("test-data", "some-id3")
+        self.assertEqual((len(heap), heap.count_due(100), heap.pop_soonest()), (0, 0, None))
+        heap.push(10, "test-data", "some-id3")
+        heap.push(20, "other-data", "some-id3")
+        heap.discard_key("test-data")
+        self.assertEqual((len(heap), heap.pop_soonest()), (1, (20, "other-data", "some-id3")))
+
+
+class OzzaExpiryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ozza = Ozza(test_mode=True)
+
+    def test_expired_members_are_absent(self):
+        self.ozza.put_member("test-data", dict(id="some-id1", name="some-name"), expiry=1)
+        self.ozza.put_member("test-data", dict(id="some-id2", name="some-name"))
+        self.ozza._expiry_reaper.stop()
+        time.sleep(1.1)
+        self.assertEqual([item.get("id") for item in self.ozza.get_resource("test-data")], ["some-id2"])
+        self.assertEqual(len(self.ozza.get_member_by_value("test-data", "some-name")), 1)
+        self.assertFalse(self.ozza.check_member("test-data", "some-id1"))
+        self.assertEqual(self.ozza.expiry_stats().get("backlog"), 1)
+        self.assertEqual(self.ozza.reap_expired(10), 1)
+        self.assertEqual(self.ozza.expiry_stats().get("tracked"), 0)
+        self.assertEqual(len(self.ozza._memory_data.get("test-data")), 1)
+
+    def test_reaper_deletes_expired_members(self):
+        self.ozza.put_member("test-data", dict(id="some-id1", name="some-name"), expiry=1)
+        self.ozza.put_member("test-data", dict(id="some-id2", name="some-name"), expiry=1)
+        self.ozza.put_member("test-data", dict(id="some-id2", name="some-name"), expiry=60)
+        deadline = time.time() + 3
+        while self.ozza.expiry_stats().get("reaped") < 1 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.ozza._memory_data.get("test-data").ids(), ["some-id2"])
+        self.assertEqual(self.ozza.expiry_stats().get("reaped"), 1)
+
+    def test_reaper_survives_errors(self):
+        reap_expired = self.ozza.reap_expired
+        calls = []
+
+        def failing_reap(limit):
+            calls.append(limit)
+            if len(calls) == 1:
+                raise IOError("disk full")
+            return reap_expired(limit)
+
+        self.ozza.reap_expired = failing_reap
+        self.ozza.put_member("test-data", dict(id="some-id1", name="some-name"), expiry=1)
+        deadline = time.time() + 3
+        while self.ozza.expiry_stats().get("reaped") < 1 and time.time() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.ozza._expiry_reaper.failed_runs, 1)
+        self.assertEqual(self.ozza.expiry_stats().get("reaped"), 1)
+
+    def test_rewrites_keep_one_entry(self):
+        self.ozza._expiry_reaper.stop()
+        for id_value in ("some-id1", "some-id2"):
+            self.ozza.put_member("test-data", dict(id=id_value, hits=0), expiry=60)
+        for _ in range(500):
+            self.ozza.patch_member("test-data", "some-id1", dict(increment=dict(hits=1)))
+            self.ozza.put_member("test-data", dict(id="some-id2", hits=0), expiry=60)
+        self.assertEqual(self.ozza.expiry_stats().get("tracked"), 2)
+        self.ozza.put_member("test-data", dict(id="some-id2", hits=0))
+        self.ozza.delete_member("test-data", "some-id1")
+        self.assertEqual(self.ozza.expiry_stats().get("tracked"), 0)
+
+    def test_replaced_resources_drop_their_entries(self):
+        self.ozza._expiry_reaper.stop()
+        for id_value in range(100):
+            self.ozza.put_member("test-data", dict(id="some-id{}".format(id_value)), expiry=60)
+        self.ozza.put_member("other-data", dict(id="some-id1"), expiry=60)
+        self.ozza.delete_resource("test-data")
+        self.assertEqual(self.ozza.expiry_stats().get("tracked"), 1)
+        self.ozza.put_member("test-data", dict(id="some-id1"), expiry=60)
+        self.ozza.put_value("test-data", "plain")
+        self.assertEqual(self.ozza.expiry_stats().get("tracked"), 1)
+        self.ozza._remove_key("other-data")
+        self.assertEqual(self.ozza.expiry_stats().get("tracked"), 0)
+
+    def tearDown(self):
+        self.ozza._teardown_data()
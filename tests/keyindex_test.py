@@ -0,0 +1,36 @@
+import unittest
+
+from ozza.keyindex import KeyIndex
+from ozza.keyindex import compile_pattern
+from ozza.keyindex import literal_prefix
+
+
+class KeyIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = KeyIndex(["session_acme_1", "session_acme_2", "session_other_1", "test-data"])
+
+    def test_literal_prefix(self):
+        self.assertEqual(literal_prefix("session_acme_*"), "session_acme_")
+        self.assertEqual(literal_prefix("*_acme"), "")
+        self.assertEqual(literal_prefix("test-data"), "test-data")
+
+    def test_match(self):
+        self.assertEqual(self.index.match("session_acme_*"), ["session_acme_1", "session_acme_2"])
+        self.assertEqual(self.index.match("session_*_1"), ["session_acme_1", "session_other_1"])
+        self.assertEqual(self.index.match("*-data"), ["test-data"])
+        self.assertEqual(self.index.match("session_acme_[2]"), ["session_acme_2"])
+
+    def test_add_and_discard(self):
+        self.index.add("session_acme_3")
+        self.index.add("session_acme_3")
+        self.assertEqual(len(self.index), 5)
+        self.index.discard("session_acme_1")
+        self.index.discard("not-found")
+        self.assertEqual(self.index.match("session_acme_*"), ["session_acme_2", "session_acme_3"])
+
+    def test_compiled_pattern_cache(self):
+        compile_pattern.cache_clear()
+        compile_pattern("s*e")
+        compile_pattern("s*e")
+        self.assertEqual(compile_pattern.cache_info().hits, 1)
@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+
+from ozza import Ozza
+from ozza.async_engine import AsyncOzza
+from ozza.metrics import Histogram
+from ozza.metrics import MetricsRegistry
+from ozza.metrics import gauge
+from ozza.metrics import merge_snapshots
+from ozza.metrics import render_metrics
+
+
+class MetricsTest(unittest.TestCase):
+
+    def test_histogram_buckets(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        [histogram.observe(seconds) for seconds in (0.05, 0.1, 0.5, 2)]
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.count, 4)
+
+    def test_render(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        registry.observe("ozza_engine_operation_seconds", 0.05, operation="get_member")
+        registry.observe("ozza_engine_operation_seconds", 0.5, operation="get_member")
+        rendered = render_metrics(registry.snapshot([gauge("ozza_keys", 3, kind="value")]))
+        self.assertIn("# TYPE ozza_engine_operation_seconds histogram", rendered)
+        self.assertIn('ozza_engine_operation_seconds_bucket{le="0.1",operation="get_member"} 1', rendered)
+        self.assertIn('ozza_engine_operation_seconds_bucket{le="+Inf",operation="get_member"} 2', rendered)
+        self.assertIn('ozza_engine_operation_seconds_count{operation="get_member"} 2', rendered)
+        self.assertIn('ozza_keys{kind="value"} 3', rendered)
+
+    def test_merge_with_label(self):
+        snapshots = [dict(gauges=[gauge("ozza_members", 1)]), dict(gauges=[gauge("ozza_members", 2)])]
+        rendered = render_metrics(merge_snapshots(snapshots, label="shard"))
+        self.assertIn('ozza_members{shard="0"} 1', rendered)
+        self.assertIn('ozza_members{shard="1"} 2', rendered)
+        self.assertEqual(rendered.count("# TYPE ozza_members gauge"), 1)
+
+
+class EngineMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ozza = Ozza(test_mode=True)
+
+    def test_engine_metrics(self):
+        self.ozza.create_index("test-data", "name")
+        self.ozza.put_member("test-data", dict(id="some-id1", name="some-name"))
+        self.ozza.put_member("test-data", dict(id="some-id2", name="some-name"))
+        self.ozza.put_value("value-test", "some-value")
+        self.ozza.save_snapshot()
+        engine = AsyncOzza(self.ozza)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(engine.call("get_member", "test-data", "some-id1"))
+        loop.run_until_complete(engine.close())
+        loop.close()
+        rendered = render_metrics(self.ozza.metrics())
+        self.assertIn('ozza_engine_operation_seconds_count{operation="get_member"} 1', rendered)
+        self.assertIn("ozza_log_commit_seconds_count 3", rendered)
+        self.assertIn('ozza_snapshot_seconds_count{phase="write"} 1', rendered)
+        self.assertIn('ozza_keys{kind="resource"} 1', rendered)
+        self.assertIn('ozza_keys{kind="value"} 1', rendered)
+        self.assertIn("ozza_members 2", rendered)
+        self.assertIn('ozza_resource_members{resource="test-data"} 2', rendered)
+        self.assertIn('ozza_index_values{field="name",resource="test-data"} 1', rendered)
+
+    def tearDown(self):
+        self.ozza._teardown_data()
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+import unittest
+
+from ozza import Ozza
+from ozza.oplog import OperationLog
+
+
+class OperationLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.location = "tests/oplog_test.log"
+
+    def test_replay(self):
+        log = OperationLog(self.location)
+        log.write({"op": "put_value", "key": "a", "value": 1})
+        log.write({"op": "put_value", "key": "b", "value": 2})
+        log.close()
+        records = list(OperationLog(self.location).replay())
+        self.assertEqual([record.get("key") for record in records], ["a", "b"])
+
+    def test_encoded_member(self):
+        log = OperationLog(self.location)
+        log.commit(log.append({"op": "put_member", "key": "a", "member": None}, b'{"id":"some-id"}'))
+        log.close()
+        records = list(OperationLog(self.location).replay())
+        self.assertEqual(records, [{"op": "put_member", "key": "a", "member": {"id": "some-id"}}])
+
+    def test_partial_record_is_ignored(self):
+        log = OperationLog(self.location)
+        log.write({"op": "put_value", "key": "a", "value": 1})
+        log.close()
+        with open(self.location, "a") as log_file:
+            log_file.write('{"op": "put_va')
+        records = list(OperationLog(self.location).replay())
+        self.assertEqual(len(records), 1)
+
+    def test_group_commit(self):
+        log = OperationLog(self.location)
+        threads = [threading.Thread(target=log.write, args=({"op": "put_value", "key": str(idx)},))
+                   for idx in range(20)]
+        [thread.start() for thread in threads]
+        [thread.join() for thread in threads]
+        log.close()
+        self.assertEqual(len(list(OperationLog(self.location).replay())), 20)
+
+    def test_interval_policy(self):
+        log = OperationLog(self.location, fsync_policy="10")
+        log.write({"op": "put_value", "key": "a", "value": 1})
+        log.close()
+        self.assertEqual(len(list(OperationLog(self.location).replay())), 1)
+        with self.assertRaises(ValueError):
+            OperationLog(self.location, fsync_policy="sometimes")
+
+    def test_failed_write_is_retried(self):
+        log = OperationLog(self.location)
+        log.write({"op": "put_value", "key": "a", "value": 1})
+        data_file = log._open()
+        write = data_file.write
+
+        def fail_once(data):
+            write(data[:5])
+            data_file.write = write
+            raise IOError("disk full")
+
+        data_file.write = fail_once
+        with self.assertRaises(IOError):
+            log.write({"op": "put_value", "key": "b", "value": 2})
+        log.write({"op": "put_value", "key": "c", "value": 3})
+        log.close()
+        records = list(OperationLog(self.location).replay())
+        self.assertEqual([record.get("key") for record in records], ["a", "b", "c"])
+
+    def tearDown(self):
+        if os.path.exists(self.location):
+            os.remove(self.location)
+
+
+class OzzaOperationLogTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ozza = Ozza(test_mode=True)
+
+    def test_restart_replays_log(self):
+        self.ozza.put_member("test-data", dict(id="some-id", name="some-name"))
+        self.ozza.put_member("test-data", dict(id="some-id", name="some-updated-name"))
+        self.ozza.put_member("test-data", dict(id="some-id2", name="some-name2"))
+        self.ozza.delete_member("test-data", "some-id2")
+        self.ozza.put_value("value-test", "some-value")
+        self.ozza.close()
+        restarted = Ozza(test_mode=True)
+        self.assertEqual(restarted.get_member("test-data", "some-id").get("name"), "some-updated-name")
+        self.assertFalse(restarted.check_member("test-data", "some-id2"))
+        self.assertEqual(restarted._memory_data.get("value-test"), "some-value")
+        restarted.close()
+
+    def test_save_snapshot(self):
+        self.assertFalse(self.ozza.save_snapshot())
+        for idx in range(10):
+            self.ozza.put_member("test-data", dict(id="some-id{}".format(idx), name="some-name"))
+        self.assertTrue(self.ozza.save_snapshot())
+        self.assertEqual(self.ozza._operation_log.size, 0)
+        self.assertEqual(self.ozza.dirty_operations, 0)
+        self.ozza.put_member("test-data", dict(id="some-id10", name="some-name"))
+        self.ozza.close()
+        restarted = Ozza(test_mode=True)
+        self.assertEqual(len(restarted.get_resource("test-data")), 11)
+        restarted.close()
+
+    def test_log_compaction(self):
+        self.ozza._log_compaction_size = 200
+        for idx in range(10):
+            self.ozza.put_member("test-data", dict(id="some-id{}".format(idx), name="some-name"))
+        deadline = time.time() + 2
+        while self.ozza.dirty_operations and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.ozza.dirty_operations, 0)
+        self.ozza.close()
+        restarted = Ozza(test_mode=True)
+        self.assertEqual(len(restarted.get_resource("test-data")), 10)
+        restarted.close()
+
+    def tearDown(self):
+        self.ozza._teardown_data()
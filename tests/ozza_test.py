@@ -1,9 +1,11 @@
+import json
 import os
 import time
 import unittest
 
 from ozza import Ozza
 from ozza.exceptions import *
+from tests.compact_test import race_readers
 
 
 class OzzaTest(unittest.TestCase):
@@ -195,6 +197,44 @@ class OzzaTest(unittest.TestCase):
         result_or = self.ozza.multiple_filter_member("test-data", filters, condition="or")
         self.assertEqual(len(result_or), 2)
 
+    def test_indexed_filters(self):
+        self.ozza.create_index("test-data", "name")
+        self.ozza.put_member("test-data", dict(id="some-id", name="some-name", phone="somephone"))
+        self.ozza.put_member("test-data", dict(id="some-id2", name="some-name", phone="otherphone"))
+        self.ozza.put_member("test-data", dict(id="some-id3", name="other-name", phone="somephone"))
+        self.assertEqual(self.ozza.get_indexes("test-data"), ["name"])
+        result = self.ozza.get_member_by_field_value("test-data", "name", "some-name")
+        self.assertEqual([item.get("id") for item in result], ["some-id", "some-id2"])
+        filters = [{"field": "name", "value": "some-name"}, {"field": "phone", "value": "somephone"}]
+        result_and = self.ozza.multiple_filter_member("test-data", filters, condition="and")
+        self.assertEqual([item.get("id") for item in result_and], ["some-id"])
+        result_or = self.ozza.multiple_filter_member("test-data", filters, condition="or")
+        self.assertEqual([item.get("id") for item in result_or], ["some-id", "some-id2", "some-id3"])
+        self.ozza.put_member("test-data", dict(id="some-id2", name="other-name"))
+        result = self.ozza.get_member_by_field_value("test-data", "name", "other-name")
+        self.assertEqual([item.get("id") for item in result], ["some-id2", "some-id3"])
+        self.ozza.close()
+        restarted = Ozza(test_mode=True)
+        self.assertTrue(restarted._memory_data.get("test-data").is_indexed("name"))
+        restarted.close()
+
+    def test_value_index(self):
+        self.ozza.create_value_index("test-data")
+        self.ozza.put_member("test-data", dict(id="some-id1", name="some-name1", age=21))
+        self.ozza.put_member("test-data", dict(id="some-id2", name="some-name2", age=32))
+        self.ozza.put_member("test-data", dict(id="other-id3", name="other-name3", age=21))
+        result = self.ozza.get_member_by_value("test-data", "21")
+        self.assertEqual([item.get("id") for item in result], ["some-id1", "other-id3"])
+        result = self.ozza.get_member_by_value("test-data", "some-*")
+        self.assertEqual([item.get("id") for item in result], ["some-id1", "some-id2"])
+        result = self.ozza.get_member_by_value("test-data", "some-name?")
+        self.assertEqual([item.get("id") for item in result], ["some-id1", "some-id2"])
+        result = self.ozza.get_member_by_value("test-data", "*name3")
+        self.assertEqual([item.get("id") for item in result], ["other-id3"])
+        self.ozza.delete_member("test-data", "some-id1")
+        result = self.ozza.get_member_by_value("test-data", "21")
+        self.assertEqual([item.get("id") for item in result], ["other-id3"])
+
     def test_put_value(self):
         with self.assertRaises(EmptyParameterException):
             self.ozza.put_value(None, None)
@@ -202,6 +242,155 @@ class OzzaTest(unittest.TestCase):
         test_value = self.ozza.get_resource("value-test")
         self.assertEqual(data, test_value)
 
+    def test_resource_page(self):
+        self.ozza.put_members("test-data", [dict(id="some-id{}".format(idx)) for idx in range(5)])
+        self.ozza.put_value("test-value", "some-value")
+        page = self.ozza.get_resource_page("test-data", 2)
+        self.assertEqual([item.get("id") for item in page.get("result")], ["some-id0", "some-id1"])
+        self.ozza.delete_member("test-data", "some-id1")
+        page = self.ozza.get_resource_page("test-data", 2, page.get("cursor"))
+        self.assertEqual([item.get("id") for item in page.get("result")], ["some-id2", "some-id3"])
+        page = self.ozza.get_resource_page("test-*", 2, page.get("cursor"))
+        self.assertEqual(page.get("result"), [dict(self.ozza.get_member("test-data", "some-id4")), "some-value"])
+        self.assertIsNone(page.get("cursor"))
+
+    def test_version(self):
+        version = self.ozza.get_version("test-data")
+        store_version = self.ozza.get_version("*")
+        self.ozza.put_member("test-data", dict(id="some-id"))
+        self.assertNotEqual(self.ozza.get_version("test-data"), version)
+        self.assertNotEqual(self.ozza.get_version("*"), store_version)
+        version = self.ozza.get_version("test-data")
+        self.ozza.put_value("value-test", "some-value")
+        self.assertEqual(self.ozza.get_version("test-data"), version)
+        self.ozza.delete_member("test-data", "some-id")
+        self.assertNotEqual(self.ozza.get_version("test-data"), version)
+
+    def test_removed_keys_drop_their_version(self):
+        versions = set()
+        for _ in range(100):
+            self.ozza.put_value("value-test", "some-value")
+            versions.add(self.ozza.get_version("value-test"))
+            self.ozza.delete_resource("value-test")
+        self.assertEqual(len(versions), 100)
+        self.assertEqual(self.ozza._versions, {})
+        self.assertNotIn(self.ozza.get_version("value-test"), versions)
+
+    def test_memory_usage(self):
+        self.ozza.put_member("test-data", dict(id="some-id1", name="some-name"))
+        self.ozza.put_value("value-test", "some-value")
+        usage = self.ozza.memory_usage("*")
+        self.assertEqual(list(usage.get("keys")), ["test-data", "value-test"])
+        self.assertEqual(usage.get("total"), sum(usage.get("keys").values()))
+        self.assertEqual(list(self.ozza.memory_usage("test-data").get("keys")), ["test-data"])
+        self.assertEqual(self.ozza.memory_usage("missing-key").get("total"), 0)
+
+    def test_encoded_reads(self):
+        self.ozza.put_member("test-data", dict(id="some-id1", name="some-name"))
+        self.ozza.put_member("test-data", dict(id="some-id2", name="some-name"), expiry=60)
+        self.ozza.put_member("test-data", dict(id="some-id1", name="other-name"))
+        self.ozza.put_value("test-value", [1, 2])
+        self.assertEqual(json.loads(self.ozza.get_resource_encoded("test-data")), self.ozza.get_resource("test-data"))
+        self.assertEqual(json.loads(self.ozza.get_resource_encoded("test-*")), self.ozza.get_resource("test-*"))
+        self.assertEqual(json.loads(self.ozza.get_resource_encoded("test-value")), [1, 2])
+        self.assertEqual(json.loads(self.ozza.get_member_encoded("test-data", "some-id1")),
+                         self.ozza.get_member("test-data", "some-id1"))
+        self.assertEqual(self.ozza.get_member_encoded("test-data", "missing-id"), b"[]")
+        self.assertEqual(json.loads(self.ozza.get_members_encoded("test-data", ["some-id2", "missing-id", "some-id1"])),
+                         self.ozza.get_members("test-data", ["some-id2", "missing-id", "some-id1"]))
+        with self.assertRaises(ResourceNotFoundException):
+            self.ozza.get_member_encoded("missing-data", "some-id1")
+
+    def test_bulk_members(self):
+        members = [dict(id="some-id1", name="some-name1"), dict(id="some-id2", expire_in=60), dict(name="no-id")]
+        result = self.ozza.put_members("test-data", members)
+        self.assertEqual(result[0].get("result").get("name"), "some-name1")
+        self.assertNotIn("expire_in", result[1].get("result"))
+        self.assertGreater(result[1].get("result").get("expiry_time"), 0)
+        self.assertEqual(result[2].get("status"), 400)
+        result = self.ozza.get_members("test-data", ["some-id2", "missing-id", "some-id1"])
+        self.assertEqual([item.get("id") for item in result], ["some-id2", "some-id1"])
+        self.assertEqual(self.ozza.delete_members("test-data", ["some-id1", "missing-id"]), 1)
+        self.assertEqual([item.get("id") for item in self.ozza.get_resource("test-data")], ["some-id2"])
+
+    def test_bulk_members_invalid_items(self):
+        members = [dict(id="some-id1"), dict(id="some-id2", expire_in="soon"), dict(id=["some-id3"]),
+                   dict(id="some-id4", expire_in="5")]
+        result = self.ozza.put_members("test-data", members)
+        self.assertEqual([item.get("status") for item in result], [None, 400, 400, None])
+        self.assertGreater(result[3].get("result").get("expiry_time"), 0)
+        self.assertEqual(self.ozza.get_resource("test-data"), [result[0].get("result"), result[3].get("result")])
+
+    def test_failed_mutation_commits_logged_operations(self):
+        def members():
+            yield dict(id="some-id1")
+            raise ValueError("broken input")
+
+        with self.assertRaises(ValueError):
+            self.ozza.put_members("test-data", members())
+        self.assertEqual(getattr(self.ozza._pending, "seq", 0), 0)
+        self.assertTrue(self.ozza.check_member("test-data", "some-id1"))
+
+    def test_reads_during_writes(self):
+        def write(ozza, step):
+            id_value = "some-id{}".format(step % 50)
+            if step % 3 == 0:
+                ozza.delete_member("test-data", id_value)
+            ozza.put_member("test-data", dict(id=id_value, a=step, b=step))
+
+        def read(ozza):
+            for member in ozza.get_resource("test-data"):
+                assert member.get("a") == member.get("b"), member
+            member = ozza.get_member("test-data", "some-id7")
+            assert member == [] or member.get("id") == "some-id7", member
+            ozza.query("test-data", dict(where=dict(field="a", op="gte", value=0)))
+
+        self.ozza.put_member("test-data", dict(id="some-id0", a=0, b=0))
+        self.assertEqual(race_readers(self.ozza, write, read), [])
+
+    def test_patch_member(self):
+        self.ozza.put_member("test-data", dict(id="some-id", name="some-name", count=1, tags=["a"]))
+        operations = self.ozza.dirty_operations
+        member = self.ozza.patch_member("test-data", "some-id",
+                                        dict(set=dict(name=None, city="jakarta"), increment=dict(count=2, hits=-1),
+                                             append=dict(tags="b")))
+        self.assertEqual(self.ozza.dirty_operations, operations + 1)
+        self.assertNotIn("name", member)
+        self.assertEqual((member.get("city"), member.get("count"), member.get("hits")), ("jakarta", 3, -1))
+        self.assertEqual(member.get("tags"), ["a", "b"])
+        self.assertEqual(self.ozza.get_member("test-data", "some-id"), member)
+        self.assertEqual(json.loads(self.ozza.get_member_encoded("test-data", "some-id")), member)
+        self.assertEqual(self.ozza.changes_after(0, 100).get("events")[-1].get("type"), "update")
+        with self.assertRaises(InvalidPatchException):
+            self.ozza.patch_member("test-data", "some-id", dict(increment=dict(city=1)))
+        with self.assertRaises(InvalidPatchException):
+            self.ozza.patch_member("test-data", "some-id", dict(set=dict(id="other-id")))
+        self.assertEqual(self.ozza.dirty_operations, operations + 1)
+
+    def test_patch_member_preconditions(self):
+        self.ozza.put_member("test-data", dict(id="some-id", state="open"))
+        version = self.ozza.get_version("test-data")
+        with self.assertRaises(PreconditionFailedException):
+            self.ozza.patch_member("test-data", "some-id", dict(set=dict(state="closed"), expect=dict(state="new")))
+        patch = dict(set=dict(state="closed"), expect=dict(state="open"))
+        member = self.ozza.patch_member("test-data", "some-id", patch, expected_version=version)
+        self.assertEqual(member.get("state"), "closed")
+        with self.assertRaises(PreconditionFailedException):
+            self.ozza.patch_member("test-data", "some-id", dict(set=dict(state="open")), expected_version=version)
+        self.assertEqual(self.ozza.get_member("test-data", "some-id").get("state"), "closed")
+
+    def test_patch_creates_member(self):
+        member = self.ozza.patch_member("counter-data", "some-id", dict(increment=dict(hits=1), expire_in=60,
+                                                                        expect=dict(hits=None)))
+        self.assertEqual(member.get("hits"), 1)
+        self.assertGreater(member.get("expiry_time"), 0)
+        self.assertEqual(self.ozza.changes_after(0, 100).get("events")[-1].get("type"), "create")
+        member = self.ozza.patch_member("counter-data", "some-id", dict(increment=dict(hits=1), expire_in=0))
+        self.assertEqual(member.get("hits"), 2)
+        self.assertGreater(member.get("expiry_time"), 0)
+        self.ozza.put_value("some-value", "value")
+        with self.assertRaises(ResourceNotFoundException):
+            self.ozza.patch_member("some-value", "some-id", dict(increment=dict(hits=1)))
 
     def tearDown(self):
         self.ozza._teardown_data()
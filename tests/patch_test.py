@@ -0,0 +1,37 @@
+import unittest
+
+from ozza.exceptions import InvalidPatchException
+from ozza.exceptions import PreconditionFailedException
+from ozza.patch import apply_patch
+from ozza.patch import check_expected
+from ozza.patch import validate_patch
+
+
+class PatchTest(unittest.TestCase):
+
+    def test_validate_patch(self):
+        validate_patch(dict(set=dict(name="some-name"), increment=dict(count=1.5), expect=dict(count=1)))
+        for patch in [None, {}, dict(expect=dict(count=1)), dict(replace=dict(name="some-name")),
+                      dict(set=["name"]), dict(set=dict(created_at=0)), dict(increment=dict(count="1")),
+                      dict(increment=dict(count=True)), dict(set=dict(count=1), increment=dict(count=1)),
+                      dict(append=dict(tags="a"), expire_in=-1)]:
+            with self.assertRaises(InvalidPatchException):
+                validate_patch(patch)
+
+    def test_apply_patch(self):
+        member = dict(id="some-id", name="some-name", count=1)
+        result = apply_patch(member, dict(set=dict(name=None, missing=None), increment=dict(count=-2, new=1),
+                                          append=dict(tags=dict(a=1))))
+        self.assertEqual(result, dict(id="some-id", count=-1, new=1, tags=[dict(a=1)]))
+        self.assertEqual(member.get("name"), "some-name")
+        with self.assertRaises(InvalidPatchException):
+            apply_patch(member, dict(append=dict(name="a")))
+
+    def test_check_expected(self):
+        member = dict(id="some-id", count=1)
+        check_expected(member, dict(count=1, missing=None))
+        check_expected(member, None)
+        with self.assertRaises(PreconditionFailedException):
+            check_expected(member, dict(count=2))
+        with self.assertRaises(PreconditionFailedException):
+            check_expected(member, dict(count=None))
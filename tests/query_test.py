@@ -0,0 +1,69 @@
+import unittest
+
+from ozza import Ozza
+from ozza.exceptions import InvalidQueryException
+from ozza.query import compile_predicate
+from ozza.query import compile_query
+
+MEMBERS = [
+    dict(id="some-id1", name="some-name1", age=21, city="jakarta"),
+    dict(id="some-id2", name="some-name2", age=32, city="bandung"),
+    dict(id="other-id3", name="other-name3", age=45.5, city="jakarta"),
+    dict(id="other-id4", name="other-name4", age="unknown"),
+]
+
+
+def ids(members):
+    return [member.get("id") for member in members]
+
+
+class QueryTest(unittest.TestCase):
+
+    def test_operators(self):
+        self.assertEqual(ids(filter(compile_predicate(dict(field="age", op="gte", value=32)), MEMBERS)),
+                         ["some-id2", "other-id3"])
+        self.assertEqual(ids(filter(compile_predicate(dict(field="age", op="between", value=[20, 40])), MEMBERS)),
+                         ["some-id1", "some-id2"])
+        self.assertEqual(ids(filter(compile_predicate(dict(field="city", op="in", value=["bandung"])), MEMBERS)),
+                         ["some-id2"])
+        self.assertEqual(ids(filter(compile_predicate(dict(field="name", op="glob", value="other-*")), MEMBERS)),
+                         ["other-id3", "other-id4"])
+        self.assertEqual(ids(filter(compile_predicate(dict(field="city", op="ne", value="jakarta")), MEMBERS)),
+                         ["some-id2", "other-id4"])
+
+    def test_nesting(self):
+        where = {"or": [{"and": [dict(field="city", value="jakarta"), dict(field="age", op="lt", value=30)]},
+                        dict(field="age", value="unknown")]}
+        self.assertEqual(ids(filter(compile_predicate(where), MEMBERS)), ["some-id1", "other-id4"])
+
+    def test_sort_limit_select(self):
+        query = compile_query(dict(sort="-age", limit=2, select=["id", "age"]))
+        self.assertEqual(query.run(MEMBERS[:3]), [dict(id="other-id3", age=45.5), dict(id="some-id2", age=32)])
+        query = compile_query(dict(sort=["city", {"field": "age", "order": "desc"}], limit=3))
+        self.assertEqual(ids(query.run(MEMBERS)), ["some-id2", "other-id3", "some-id1"])
+        self.assertEqual(ids(compile_query(dict(limit=1)).run(MEMBERS)), ["some-id1"])
+
+    def test_invalid_query(self):
+        with self.assertRaises(InvalidQueryException):
+            compile_predicate(dict(field="age", op="like", value=1))
+        with self.assertRaises(InvalidQueryException):
+            compile_predicate(dict(field="age", op="gt", value=[1]))
+        with self.assertRaises(InvalidQueryException):
+            compile_query(dict(limit=-1))
+
+
+class OzzaQueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ozza = Ozza(test_mode=True)
+        self.ozza.put_members("test-data", MEMBERS)
+
+    def test_query(self):
+        query = dict(where={"and": [dict(field="city", value="jakarta"), dict(field="age", op="gt", value=20)]},
+                     sort="age", select=["id"])
+        self.assertEqual(self.ozza.query("test-data", query), [dict(id="some-id1"), dict(id="other-id3")])
+        self.ozza.create_index("test-data", "city")
+        self.assertEqual(self.ozza.query("test-data", query), [dict(id="some-id1"), dict(id="other-id3")])
+
+    def tearDown(self):
+        self.ozza._teardown_data()
@@ -0,0 +1,122 @@
+import asyncio
+import time
+import unittest
+
+from ozza import Ozza
+from ozza.exceptions import ReadOnlyReplicaException
+from ozza.replication import ReplicationFollower
+from ozza.replication import ReplicationLeader
+from ozza.replication import ReplicationLog
+from ozza.replication import parse_address
+
+
+class ReplicationLogTest(unittest.TestCase):
+
+    def test_read_after(self):
+        log = ReplicationLog(size=3)
+        [log.append(dict(op="put_value", key="key-{}".format(idx))) for idx in range(5)]
+        self.assertEqual(log.offset, 5)
+        self.assertEqual([record.get("key") for record in log.read_after(3, 10)], ["key-3", "key-4"])
+        self.assertEqual([record.get("key") for record in log.read_after(2, 1)], ["key-2"])
+        self.assertEqual(log.read_after(5, 10), [])
+        self.assertIsNone(log.read_after(1, 10))
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address("10.0.0.1:7000"), ("10.0.0.1", 7000))
+        self.assertEqual(parse_address(":7000"), ("127.0.0.1", 7000))
+
+
+class ReplicationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.leader_engine = Ozza(data_filename="leader_store.oz")
+        self.leader_engine.put_member("test-data", dict(id="some-id0", name="some-name"))
+        self.leader_engine.put_value("some-value", "value")
+        self.leader = ReplicationLeader(self.leader_engine, "127.0.0.1", 0)
+        self.loop.run_until_complete(self.leader.start())
+        self.follower_engine = Ozza(data_filename="follower_store.oz")
+        self.follower = self.start_follower()
+
+    def start_follower(self):
+        follower = ReplicationFollower(self.follower_engine, "127.0.0.1:{}".format(self.leader.port),
+                                       retry_interval=0.05)
+        self.loop.run_until_complete(follower.start())
+        return follower
+
+    def wait_until(self, condition, timeout=5):
+        async def poll():
+            deadline = time.time() + timeout
+            while not condition():
+                self.assertLess(time.time(), deadline)
+                await asyncio.sleep(0.01)
+        self.loop.run_until_complete(poll())
+
+    def wait_for_sync(self):
+        self.wait_until(lambda: self.follower.offset == self.leader_engine.replication_log.offset and
+                        self.follower.replication_id is not None)
+
+    def test_full_sync(self):
+        self.wait_for_sync()
+        self.assertEqual(self.follower_engine.get_member("test-data", "some-id0").get("name"), "some-name")
+        self.assertEqual(self.follower_engine.get_resource("some-value"), "value")
+
+    def test_incremental_operations(self):
+        self.wait_for_sync()
+        for idx in range(1, 50):
+            self.leader_engine.put_member("test-data", dict(id="some-id{}".format(idx), name="some-name"))
+        self.leader_engine.delete_member("test-data", "some-id0")
+        self.leader_engine.create_resource("other-data")
+        self.wait_for_sync()
+        self.assertEqual(len(self.follower_engine.get_resource("test-data")), 49)
+        self.assertFalse(self.follower_engine.check_member("test-data", "some-id0"))
+        self.assertTrue(self.follower_engine.check_resource("other-data"))
+        status = self.follower_engine.replication_status()
+        self.assertEqual(status.get("role"), "follower")
+        self.assertTrue(status.get("connected"))
+        self.assertEqual(status.get("lag_operations"), 0)
+        followers = self.leader_engine.replication_status().get("followers")
+        self.assertEqual(followers[0].get("offset"), status.get("offset"))
+
+    def test_follower_is_read_only(self):
+        self.wait_for_sync()
+        with self.assertRaises(ReadOnlyReplicaException):
+            self.follower_engine.put_member("test-data", dict(id="some-id1", name="some-name"))
+        self.assertFalse(self.follower_engine.check_member("test-data", "some-id1"))
+
+    def test_reconnect_continues_from_backlog(self):
+        self.wait_for_sync()
+        replication_id = self.follower.replication_id
+        self.loop.run_until_complete(self.follower.stop())
+        self.leader_engine.put_member("test-data", dict(id="some-id1", name="some-name"))
+        self.assertFalse(self.follower.status().get("connected"))
+        self.loop.run_until_complete(self.follower.start())
+        self.wait_for_sync()
+        self.assertEqual(self.follower.replication_id, replication_id)
+        self.assertEqual(self.follower.full_syncs, 1)
+        self.assertTrue(self.follower_engine.check_member("test-data", "some-id1"))
+
+    def test_resync_after_backlog(self):
+        self.wait_for_sync()
+        self.loop.run_until_complete(self.follower.stop())
+        for idx in range(1, 20):
+            self.leader_engine.put_member("test-data", dict(id="some-id{}".format(idx), name="some-name"))
+        self.leader_engine.replication_log._records.clear()
+        self.loop.run_until_complete(self.follower.start())
+        self.wait_for_sync()
+        self.assertEqual(self.follower.full_syncs, 2)
+        self.assertEqual(len(self.follower_engine.get_resource("test-data")), 20)
+
+    def test_metrics(self):
+        self.wait_for_sync()
+        gauges = {series.get("name"): series for series in self.follower_engine.metrics().get("gauges")}
+        self.assertEqual(gauges.get("ozza_replication_lag_operations").get("value"), 0)
+        self.assertEqual(gauges.get("ozza_replication_offset").get("labels"), dict(role="follower"))
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.follower.stop())
+        self.loop.run_until_complete(self.leader.stop())
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+        self.loop.close()
+        self.follower_engine._teardown_data()
+        self.leader_engine._teardown_data()
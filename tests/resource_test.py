@@ -0,0 +1,86 @@
+import unittest
+
+from ozza.resource import Resource
+from ozza.resource import ValueIndex
+from ozza.resource import id_sort_key
+
+
+class ResourceTest(unittest.TestCase):
+
+    def test_is_resource_data(self):
+        self.assertTrue(Resource.is_resource_data([]))
+        self.assertTrue(Resource.is_resource_data([{"id": "some-id"}]))
+        self.assertFalse(Resource.is_resource_data([{"name": "some-name"}]))
+        self.assertFalse(Resource.is_resource_data("some-value"))
+
+    def test_put_keeps_order(self):
+        resource = Resource([dict(id="some-id1"), dict(id="some-id2"), dict(id="some-id3")])
+        resource.put(dict(id="some-id2", name="some-name"))
+        self.assertEqual(resource.ids(), ["some-id1", "some-id2", "some-id3"])
+        self.assertEqual(resource.get("some-id2").get("name"), "some-name")
+
+    def test_remove(self):
+        resource = Resource([dict(id="some-id1"), dict(id="some-id2")])
+        self.assertTrue(resource.remove("some-id1"))
+        self.assertFalse(resource.remove("some-id1"))
+        self.assertFalse("some-id1" in resource)
+        self.assertEqual(len(resource), 1)
+
+    def test_members_after(self):
+        resource = Resource([dict(id="b"), dict(id=2), dict(id="a")])
+        self.assertEqual([member.get("id") for member in resource.members_after()], [2, "a", "b"])
+        resource.put(dict(id="aa"))
+        resource.remove("b")
+        after_key = id_sort_key("a")
+        self.assertEqual([member.get("id") for member in resource.members_after(after_key)], ["aa"])
+
+    def test_memory_size(self):
+        resource = Resource()
+        resource.put(dict(id="some-id1", name="some-name"))
+        resource.put(dict(id="some-id2", name="some-name"))
+        size = resource.memory_size
+        self.assertGreater(size, 0)
+        resource.put(dict(id="some-id2", name="some-longer-name"))
+        self.assertGreater(resource.memory_size, size)
+        resource.remove("some-id2")
+        resource.remove("some-id1")
+        self.assertEqual(resource.memory_size, 0)
+        resource.put(dict(id="some-id1"))
+        resource.create_index("id")
+        self.assertGreater(resource.memory_usage(), resource.memory_size)
+
+    def test_encoded_members(self):
+        resource = Resource([dict(id="some-id1", expiry_time=0), dict(id="some-id2", expiry_time=1000)])
+        resource.put(dict(id="some-id1", name="some-name", expiry_time=0))
+        self.assertEqual(resource.encoded("some-id1"), b'{"id":"some-id1","name":"some-name","expiry_time":0}')
+        self.assertEqual(len(resource.encoded_members(now=999)), 2)
+        self.assertEqual(resource.encoded_members(now=1000), [resource.encoded("some-id1")])
+        self.assertIsNone(resource.encoded("some-id2", now=1000))
+        self.assertEqual(resource.capture().encoded, resource.encoded_members())
+        resource.remove("some-id1")
+        self.assertIsNone(resource.encoded("some-id1"))
+        self.assertEqual(resource.expiring_count, 1)
+        plain = Resource([dict(id="some-id1", name="some-name")], encoded=False)
+        self.assertEqual(plain.encoded_members(), [b'{"id":"some-id1","name":"some-name"}'])
+        self.assertLess(plain.memory_size, Resource([dict(id="some-id1", name="some-name")]).memory_size)
+
+    def test_index(self):
+        resource = Resource([dict(id="some-id1", tags=["a"]), dict(id="some-id2", tags=["a"]), dict(id="some-id3")])
+        resource.create_index("tags")
+        self.assertEqual(resource.lookup("tags", ["a"]), {"some-id1", "some-id2"})
+        self.assertEqual(resource.lookup("tags", None), {"some-id3"})
+        resource.remove("some-id1")
+        self.assertEqual(resource.lookup("tags", ["a"]), {"some-id2"})
+        self.assertTrue(resource.has_field("tags"))
+        resource.remove("some-id2")
+        self.assertFalse(resource.has_field("tags"))
+
+    def test_value_index(self):
+        index = ValueIndex()
+        index.add("some-id1", dict(id="some-id1", name="some-name", age=21))
+        index.add("some-id2", dict(id="some-id2", name="other-name", age=21))
+        self.assertEqual(index.lookup("21"), {"some-id1", "some-id2"})
+        self.assertEqual(index.lookup_prefix("some-"), {"some-id1", "some-id2"})
+        self.assertEqual(index.lookup_prefix("other"), {"some-id2"})
+        index.remove("some-id2", dict(id="some-id2", name="other-name", age=21))
+        self.assertEqual(index.lookup_prefix("other"), set())
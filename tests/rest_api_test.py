@@ -0,0 +1,149 @@
+import asyncio
+import inspect
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+try:
+    from rest_api import create_api
+    from rest_api.api_service import ApiService
+except ImportError:
+    raise unittest.SkipTest("Sanic is not installed")
+
+
+class RestApiTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data_directory = os.environ.get("DATA_DIRECTORY")
+        os.environ["DATA_DIRECTORY"] = tempfile.mkdtemp()
+        self.loop = asyncio.new_event_loop()
+        self.service = ApiService()
+        self.api = create_api(self.service)
+        self.client = self.api.asgi_client
+
+    def request(self, method, uri, **kwargs):
+        _, response = self.loop.run_until_complete(getattr(self.client, method)(uri, **kwargs))
+        return response
+
+    def test_bulk_members(self):
+        response = self.request("put", "/test-data?bulk=true",
+                                json=[dict(id="some-id1"), dict(id="some-id2", expire_in="soon"), dict(name="no-id")])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item.get("status") for item in response.json().get("result")], [None, 400, 400])
+        response = self.request("put", "/test-data?bulk=true", data='{"id": "some-id3"}\n{"id": "some-id4"}\n',
+                                headers={"content-type": "application/x-ndjson"})
+        self.assertEqual(len(response.json().get("result")), 2)
+        response = self.request("put", "/test-data?bulk=true", data='{"id": "some-id5"}\nnot json\n',
+                                headers={"content-type": "application/x-ndjson"})
+        self.assertEqual(response.status_code, 400)
+        response = self.request("put", "/test-data?bulk=true", json=dict(id="some-id5"))
+        self.assertEqual(response.status_code, 400)
+        response = self.request("get", "/test-data?ids=some-id4,missing-id,some-id1")
+        self.assertEqual([item.get("id") for item in response.json().get("result")], ["some-id4", "some-id1"])
+        response = self.request("delete", "/test-data?ids=some-id1,missing-id")
+        self.assertEqual(response.json(), dict(result=1))
+        response = self.request("put", "/test-data?member=true&expire_in=soon", json=dict(id="some-id6"))
+        self.assertEqual(response.status_code, 400)
+
+    def test_pages(self):
+        self.request("put", "/test-data?bulk=true", json=[dict(id="some-id{}".format(idx)) for idx in range(5)])
+        response = self.request("get", "/test-data?limit=3")
+        self.assertEqual([item.get("id") for item in response.json().get("result")],
+                         ["some-id0", "some-id1", "some-id2"])
+        response = self.request("get", "/test-data?limit=3&cursor={}".format(response.json().get("cursor")))
+        self.assertEqual([item.get("id") for item in response.json().get("result")], ["some-id3", "some-id4"])
+        self.assertIsNone(response.json().get("cursor"))
+        for uri in ("/test-data?limit=many", "/test-data?limit=0", "/test-data?limit=3&cursor=%%%",
+                    "/test-data?limit=3&cursor=e30=", "/test-data?stream=xml"):
+            self.assertEqual(self.request("get", uri).status_code, 400, uri)
+
+    def test_queries(self):
+        self.request("put", "/test-data?bulk=true", json=[dict(id="some-id1", city="jakarta", age=30),
+                                                          dict(id="some-id2", city="bandung", age=20),
+                                                          dict(id="some-id3", city="jakarta", age=25)])
+        response = self.request("post", "/test-data", json=dict(where=dict(field="city", value="jakarta"),
+                                                                sort=["-age"], select=["id"]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), dict(result=[dict(id="some-id1"), dict(id="some-id3")]))
+        response = self.request("post", "/test-data?aggregate=true",
+                                json=dict(aggregates=dict(total_age=dict(op="sum", field="age"))))
+        self.assertEqual(response.json().get("result").get("total_age"), 75)
+        response = self.request("post", "/test-data", json=dict(where=dict(field="age", op="near", value=1)))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.json())
+
+    def test_etags(self):
+        self.request("put", "/test-data?member=true", json=dict(id="some-id1", name="first"))
+        response = self.request("get", "/test-data")
+        etag = response.headers.get("etag")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(etag)
+        response = self.request("get", "/test-data", headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers.get("etag"), etag)
+        self.assertEqual(self.request("get", "/test-data/some-id1", headers={"if-none-match": etag}).status_code, 304)
+        self.request("put", "/test-data?member=true", json=dict(id="some-id2", name="second"))
+        response = self.request("get", "/test-data", headers={"if-none-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers.get("etag"), etag)
+        self.assertEqual(len(response.json().get("result")), 2)
+
+    def test_change_feed(self):
+        async def watch():
+            received, sent = asyncio.Queue(), asyncio.Queue()
+            scope = dict(type="websocket", path="/_changes", raw_path=b"/_changes", query_string=b"key=test-*",
+                         headers=[(b"host", b"localhost")], scheme="ws", root_path="")
+            await received.put(dict(type="websocket.connect"))
+            connection = asyncio.ensure_future(self.api(scope, received.get, sent.put))
+            frames = [(await asyncio.wait_for(sent.get(), 5)).get("type")]
+            frames.append(json.loads((await asyncio.wait_for(sent.get(), 5)).get("text")).get("type"))
+            await self.client.put("/test-data?member=true", json=dict(id="some-id2"))
+            await self.client.put("/other-data?member=true", json=dict(id="some-id1"))
+            await self.client.delete("/test-data/some-id1")
+            for _ in range(2):
+                event = json.loads((await asyncio.wait_for(sent.get(), 5)).get("text"))
+                frames.append((event.get("type"), event.get("id")))
+            connection.cancel()
+            await asyncio.gather(connection, return_exceptions=True)
+            return frames
+
+        self.request("put", "/test-data?member=true", json=dict(id="some-id1"))
+        self.assertEqual(self.loop.run_until_complete(watch()),
+                         ["websocket.accept", "subscribed", ("create", "some-id2"), ("delete", "some-id1")])
+
+    def test_patches(self):
+        self.request("put", "/test-data?member=true", json=dict(id="some-id1", visits=1, status="pending"))
+        etag = self.request("get", "/test-data/some-id1").headers.get("etag")
+        response = self.request("patch", "/test-data/some-id1", json={"increment": {"visits": 2}},
+                                headers={"if-match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json().get("result").get("visits"), 3)
+        response = self.request("patch", "/test-data/some-id1", json={"increment": {"visits": 2}},
+                                headers={"if-match": etag})
+        self.assertEqual(response.status_code, 412)
+        self.assertIn("error", response.json())
+        response = self.request("patch", "/test-data/some-id1",
+                                json={"set": {"status": "active"}, "expect": {"status": "done"}})
+        self.assertEqual(response.status_code, 412)
+        for patch in ({"set": {"id": "other-id"}}, {"increment": {"visits": "many"}}, {"remove": ["status"]}):
+            self.assertEqual(self.request("patch", "/test-data/some-id1", json=patch).status_code, 400, patch)
+        response = self.request("patch", "/test-data/some-id1", json={"set": {"status": "active"}},
+                                headers={"if-match": "*"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json().get("result").get("status"), "active")
+
+    def tearDown(self):
+        for listener in self.api.listeners.get("before_server_stop"):
+            result = listener(self.api, self.loop)
+            if inspect.isawaitable(result):
+                self.loop.run_until_complete(result)
+        self.loop.run_until_complete(self.service.ozza.close())
+        self.loop.close()
+        self.service.ozza.engine._teardown_data()
+        shutil.rmtree(os.environ["DATA_DIRECTORY"], ignore_errors=True)
+        if self.data_directory is None:
+            os.environ.pop("DATA_DIRECTORY")
+        else:
+            os.environ["DATA_DIRECTORY"] = self.data_directory
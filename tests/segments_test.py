@@ -0,0 +1,109 @@
+import os
+import unittest
+
+from ozza import Ozza
+from ozza.exceptions import CorruptedStorageException
+from ozza.resource import MemberList
+from ozza.segments import SegmentStore
+
+
+class SegmentStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.segments = SegmentStore("tests/segments_test.segments", segment_count=4)
+
+    def test_write_and_load(self):
+        data = {"test-data": MemberList([dict(id="some-id1")]), "value-test": "some-value"}
+        self.segments.write(data)
+        loaded = SegmentStore("tests/segments_test.segments").load()
+        self.assertEqual(loaded.get("test-data").load(), [dict(id="some-id1")])
+        self.assertEqual(loaded.get("value-test").load(), "some-value")
+
+    def test_write_only_changed_buckets(self):
+        keys = ["key-{}".format(number) for number in range(16)]
+        self.segments.write({key: key for key in keys})
+        files = set(os.listdir("tests/segments_test.segments"))
+        bucket = self.segments.bucket_for("key-0")
+        self.segments.write({"key-0": "changed"}, {bucket})
+        changed_files = set(os.listdir("tests/segments_test.segments"))
+        self.assertEqual(len(changed_files - files), 1)
+        self.assertEqual(len(files - changed_files), 1)
+        loaded = self.segments.load()
+        self.assertEqual(loaded.get("key-0").load(), "changed")
+        self.assertEqual(loaded.get("key-1").load(), "key-1")
+        self.assertEqual(len(loaded), len([key for key in keys if self.segments.bucket_for(key) != bucket]) + 1)
+
+    def test_empty_bucket_is_dropped(self):
+        self.segments.write({"value-test": "some-value"})
+        self.segments.write({}, {self.segments.bucket_for("value-test")})
+        self.assertEqual(self.segments.load(), {})
+        self.assertEqual(os.listdir("tests/segments_test.segments"), ["manifest.json"])
+
+    def tearDown(self):
+        self.segments.remove()
+
+
+class OzzaSegmentStorageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ozza = Ozza(test_mode=True)
+
+    def test_restart(self):
+        self.ozza.put_member("test-data", dict(id="some-id1", name="some-name"))
+        self.ozza.put_value("value-test", "some-value")
+        self.ozza.save_snapshot()
+        self.ozza.delete_member("test-data", "some-id1")
+        self.ozza.save_snapshot()
+        self.ozza.close()
+        restarted = Ozza(test_mode=True)
+        self.assertEqual(restarted.get_resource("test-data"), [])
+        self.assertEqual(restarted.get_resource("value-test"), "some-value")
+        restarted.close()
+
+    def test_failed_rotation_keeps_dirty_keys(self):
+        self.ozza.put_value("value-test", "some-value")
+        rotate = self.ozza._operation_log.rotate
+
+        def fail_once():
+            self.ozza._operation_log.rotate = rotate
+            raise IOError("disk full")
+
+        self.ozza._operation_log.rotate = fail_once
+        with self.assertRaises(IOError):
+            self.ozza.save_snapshot()
+        self.assertTrue(self.ozza.save_snapshot())
+        self.ozza.close()
+        self.ozza._operation_log.remove()
+        restarted = Ozza(test_mode=True)
+        self.assertEqual(restarted.get_resource("value-test"), "some-value")
+        restarted.close()
+
+    def test_corrupted_segment_stops_startup(self):
+        self.ozza.put_member("test-data", dict(id="some-id1", name="some-name"))
+        self.ozza.put_value("value-test", "some-value")
+        self.ozza.save_snapshot()
+        self.ozza.close()
+        directory = self.ozza._storage_location + self.ozza._segments_suffix
+        segment = os.path.join(directory, sorted(os.listdir(directory))[-1])
+        with open(segment, "r+b") as segment_file:
+            segment_file.seek(-4, os.SEEK_END)
+            segment_file.write(b"XXXX")
+        files = sorted(os.listdir(directory))
+        with self.assertRaises(CorruptedStorageException):
+            Ozza(test_mode=True)
+        self.assertEqual(sorted(os.listdir(directory)), files)
+        with open(segment, "rb") as segment_file:
+            self.assertTrue(segment_file.read().endswith(b"XXXX"))
+
+    def test_corrupted_manifest_stops_startup(self):
+        self.ozza.put_value("value-test", "some-value")
+        self.ozza.save_snapshot()
+        self.ozza.close()
+        directory = self.ozza._storage_location + self.ozza._segments_suffix
+        with open(os.path.join(directory, "manifest.json"), "w") as manifest:
+            manifest.write("{\"segments\": ")
+        with self.assertRaises(CorruptedStorageException):
+            Ozza(test_mode=True)
+
+    def tearDown(self):
+        self.ozza._teardown_data()
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import os
+import unittest
+
+from ozza import Ozza
+from ozza.client import OzzaClient
+from ozza.exceptions import EmptyParameterException
+from ozza.exceptions import PreconditionFailedException
+from ozza.exceptions import ResourceNotFoundException
+from ozza.server import StoreServer
+
+
+class StoreServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.socket_path = "tests/store_test.sock"
+        self.ozza = Ozza(test_mode=True)
+        self.loop = asyncio.new_event_loop()
+        self.server = StoreServer(self.ozza, self.socket_path)
+        self.loop.run_until_complete(self.server.start())
+
+    def run_client(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_pipelined_calls(self):
+        client = OzzaClient(self.socket_path)
+
+        async def scenario():
+            await asyncio.gather(*[client.put_member("test-data", dict(id="some-id{}".format(idx), name="some-name"))
+                                   for idx in range(20)])
+            results = await asyncio.gather(client.get_member("test-data", "some-id3"),
+                                           client.check_member("test-data", "some-id30"),
+                                           client.get_resource("test-data"))
+            await client.close()
+            return results
+
+        member, existed, resource = self.run_client(scenario())
+        self.assertEqual(member.get("id"), "some-id3")
+        self.assertFalse(existed)
+        self.assertEqual(len(resource), 20)
+        self.assertEqual(len(self.ozza.get_resource("test-data")), 20)
+
+    def test_encoded_results(self):
+        client = OzzaClient(self.socket_path)
+
+        async def scenario():
+            await client.put_member("test-data", dict(id="some-id1", name="some-name"))
+            results = await asyncio.gather(client.get_resource_encoded("test-data"),
+                                           client.get_member_encoded("test-data", "some-id1"),
+                                           client.get_member("test-data", "some-id1"))
+            await client.close()
+            return results
+
+        resource, member, decoded = self.run_client(scenario())
+        self.assertEqual(resource, b"[" + member + b"]")
+        self.assertEqual(json.loads(member), decoded)
+
+    def test_concurrent_increments(self):
+        client = OzzaClient(self.socket_path)
+
+        async def scenario():
+            await asyncio.gather(*[client.patch_member("test-data", "counter", dict(increment=dict(hits=1)))
+                                   for _ in range(50)])
+            with self.assertRaises(PreconditionFailedException):
+                await client.patch_member("test-data", "counter", dict(set=dict(hits=0), expect=dict(hits=49)))
+            await client.close()
+
+        self.run_client(scenario())
+        self.assertEqual(self.ozza.get_member("test-data", "counter").get("hits"), 50)
+
+    def test_errors_are_raised(self):
+        client = OzzaClient(self.socket_path)
+        with self.assertRaises(ResourceNotFoundException):
+            self.run_client(client.delete_resource("not-found"))
+        with self.assertRaises(EmptyParameterException):
+            self.run_client(client.put_member("test-data", None))
+        self.run_client(client.close())
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.server.stop())
+        self.loop.close()
+        self.ozza._teardown_data()
+        self.assertFalse(os.path.exists(self.socket_path))
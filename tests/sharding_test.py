@@ -0,0 +1,61 @@
+import asyncio
+import unittest
+
+from ozza import Ozza
+from ozza.server import StoreServer
+from ozza.sharding import ShardRouter
+from ozza.sharding import shard_filename
+from ozza.sharding import shard_for
+from ozza.sharding import shard_socket_path
+
+
+class ShardingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.socket_path = "tests/shard_test.sock"
+        self.loop = asyncio.new_event_loop()
+        self.shards = [Ozza(data_filename=shard_filename("test_store.oz", shard)) for shard in range(2)]
+        self.servers = [StoreServer(engine, shard_socket_path(self.socket_path, shard))
+                        for shard, engine in enumerate(self.shards)]
+        [self.loop.run_until_complete(server.start()) for server in self.servers]
+        self.router = ShardRouter(self.socket_path, 2)
+
+    def test_shard_for(self):
+        self.assertEqual(shard_for("session_acme_1", 4), shard_for("session_acme_1", 4))
+        self.assertTrue(0 <= shard_for("session_acme_1", 4) < 4)
+
+    def test_routing_and_scatter_gather(self):
+        keys = ["session_{}".format(idx) for idx in range(8)]
+
+        async def scenario():
+            await asyncio.gather(*[self.router.call("put_member", key, dict(id="some-id", name=key)) for key in keys])
+            member = await self.router.call("get_member", "session_3", "some-id")
+            members = await self.router.call("get_resource", "session_*")
+            stats = await self.router.call("expiry_stats")
+            metrics = await self.router.call("metrics")
+            memory = await self.router.call("memory_usage", "session_*")
+            first_page = await self.router.call("get_resource_page", "session_*", 5)
+            last_page = await self.router.call("get_resource_page", "session_*", 5, first_page.get("cursor"))
+            return member, members, stats, first_page, last_page, metrics, memory
+
+        member, members, stats, first_page, last_page, metrics, memory = self.loop.run_until_complete(scenario())
+        self.assertEqual(member.get("name"), "session_3")
+        self.assertEqual([item.get("name") for item in members], keys)
+        paged = first_page.get("result") + last_page.get("result")
+        self.assertEqual([item.get("name") for item in paged], keys)
+        self.assertIsNone(last_page.get("cursor"))
+        self.assertEqual(stats.get("tracked"), 0)
+        member_counts = [series for series in metrics.get("gauges") if series.get("name") == "ozza_members"]
+        self.assertEqual(sorted(series.get("labels").get("shard") for series in member_counts), ["0", "1"])
+        self.assertEqual(sum(series.get("value") for series in member_counts), len(keys))
+        self.assertEqual(list(memory.get("keys")), keys)
+        self.assertEqual(memory.get("total"), sum(memory.get("keys").values()))
+        self.assertTrue(all(len(engine._memory_data) > 0 for engine in self.shards))
+        for key in keys:
+            self.assertTrue(key in self.shards[shard_for(key, 2)]._memory_data)
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.router.close())
+        [self.loop.run_until_complete(server.stop()) for server in self.servers]
+        self.loop.close()
+        [engine._teardown_data() for engine in self.shards]
@@ -0,0 +1,26 @@
+import json
+import os
+import unittest
+
+from ozza.snapshot import parse_save_rules
+from ozza.snapshot import write_snapshot
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.location = "tests/snapshot_test.oz"
+
+    def test_parse_save_rules(self):
+        self.assertEqual(parse_save_rules("900:1, 60:10000"), [(900, 1), (60, 10000)])
+        self.assertEqual(parse_save_rules(""), [])
+
+    def test_write_snapshot(self):
+        write_snapshot(self.location, {"test-data": [{"id": "some-id"}]})
+        self.assertFalse(os.path.exists(self.location + ".tmp"))
+        with open(self.location) as snapshot:
+            self.assertEqual(json.load(snapshot), {"test-data": [{"id": "some-id"}]})
+
+    def tearDown(self):
+        if os.path.exists(self.location):
+            os.remove(self.location)
@@ -0,0 +1,32 @@
+import random
+import unittest
+
+from ozza.sortedkeys import SortedKeys
+
+
+class SortedKeysTest(unittest.TestCase):
+
+    def test_add_and_discard(self):
+        keys = SortedKeys(bucket_size=4)
+        values = list(range(100))
+        random.shuffle(values)
+        [keys.add(value) for value in values + values[:10]]
+        self.assertEqual(len(keys), 100)
+        self.assertEqual(list(keys), list(range(100)))
+        [keys.discard(value) for value in range(0, 100, 3)]
+        keys.discard(1000)
+        self.assertEqual(list(keys), [value for value in range(100) if value % 3])
+        self.assertEqual(len(keys), 66)
+
+    def test_irange(self):
+        keys = SortedKeys(["b", "ab", "aa", "c", "abc"], bucket_size=1)
+        self.assertEqual(list(keys.irange("ab")), ["abc", "b", "c"])
+        self.assertEqual(list(keys.irange("ab", inclusive=True)), ["ab", "abc", "b", "c"])
+        self.assertEqual(list(keys.irange("c")), [])
+        iterated = []
+        for key in keys.irange():
+            iterated.append(key)
+            if key == "ab":
+                keys.discard("abc")
+                keys.add("abd")
+        self.assertEqual(iterated, ["aa", "ab", "abd", "b", "c"])